@@ -0,0 +1,220 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+import metrics
+
+# Admission control for the expensive routes.
+#
+# Each limited route gets a per-process concurrency cap (requests beyond it get
+# 503 + Retry-After) and a per-client token bucket (429 + Retry-After), so a
+# burst of bcrypt logins or uploads cannot starve search or the cheap reads.
+# It is plain ASGI middleware, so an over-limit upload is refused before its
+# body is read. Limits are configured per route through <NAME>_MAX_CONCURRENT,
+# <NAME>_RATE_PER_SECOND and <NAME>_BURST; 0 disables that limit.
+#
+# Token buckets live in a backend with one async take(): in memory by default,
+# or a shared SQLite file (RATE_LIMIT_BACKEND=sqlite:///path) so several
+# workers on one host enforce one budget per client. Concurrency caps are always per process:
+# they protect that process's own event loop, threadpool and bcrypt pool.
+
+RATE_LIMITS_ENABLED = os.getenv("RATE_LIMITS_ENABLED", "true").lower() not in ("0", "false", "no")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Behind a reverse proxy the socket peer is the proxy; only trust the header when told to
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+# Clients tracked by the in-memory backend; the least recently seen are forgotten first
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    max_concurrent: int
+    rate_per_second: float
+    burst: int
+
+    @classmethod
+    def from_env(cls, name: str, max_concurrent: int, rate_per_second: float, burst: int) -> "RouteLimit":
+        prefix = name.upper()
+        return cls(
+            max_concurrent=int(os.getenv(f"{prefix}_MAX_CONCURRENT", max_concurrent)),
+            rate_per_second=float(os.getenv(f"{prefix}_RATE_PER_SECOND", rate_per_second)),
+            burst=int(os.getenv(f"{prefix}_BURST", burst)),
+        )
+
+
+# (method, path) -> (name, limit). Paths are exact: these routes take no path parameters.
+ROUTE_LIMITS: Dict[Tuple[str, str], Tuple[str, RouteLimit]] = {
+    ("GET", "/search"): ("search", RouteLimit.from_env("search", 16, 10, 30)),
+    ("POST", "/login"): ("login", RouteLimit.from_env("login", 32, 1, 10)),
+    ("POST", "/register"): ("register", RouteLimit.from_env("register", 8, 0.2, 5)),
+    ("POST", "/products"): ("upload", RouteLimit.from_env("upload", 8, 1, 10)),
+    # Each import holds the writer for a batch at a time and can add thousands of rows
+    ("POST", "/products/import"): ("import", RouteLimit.from_env("import", 2, 0.05, 2)),
+}
+
+
+class MemoryRateBackend:
+    """Token buckets in this process, LRU-bounded to RATE_LIMIT_MAX_CLIENTS."""
+
+    def __init__(self, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.max_clients = max_clients
+        # key -> (tokens, monotonic time of last update)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token. Returns 0 if granted, else seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            # A forgotten client just starts again with a full bucket
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteRateBackend:
+    """Token buckets in a small SQLite file shared by every worker on the host.
+
+    The file is separate from the application database so bucket updates never
+    wait on its writer lock. If the file stays locked past a short timeout the
+    request is let through: a limiter outage should not become an API outage.
+    """
+
+    BUSY_TIMEOUT_SECONDS = 0.05
+    # Buckets idle this long are full again, so their rows can go
+    PRUNE_AFTER_SECONDS = 3600
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+            self._local.conn = conn
+        return conn
+
+    def _take(self, key: str, rate: float, burst: int) -> float:
+        conn = self._connection()
+        now = time.time()  # wall clock: shared between processes
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute(
+                "INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - self.PRUNE_AFTER_SECONDS,))
+            conn.execute("COMMIT")
+            return wait
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"Rate limit store unavailable, admitting request: {e}")
+            return 0.0
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return await run_in_threadpool(self._take, key, rate, burst)
+
+
+def create_backend(url: str = RATE_LIMIT_BACKEND):
+    if url == "memory":
+        return MemoryRateBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteRateBackend(url[len("sqlite:///"):])
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {url!r}; use 'memory' or 'sqlite:///path'")
+
+
+rejected = metrics.registry.add(
+    metrics.Counter("http_admission_rejected_total", "Requests refused by admission control.")
+)
+
+
+class RouteState:
+    def __init__(self, name: str, limit: RouteLimit):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        # Moving average of one request's duration, used to size Retry-After on 503
+        self.avg_seconds = 1.0
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.avg_seconds))
+
+
+def client_key(scope) -> str:
+    if TRUST_FORWARDED_FOR:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, limits=None, backend=None, rate_limits_enabled: bool = RATE_LIMITS_ENABLED):
+        self.app = app
+        self.routes = {
+            key: RouteState(name, limit) for key, (name, limit) in (ROUTE_LIMITS if limits is None else limits).items()
+        }
+        self.backend = backend or create_backend()
+        self.rate_limits_enabled = rate_limits_enabled
+
+    async def __call__(self, scope, receive, send):
+        state = self.routes.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if state is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = state.limit
+        if self.rate_limits_enabled and limit.rate_per_second > 0:
+            wait = await self.backend.take(f"{state.name}:{client_key(scope)}", limit.rate_per_second, limit.burst)
+            if wait:
+                await self.reject(scope, receive, send, state, 429, "Too many requests", math.ceil(wait))
+                return
+        if limit.max_concurrent and state.active >= limit.max_concurrent:
+            await self.reject(scope, receive, send, state, 503, "Server busy, try again shortly", state.retry_after())
+            return
+
+        state.active += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            state.active -= 1
+            state.avg_seconds = 0.9 * state.avg_seconds + 0.1 * (time.perf_counter() - start)
+
+    async def reject(self, scope, receive, send, state: RouteState, status: int, detail: str, retry_after: int):
+        rejected.inc((("route", state.name), ("status", str(status))))
+        response = JSONResponse({"detail": detail}, status_code=status, headers={"Retry-After": str(retry_after)})
+        await response(scope, receive, send)
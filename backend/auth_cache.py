@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from catalog_snapshot import GenerationCounter, create_counter
+from database import read_engine
+
+# Short-lived cache of verified bearer tokens.
+#
+# Maps a token that already passed JWT verification to a snapshot of its user,
+# so a warm authenticated request needs neither a signature check nor a user
+# query. Entries live for TOKEN_CACHE_TTL_SECONDS (never past the token's own
+# exp) and are dropped explicitly when the user's profile changes.
+#
+# Every worker process has its own cache, so a profile change also bumps a
+# shared mmapped counter (<db>.users-gen, next to the catalog's): each
+# worker's next lookup sees it move and drops all its entries, since which
+# user changed is not recorded there. Another worker can therefore serve the
+# old profile only to requests already past their lookup when the change
+# commits. Without a shared counter (an in-memory database, one process)
+# invalidation is local and the TTL is the only bound.
+
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of the User columns handlers need, detached from any session."""
+    id: int
+    username: str
+    email: Optional[str]
+    full_name: Optional[str]
+    bio: Optional[str]
+    location: Optional[str]
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            bio=user.bio,
+            location=user.location,
+            created_at=user.created_at,
+        )
+
+
+class TokenCache:
+    def __init__(self, ttl_seconds: float, max_entries: int, shared: Optional[GenerationCounter] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Read before loading a user and passed to put(), which refuses a
+        # snapshot loaded across an invalidation
+        self.version = 0
+        self.shared = shared
+        self._shared_seen = shared.value() if shared is not None else 0
+        self._entries: "OrderedDict[str, Tuple[UserSnapshot, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        # Caller holds the lock
+        if self.shared is None:
+            return
+        generation = self.shared.value()
+        if generation != self._shared_seen:
+            self._shared_seen = generation
+            self.version += 1
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def current_version(self) -> int:
+        with self._lock:
+            self._sync()
+            return self.version
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: UserSnapshot, token_exp: Optional[float] = None, version: Optional[int] = None):
+        """Cache a verified token. `token_exp` is the JWT exp claim (epoch seconds);
+        `version` is current_version() from before the user was loaded."""
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._sync()
+            if version is not None and version != self.version:
+                return
+            self._remove(token)
+            self._entries[token] = (user, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """Drop a user's tokens here and, through the shared counter, in every worker."""
+        with self._lock:
+            self.version += 1
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+        if self.shared is not None:
+            self.shared.increment()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[0].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[0].id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(
+    TOKEN_CACHE_TTL_SECONDS, TOKEN_CACHE_MAX_ENTRIES, create_counter(read_engine.url.database, ".users-gen")
+)
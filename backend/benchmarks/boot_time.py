@@ -0,0 +1,96 @@
+"""Worker boot time (import + startup) against a large catalog.
+
+Builds a scratch database at the current migration head holding --catalog
+listings, then times `import main` plus the startup hook in a fresh
+interpreter, --runs times, each on a pristine copy of the database.
+--app-dir points at any backend checkout, so older revisions can be timed
+against the same data.
+
+    python benchmarks/boot_time.py --catalog 100000
+    python benchmarks/boot_time.py --catalog 100000 --app-dir /path/to/old/backend
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+BOOT = (
+    "import asyncio, time; start = time.perf_counter(); import main; "
+    "asyncio.run(main.startup_event()); print(time.perf_counter() - start)"
+)
+
+
+def build_catalog(path: str, count: int):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}"}
+    subprocess.run(["alembic", "upgrade", "head"], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+
+    from models import listing_columns
+    import search
+
+    conn = sqlite3.connect(path)
+    rows = []
+    for i in range(count):
+        data = {
+            "title": f"Listing {i}",
+            "price": f"${random.randint(0, 200)}",
+            "description": "Used for one semester, good condition.",
+            "category": random.choice(["books", "electronics", "furniture"]),
+            "image": "",
+            "contact": f"email:seller{i}@usf.edu",
+        }
+        columns = listing_columns(data)
+        rows.append((
+            str(uuid.uuid4()), json.dumps(json.dumps(data)), columns["category"],
+            columns["price_cents"], columns["is_free"], columns["created_at"].isoformat(" "),
+        ))
+    conn.executemany(
+        "INSERT INTO products (id, data, category, price_cents, is_free, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+    from sqlalchemy import create_engine
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        search.rebuild_search_index(connection)
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--app-dir", default=BACKEND_DIR)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        pristine = os.path.join(directory, "pristine.db")
+        build_catalog(pristine, args.catalog)
+        timings = []
+        for _ in range(args.runs):
+            path = os.path.join(directory, "boot.db")
+            shutil.copyfile(pristine, path)
+            env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "ENVIRONMENT": "production"}
+            result = subprocess.run(
+                [sys.executable, "-c", BOOT], cwd=args.app_dir, env=env, check=True, capture_output=True, text=True
+            )
+            timings.append(float(result.stdout.strip().splitlines()[-1]))
+        print(
+            f"{args.catalog} listings, {args.app_dir}: boot median {statistics.median(timings):.3f}s "
+            f"(runs: {', '.join(f'{t:.3f}' for t in timings)})"
+        )
+
+
+if __name__ == "__main__":
+    main()
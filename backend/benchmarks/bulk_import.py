@@ -0,0 +1,105 @@
+"""Bulk NDJSON import/export throughput.
+
+Creates a scratch database at the migration head, streams --rows generated
+listings into POST /products/import in-process, then reads them all back from
+GET /products/export. For comparison, --baseline-rows more listings are
+imported with batch_size=1, i.e. one commit per listing as with POST /products.
+
+    python benchmarks/bulk_import.py --rows 100000 --batch-size 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ndjson_chunks(count: int, start: int = 0, lines_per_chunk: int = 500):
+    async def chunks():
+        lines = []
+        for i in range(start, start + count):
+            lines.append(json.dumps({
+                "title": f"Listing {i}",
+                "price": f"${random.randint(0, 200)}",
+                "description": "Used for one semester, good condition.",
+                "category": random.choice(["books", "electronics", "furniture"]),
+                "image": "",
+                "contact": f"email:seller{i}@usf.edu",
+            }))
+            if len(lines) == lines_per_chunk:
+                yield ("\n".join(lines) + "\n").encode()
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+    return chunks()
+
+
+async def run(args):
+    import httpx
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Imported listings belong to the importing account
+        await client.post("/register", data={"username": "import-bench", "password": "import-bench"})
+        login = await client.post("/login", data={"username": "import-bench", "password": "import-bench"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        start = time.perf_counter()
+        response = await client.post(
+            "/products/import", params={"batch_size": args.batch_size}, content=ndjson_chunks(args.rows),
+            headers=headers,
+        )
+        elapsed = time.perf_counter() - start
+        report = response.json()
+        assert response.status_code == 200 and report["inserted"] == args.rows, report
+        print(f"import  batch_size={args.batch_size}: {args.rows} rows in {elapsed:.2f}s = {args.rows / elapsed:,.0f} rows/s")
+
+        start = time.perf_counter()
+        exported = 0
+        async with client.stream("GET", "/products/export") as response:
+            async for _ in response.aiter_lines():
+                exported += 1
+        elapsed = time.perf_counter() - start
+        print(f"export: {exported} rows in {elapsed:.2f}s = {exported / elapsed:,.0f} rows/s")
+
+        if args.baseline_rows:
+            start = time.perf_counter()
+            response = await client.post(
+                "/products/import", params={"batch_size": 1}, content=ndjson_chunks(args.baseline_rows, args.rows),
+                headers=headers,
+            )
+            elapsed = time.perf_counter() - start
+            assert response.json()["inserted"] == args.baseline_rows
+            print(f"import  batch_size=1: {args.baseline_rows} rows in {elapsed:.2f}s = {args.baseline_rows / elapsed:,.0f} rows/s")
+
+    # The password pool and aiosqlite connection threads would otherwise keep the interpreter alive
+    import database
+    await main.shutdown_event()
+    await database.async_engine.dispose()
+    await database.async_read_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--baseline-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        os.environ["ENVIRONMENT"] = "production"
+        subprocess.run(["alembic", "upgrade", "head"], cwd=BACKEND_DIR, check=True, capture_output=True)
+        sys.path.insert(0, BACKEND_DIR)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
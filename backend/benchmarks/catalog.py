@@ -0,0 +1,194 @@
+"""Synthetic catalog generator for benchmarks.
+
+Builds a scratch SQLite database at the current migration head holding
+--listings listings and --users users. Listings have category-specific
+titles, descriptions of varying length, log-normal prices (some free),
+creation times spread over the last six months and a random owner; every
+user's password is PASSWORD. Rows are written with executemany in chunks,
+so 1M listings fit in a few minutes and modest memory.
+
+    python benchmarks/catalog.py --listings 100000 --users 1000 --out /tmp/catalog.db
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PASSWORD = "benchmark-password"
+CHUNK_SIZE = 10_000
+
+# category: (weight, median price in dollars, title parts)
+CATEGORIES = {
+    "books": (30, 25, (
+        ["Calculus", "Organic Chemistry", "Physics", "Biology", "Statistics", "Microeconomics", "Psychology",
+         "Linear Algebra", "Data Structures", "Circuit Analysis", "World History", "Anatomy"],
+        ["Textbook", "Early Transcendentals", "Study Guide", "Lab Manual", "Workbook", "Solutions Manual"],
+        ["1st edition", "5th edition", "8th edition", "10th edition", "loose-leaf", "hardcover", ""],
+    )),
+    "electronics": (20, 120, (
+        ["TI-84 Plus", "MacBook Air", "iPad", "Dell monitor", "Bluetooth speaker", "Arduino Uno", "Raspberry Pi 4",
+         "Nintendo Switch", "AirPods", "mechanical keyboard", "webcam", "USB-C hub"],
+        ["calculator", "laptop", "tablet", "24 inch", "kit", "bundle", "with charger", ""],
+        ["like new", "barely used", "works great", "minor scratches", ""],
+    )),
+    "furniture": (15, 60, (
+        ["IKEA", "wooden", "metal", "folding", "ergonomic", "twin XL", "mini"],
+        ["desk", "chair", "bookshelf", "dresser", "futon", "nightstand", "mattress topper", "rug"],
+        ["must go", "pick up only", "great condition", ""],
+    )),
+    "clothing": (10, 20, (
+        ["USF", "Bulls", "Nike", "North Face", "vintage", "formal"],
+        ["hoodie", "jacket", "sneakers", "dress", "backpack", "jersey"],
+        ["size S", "size M", "size L", "size 10", ""],
+    )),
+    "project kit": (8, 30, (
+        ["EGN 3000", "EEL 3111", "robotics", "senior design", "chemistry"],
+        ["lab kit", "parts kit", "sensor kit", "breadboard set", "goggles and coat"],
+        ["complete", "missing a few parts", "unopened", ""],
+    )),
+    "appliances": (7, 45, (
+        ["mini", "compact", "Keurig", "Instant Pot", "LED"],
+        ["fridge", "microwave", "coffee maker", "air fryer", "desk lamp", "fan"],
+        ["dorm size", "works perfectly", ""],
+    )),
+    "tickets": (5, 35, (
+        ["Bulls football", "concert", "Busch Gardens", "graduation", "basketball"],
+        ["ticket", "tickets x2", "season pass"],
+        ["this weekend", "can't make it", ""],
+    )),
+    "other": (5, 15, (
+        ["parking", "plant", "bike", "skateboard", "guitar", "yoga mat"],
+        ["permit", "lock", "stand", "case", ""],
+        ["cheap", "negotiable", ""],
+    )),
+}
+
+SENTENCES = [
+    "Used for one semester and kept in great shape.",
+    "Some highlighting in the first few chapters but otherwise clean.",
+    "Pick up near the library or the Marshall Student Center.",
+    "Price is negotiable if you can pick up today.",
+    "Comes with everything shown in the photo.",
+    "Moving out at the end of the month, so it has to go.",
+    "Works perfectly, selling because I upgraded.",
+    "Smoke-free and pet-free apartment.",
+    "Message me on Instagram for a faster reply.",
+    "Perfect for freshmen taking the intro sequence.",
+    "Original box and receipt included.",
+    "A few cosmetic scratches that don't affect anything.",
+]
+
+
+def make_listing(rng: random.Random, now: datetime) -> dict:
+    names = list(CATEGORIES)
+    category = rng.choices(names, weights=[CATEGORIES[n][0] for n in names])[0]
+    _, median, (first, second, third) = CATEGORIES[category]
+    title = " ".join(part for part in (rng.choice(first), rng.choice(second), rng.choice(third)) if part)
+    description = " ".join(rng.sample(SENTENCES, k=min(len(SENTENCES), max(1, int(rng.expovariate(0.5)) + 1))))
+    if rng.random() < 0.08:
+        price = rng.choice(["free", "Free", "$0"])
+    else:
+        dollars = max(1, round(rng.lognormvariate(math.log(median), 0.8)))
+        price = rng.choice([f"${dollars}", f"{dollars}", f"${dollars}.0", f"${dollars}.99"])
+    handle = f"student{rng.randrange(100_000)}"
+    return {
+        "title": title,
+        "price": price,
+        "description": description,
+        "category": category,
+        "image": rng.choice(["", f"https://picsum.photos/seed/{handle}/400/300"]),
+        "contact": rng.choice([f"email:{handle}@usf.edu", f"instagram:{handle}"]),
+        "created_at": (now - timedelta(seconds=rng.uniform(0, 180 * 24 * 3600))).isoformat(),
+    }
+
+
+def migrate(path: str):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}"}
+    subprocess.run(["alembic", "upgrade", "head"], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+
+
+def generate(path: str, listings: int, users: int, seed: int = 1, bcrypt_rounds: int = 12) -> dict:
+    """Create `path` at the migration head and fill it. Returns a summary."""
+    from passlib.context import CryptContext
+    from sqlalchemy import create_engine
+
+    import search
+    from models import listing_columns, listing_json
+
+    start = time.perf_counter()
+    if os.path.exists(path):
+        os.remove(path)
+    migrate(path)
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    done = 0
+    while done < listings:
+        rows = []
+        for _ in range(min(CHUNK_SIZE, listings - done)):
+            product_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            data = make_listing(rng, now)
+            columns = listing_columns(data)
+            rows.append((
+                product_id, json.dumps(json.dumps(data)), columns["category"], columns["price_cents"],
+                columns["is_free"], columns["created_at"].isoformat(" "), listing_json(product_id, data),
+                # Users are inserted below with ids 1..users
+                rng.randint(1, users) if users else None,
+            ))
+        conn.executemany(
+            "INSERT INTO products (id, data, category, price_cents, is_free, created_at, api_json, owner_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+        done += len(rows)
+
+    # One hash for everyone: hashing is what /login measures, not what setup should spend time on
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=bcrypt_rounds).hash(PASSWORD)
+    conn.executemany(
+        "INSERT INTO users (username, hashed_password, email, full_name, created_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            (f"user{i}", hashed, f"user{i}@usf.edu", f"Benchmark User {i}", now.isoformat(" "))
+            for i in range(users)
+        ],
+    )
+    conn.execute(
+        "INSERT INTO product_changes (product_id, op, created_at) "
+        "SELECT id, 'upsert', created_at FROM products ORDER BY created_at, id"
+    )
+    conn.commit()
+    conn.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        search.rebuild_search_index(connection)
+    engine.dispose()
+    return {"listings": listings, "users": users, "seed": seed, "seconds": round(time.perf_counter() - start, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    print(generate(args.out, args.listings, args.users, args.seed, args.bcrypt_rounds))
+
+
+if __name__ == "__main__":
+    main()
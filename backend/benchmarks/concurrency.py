@@ -0,0 +1,111 @@
+"""Latency of GET /products/{id} while heavy /search requests run concurrently.
+
+Measures head-of-line blocking on the event loop: if search holds the loop,
+cheap item lookups queue behind it and their p99 explodes.
+
+    RATE_LIMITS_ENABLED=false uvicorn main:app --port 8000      # in backend/
+    python benchmarks/concurrency.py --url http://127.0.0.1:8000
+
+The catalog is topped up through POST /products to --catalog listings first.
+The rate limits must be off: one client sending the whole seed and search load
+would otherwise be throttled to the per-client upload and search rates.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+WORDS = (
+    "calculus physics chemistry biology lab kit book notes arduino desk fridge "
+    "engineering drawing set manual goggles calculator edition used new cheap"
+).split()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def seed(client: httpx.AsyncClient, target: int):
+    existing = len((await client.get("/products")).json())
+    if existing >= target:
+        return existing
+    # Posting needs an account; registering again just answers 400
+    await client.post("/register", data={"username": "concurrency-bench", "password": "concurrency-bench"})
+    login = await client.post("/login", data={"username": "concurrency-bench", "password": "concurrency-bench"})
+    login.raise_for_status()
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    sem = asyncio.Semaphore(16)
+
+    async def post(i):
+        async with sem:
+            words = random.sample(WORDS, 4)
+            response = await client.post(
+                "/products",
+                data={
+                    "title": " ".join(words[:2]).title(),
+                    "price": f"${random.randint(1, 200)}",
+                    "description": " ".join(random.choices(WORDS, k=30)),
+                    "category": random.choice(["books", "electronics", "lab equipment", "furniture"]),
+                    "contact": f"email:seller{i}@usf.edu",
+                },
+                files={"photo": ("seed.jpg", b"\xff\xd8seed", "image/jpeg")},
+                headers=headers,
+            )
+            response.raise_for_status()
+
+    await asyncio.gather(*(post(i) for i in range(existing, target)))
+    return target
+
+
+async def lookups(client: httpx.AsyncClient, ids, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get(f"/products/{random.choice(ids)}")
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def search_load(client: httpx.AsyncClient, stop: asyncio.Event):
+    while not stop.is_set():
+        await client.get("/search", params={"query": random.choice("abcdeilnorst"), "limit": 500})
+
+
+def report(label, samples):
+    print(
+        f"{label:<22} n={len(samples):<5} p50={statistics.median(samples):7.2f}ms "
+        f"p99={percentile(samples, 99):7.2f}ms max={max(samples):7.2f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--catalog", type=int, default=5000)
+    parser.add_argument("--searchers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.searchers + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=120, limits=limits) as client:
+        total = await seed(client, args.catalog)
+        ids = [p["id"] for p in (await client.get("/products")).json()]
+        print(f"catalog: {total} listings, {args.searchers} concurrent searchers")
+
+        report("idle", await lookups(client, ids, args.requests))
+
+        stop = asyncio.Event()
+        searchers = [asyncio.create_task(search_load(client, stop)) for _ in range(args.searchers)]
+        await asyncio.sleep(0.5)
+        report("during /search load", await lookups(client, ids, args.requests))
+        stop.set()
+        await asyncio.gather(*searchers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""List response building: decode/validate/encode per row vs. joining api_json.
+
+Creates a scratch database at the migration head with --rows listings (a mix
+of current and legacy email/instagram rows), checks that every stored
+api_json fragment is byte-identical to serializing the row through the
+Product model, then times building a --page-size listing response both ways.
+
+    python benchmarks/listing_json.py --rows 20000 --page-size 200
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_listing(i: int) -> dict:
+    data = {
+        "title": f"Listing {i} – gently used",
+        "price": random.choice(["free", "$7.0", "45", "$120"]),
+        "description": "Used for one semester, good condition. Pick up near the library.",
+        "category": random.choice(["books", "electronics", "furniture"]),
+        "image": "https://example.com/photo.jpg",
+        "created_at": "2026-10-01T12:00:00",
+    }
+    if i % 10 == 0:
+        data["email"] = f"seller{i}@usf.edu"  # legacy contact format
+    else:
+        data["contact"] = f"instagram:seller{i}"
+    return data
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        os.environ["ENVIRONMENT"] = "production"
+        subprocess.run(["alembic", "upgrade", "head"], cwd=BACKEND_DIR, check=True, capture_output=True)
+        sys.path.insert(0, BACKEND_DIR)
+
+        from pydantic import TypeAdapter
+        from sqlalchemy import select
+        from typing import List
+
+        from database import SessionLocal
+        from main import Product, listing_array
+        from models import ProductDB, normalize_listing
+
+        db = SessionLocal()
+        db.add_all(ProductDB.from_data(str(i), make_listing(i)) for i in range(args.rows))
+        db.commit()
+
+        # Contract: stored fragments serialize exactly like the response model
+        for product_id, raw, api_json in db.execute(select(ProductDB.id, ProductDB.data, ProductDB.api_json)):
+            expected = Product(**normalize_listing(product_id, json.loads(raw))).model_dump_json()
+            assert api_json == expected, (api_json, expected)
+        print(f"contract: {args.rows} api_json fragments match Product.model_dump_json()")
+
+        adapter = TypeAdapter(List[Product])
+
+        def decode_validate_encode():
+            rows = db.scalars(select(ProductDB).order_by(ProductDB.created_at.desc()).limit(args.page_size)).all()
+            return adapter.dump_json([Product(**normalize_listing(p.id, json.loads(p.data))) for p in rows])
+
+        def join_fragments():
+            return listing_array(
+                db.scalars(select(ProductDB.api_json).order_by(ProductDB.created_at.desc()).limit(args.page_size)).all()
+            )
+
+        assert decode_validate_encode() == join_fragments()
+        before = timed(decode_validate_encode, args.repeat)
+        after = timed(join_fragments, args.repeat)
+        print(f"page of {args.page_size}: decode/validate/encode {before * 1000:.2f} ms, "
+              f"join api_json {after * 1000:.2f} ms ({before / after:.1f}x)")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Password verification throughput through the bcrypt process pool.
+
+Runs the same work /login does (passwords.verify_password) with 1..N pool
+workers and reports logins per second overall and per core.
+
+    python benchmarks/login_throughput.py --rounds 12 --logins 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def measure(workers: int, logins: int, hashed: str) -> float:
+    import passwords
+
+    pool = passwords.PasswordPool(workers, queue_limit=logins)
+    try:
+        # Warm the pool so process start-up is not counted
+        await asyncio.gather(*(pool.run(passwords._verify_and_update, "pw", hashed) for _ in range(workers)))
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(pool.run(passwords._verify_and_update, "pw", hashed) for _ in range(logins))
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    assert all(valid for valid, _ in results)
+    return logins / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # Children are spawned and read the cost from the environment
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    import passwords
+
+    hashed = passwords._hash("pw")
+    print(f"bcrypt rounds={args.rounds}, {args.logins} logins, {os.cpu_count()} cores")
+    for workers in sorted({1, args.max_workers // 2 or 1, args.max_workers}):
+        rate = await measure(workers, args.logins, hashed)
+        print(f"workers={workers:<3} {rate:8.1f} logins/s  {rate / workers:7.1f} logins/s/core")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""WebSocket messaging load test: delivery latency with many concurrent clients.
+
+Registers --clients users (in pairs), starts one conversation per pair, opens
+one socket per user on /ws/messages and has every client send --messages
+messages to its peer, one every --interval seconds (with jitter). Latency is
+measured from send to receipt by the peer, in this process.
+
+    BCRYPT_ROUNDS=4 RATE_LIMITS_ENABLED=false uvicorn main:app --port 8000      # in backend/
+    python benchmarks/messaging_load.py --url http://127.0.0.1:8000 --clients 2000
+
+Run the server with cheap hashing (BCRYPT_ROUNDS=4) or setup will spend
+minutes registering users, and with the rate limits off, since every client
+registers and logs in from the same address and /register answers 429 after
+the first few.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import httpx
+import websockets
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def setup(client: httpx.AsyncClient, count: int):
+    """Register count users and one conversation per pair; returns [(token, conversation_id)]."""
+    prefix = uuid.uuid4().hex[:8]
+    names = [f"load_{prefix}_{i}" for i in range(count)]
+    sem = asyncio.Semaphore(32)
+
+    async def token_for(name):
+        async with sem:
+            form = {"username": name, "password": "load-test-password"}
+            (await client.post("/register", data=form)).raise_for_status()
+            response = await client.post("/login", data=form)
+            response.raise_for_status()
+            return response.json()["access_token"]
+
+    tokens = await asyncio.gather(*(token_for(name) for name in names))
+
+    async def conversation(i):
+        async with sem:
+            response = await client.post(
+                "/conversations",
+                json={"username": names[i + 1]},
+                headers={"Authorization": f"Bearer {tokens[i]}"},
+            )
+            response.raise_for_status()
+            return response.json()["id"]
+
+    conversations = await asyncio.gather(*(conversation(i) for i in range(0, count, 2)))
+    return [(tokens[i], conversations[i // 2]) for i in range(count)]
+
+
+async def run_client(ws_url, index, token, conversation_id, args, sent_at, latencies, connected, start):
+    async with websockets.connect(f"{ws_url}/ws/messages?token={token}", max_queue=None, compression=None) as socket:
+        connected.release()
+        await start.wait()
+        expected = args.messages  # from the peer
+
+        async def sender():
+            for seq in range(args.messages):
+                await asyncio.sleep(args.interval * random.uniform(0.5, 1.5))
+                client_id = f"{index}:{seq}"
+                sent_at[client_id] = time.perf_counter()
+                await socket.send(json.dumps({
+                    "type": "send", "conversation_id": conversation_id, "body": f"message {seq}", "client_id": client_id,
+                }))
+
+        async def receiver():
+            received = 0
+            while received < expected:
+                frame = json.loads(await asyncio.wait_for(socket.recv(), timeout=args.timeout))
+                if frame["type"] != "message":
+                    raise RuntimeError(frame)
+                if frame["message"]["sender_id"] is not None and not frame["client_id"].startswith(f"{index}:"):
+                    latencies.append(time.perf_counter() - sent_at[frame["client_id"]])
+                    received += 1
+
+        await asyncio.gather(sender(), receiver())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    args.clients -= args.clients % 2
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        setup_start = time.perf_counter()
+        clients = await setup(client, args.clients)
+        print(f"setup: {args.clients} users, {args.clients // 2} conversations in {time.perf_counter() - setup_start:.1f}s")
+
+        ws_url = args.url.replace("http", "ws", 1)
+        sent_at, latencies = {}, []
+        connected = asyncio.Semaphore(0)
+        start = asyncio.Event()
+        tasks = [
+            asyncio.create_task(run_client(ws_url, i, token, conversation_id, args, sent_at, latencies, connected, start))
+            for i, (token, conversation_id) in enumerate(clients)
+        ]
+        for _ in clients:
+            await connected.acquire()
+        print(f"connected: {args.clients} sockets")
+        run_start = time.perf_counter()
+        start.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - run_start
+        failures = [r for r in results if isinstance(r, Exception)]
+
+        total = args.clients * args.messages
+        print(f"delivered {len(latencies)}/{total} messages in {elapsed:.1f}s ({len(latencies) / elapsed:,.0f}/s), "
+              f"{len(failures)} clients failed")
+        if latencies:
+            print(
+                f"latency ms: p50 {percentile(latencies, 50) * 1000:.1f}  p95 {percentile(latencies, 95) * 1000:.1f}  "
+                f"p99 {percentile(latencies, 99) * 1000:.1f}  max {max(latencies) * 1000:.1f}"
+            )
+        stats = (await client.get("/messaging/stats")).json()
+        writer = stats["writer"]
+        print(f"server: {writer['written']} messages in {writer['batches']} commits "
+              f"({writer['written'] / max(1, writer['batches']):.1f} per commit), dropped {stats['hub']['dropped']}")
+        for failure in failures[:3]:
+            print(f"  failure: {failure!r}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
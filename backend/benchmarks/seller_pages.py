@@ -0,0 +1,122 @@
+"""SQL statements and latency for listing pages with embedded sellers.
+
+Generates a catalog whose listings belong to random users, then requests
+GET /products pages (many sellers per page) and GET /user/listings pages
+(one seller) in-process. Statements are counted with the app's own
+db_statements_total metric, so the numbers are what /metrics reports. A
+page of --limit listings must cost as many statements as a page of 10:
+seller summaries come from one IN query per page, never one per listing.
+Exits non-zero if it does not.
+
+    python benchmarks/seller_pages.py --listings 100000 --users 1000
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import catalog  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(db_path: str, args) -> bool:
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["UPLOAD_DIR"] = os.path.join(os.path.dirname(db_path), "uploads")
+    # Every request should reach the database, not the response cache
+    os.environ["CATALOG_CACHE_MAX_BYTES"] = "0"
+    os.environ["RATE_LIMITS_ENABLED"] = "false"
+    os.environ["ENVIRONMENT"] = "production"  # no per-request log lines
+    sys.path.insert(0, BACKEND_DIR)
+    import httpx
+    import database
+    import main
+    import metrics
+
+    def statements(route: str) -> float:
+        return metrics.sql_statements.values.get((("method", "GET"), ("route", route)), 0)
+
+    async def page(client, path: str, params: dict, headers=None):
+        before = statements(path)
+        start = time.perf_counter()
+        response = await client.get(path, params=params, headers=headers)
+        response.raise_for_status()
+        elapsed = (time.perf_counter() - start) * 1000
+        return response, statements(path) - before, elapsed
+
+    ok = True
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        login = await client.post("/login", data={"username": "user0", "password": catalog.PASSWORD})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        for path, request_headers in (("/products", None), ("/user/listings", headers)):
+            counts = {}
+            for limit in (10, args.limit):
+                timings, queries, listings, sellers = [], set(), 0, set()
+                cursor = None
+                for _ in range(args.pages):
+                    params = {"limit": limit, **({"after": cursor} if cursor else {})}
+                    response, count, elapsed = await page(client, path, params, request_headers)
+                    timings.append(elapsed)
+                    queries.add(count)
+                    body = response.json()
+                    listings += len(body)
+                    sellers.update(item["seller"]["id"] for item in body if item.get("seller"))
+                    cursor = response.headers.get("X-Next-Cursor")
+                    if not cursor:
+                        break
+                counts[limit] = max(queries)
+                print(
+                    f"{path} limit={limit:<4} pages={len(timings):<3} listings={listings:<6} sellers={len(sellers):<5} "
+                    f"statements/page={sorted(queries)} p50={statistics.median(timings):6.2f}ms "
+                    f"p95={percentile(timings, 95):6.2f}ms"
+                )
+            if counts[args.limit] > counts[10]:
+                print(f"FAIL {path}: {counts[args.limit]} statements for {args.limit} listings, {counts[10]} for 10")
+                ok = False
+    await main.shutdown_event()
+    await database.async_engine.dispose()
+    await database.async_read_engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=50, help="pages followed per endpoint and page size")
+    parser.add_argument("--catalog", help="reuse (or create) the generated catalog at this path")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bullshub-sellers-")
+    try:
+        source = args.catalog or os.path.join(workdir, "catalog.db")
+        if not os.path.exists(source):
+            subprocess.run(
+                [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "catalog.py"), "--listings",
+                 str(args.listings), "--users", str(args.users), "--bcrypt-rounds", "4", "--out", source],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+        db_path = os.path.join(workdir, "sellers.db")
+        shutil.copyfile(source, db_path)
+        ok = asyncio.run(run(db_path, args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Build cost, memory and query latency of the similar-listings index.
+
+For each catalog size, generates a catalog, builds a SimilarIndex from the
+stored listings and reports build time and the memory the index holds
+(tracemalloc). Then it times similar() for random listings against a
+brute-force scorer that computes the same cosine score for every listing,
+and reports recall@limit of the pruned query against it. Last, it times
+incremental add and remove of single listings.
+
+    python benchmarks/similar_listings.py --sizes 10000 100000
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def brute_force(index, product_id: str, limit: int):
+    """The exact top `limit` by cosine score, scoring every live listing."""
+    doc = index._index_of[product_id]
+    query = {}
+    for tid, weight in zip(index._doc_terms[doc], index._doc_weights[doc]):
+        if index._df[tid] > 1:
+            idf = index._idf(tid)
+            query[tid] = weight * idf * idf
+    ranked = []
+    for candidate, terms in enumerate(index._doc_terms):
+        if terms is None or candidate == doc:
+            continue
+        score = sum(query.get(tid, 0.0) * weight for tid, weight in zip(terms, index._doc_weights[candidate]))
+        if score:
+            ranked.append((score * index._norms[candidate], candidate))
+    return [index._ids[candidate] for _, candidate in heapq.nlargest(limit, ranked)]
+
+
+def run(size: int, workdir: str, args):
+    import similar
+
+    path = os.path.join(workdir, f"catalog-{size}.db")
+    subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "catalog.py"),
+         "--listings", str(size), "--users", "10", "--out", path],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    with sqlite3.connect(path) as conn:
+        rows = [(product_id, json.loads(api_json)) for product_id, api_json in conn.execute("SELECT id, api_json FROM products")]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = similar.SimilarIndex(args.max_candidates or similar.SIMILAR_MAX_CANDIDATES)
+    for product_id, data in rows:
+        index.add(product_id, data)
+    build_seconds = time.perf_counter() - start
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    stats = index.stats()
+
+    rng = random.Random(args.seed)
+    sample = rng.sample([product_id for product_id, _ in rows], min(args.queries, len(rows)))
+    pruned, exact, overlap = [], [], []
+    for product_id in sample:
+        start = time.perf_counter()
+        found = [i for i, _ in index.similar(product_id, args.limit)]
+        pruned.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        expected = brute_force(index, product_id, args.limit)
+        exact.append((time.perf_counter() - start) * 1000)
+        if expected:
+            overlap.append(len(set(found) & set(expected)) / len(expected))
+
+    adds, removes = [], []
+    for product_id, data in rng.sample(rows, min(args.updates, len(rows))):
+        start = time.perf_counter()
+        index.remove(product_id)
+        removes.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        index.add(product_id, data)
+        adds.append((time.perf_counter() - start) * 1000)
+
+    print(
+        f"{size} listings: built in {build_seconds:.2f}s, {index_bytes / 1024 / 1024:.1f} MiB, "
+        f"{stats['terms']} terms, {stats['postings']} postings"
+    )
+    for label, samples in (("similar()", pruned), ("brute force", exact), ("add", adds), ("remove", removes)):
+        print(f"  {label:<12} p50={statistics.median(samples):8.3f}ms p99={percentile(samples, 99):8.3f}ms")
+    print(f"  recall@{args.limit} vs brute force: {statistics.mean(overlap):.3f}, "
+          f"speedup p50 {statistics.median(exact) / statistics.median(pruned):.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--max-candidates", type=int, help="default: SIMILAR_MAX_CANDIDATES")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bullshub-similar-")
+    # similar imports database, which needs a DATABASE_URL; point it at the scratch directory
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'unused.db')}")
+    try:
+        for size in args.sizes:
+            run(size, workdir, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
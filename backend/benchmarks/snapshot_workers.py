@@ -0,0 +1,158 @@
+"""Per-worker memory and /products latency with and without the mmap catalog snapshot.
+
+Starts `uvicorn --workers N` against a copy of a generated catalog three
+times: "db" reads SQLite on every request (no snapshot, catalog_cache off),
+"cache" is the same plus each worker's own catalog_cache copy of the
+responses, and "snapshot" has every worker map one shared snapshot file.
+Every request opens a new connection so load spreads over the workers.
+Reports time to first byte and total time for GET /products (the body is
+the whole catalog) and GET /products/{id}, then each worker's RSS and PSS.
+PSS divides shared pages between the processes mapping them, so its sum is
+what the workers really cost together.
+
+    python benchmarks/snapshot_workers.py --listings 100000 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_kib(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name.lower()] = int(rest.split()[0])
+    return values
+
+
+def worker_pids(master: int):
+    with open(f"/proc/{master}/task/{master}/children") as f:
+        children = [int(pid) for pid in f.read().split()]
+    # uvicorn's multiprocess supervisor also starts a resource tracker; workers are the ones serving
+    return [pid for pid in children if "multiprocessing.resource_tracker" not in open(f"/proc/{pid}/cmdline").read()]
+
+
+async def timed(client: httpx.AsyncClient, paths, concurrency: int):
+    """(time to first byte, total time) in ms for each request."""
+    first_byte, total = [], []
+    queue = iter(paths)
+
+    async def worker():
+        for path in queue:
+            start = time.perf_counter()
+            async with client.stream("GET", path) as response:
+                response.raise_for_status()
+                first_byte.append((time.perf_counter() - start) * 1000)
+                async for _ in response.aiter_raw():
+                    pass
+            total.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return first_byte, total
+
+
+async def run(mode: str, db_path: str, ids, args):
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "CATALOG_SNAPSHOT": "on" if mode == "snapshot" else "off",
+        "ENVIRONMENT": "production",
+    }
+    if mode == "db":
+        env["CATALOG_CACHE_MAX_BYTES"] = "0"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        limits = httpx.Limits(max_keepalive_connections=0)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+            for _ in range(600):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            # Let the snapshot build, then warm every worker (connections land on workers at random)
+            await asyncio.sleep(args.settle)
+            await timed(client, ["/products"] * args.workers * 4, args.workers * 2)
+
+            lists = await timed(client, ["/products"] * args.requests, args.concurrency)
+            items = await timed(client, [f"/products/{random.choice(ids)}" for _ in range(args.requests * 10)], args.concurrency)
+            memory = [memory_kib(pid) for pid in worker_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print(mode)
+    for label, (first_byte, total) in (("GET /products", lists), ("GET /products/{id}", items)):
+        print(
+            f"  {label:<19} n={len(total):<5} first byte p50={statistics.median(first_byte):8.2f}ms "
+            f"p95={percentile(first_byte, 95):8.2f}ms   total p50={statistics.median(total):8.2f}ms "
+            f"p95={percentile(total, 95):8.2f}ms"
+        )
+    for i, values in enumerate(memory):
+        print(f"  worker {i}: RSS {values['rss'] / 1024:7.1f} MiB  PSS {values['pss'] / 1024:7.1f} MiB")
+    print(f"  total PSS {sum(v['pss'] for v in memory) / 1024:.1f} MiB")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100, help="full-catalog requests; 10x as many item lookups")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds to wait after start-up")
+    parser.add_argument("--catalog", help="reuse (or create) the generated catalog at this path")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bullshub-snapshot-")
+    try:
+        source = args.catalog or os.path.join(workdir, "catalog.db")
+        if not os.path.exists(source):
+            subprocess.run(
+                [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "catalog.py"),
+                 "--listings", str(args.listings), "--users", "10", "--out", source],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+        with sqlite3.connect(source) as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM products ORDER BY random() LIMIT 5000")]
+            print(f"{conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]} listings, {args.workers} workers")
+        for mode in ("db", "cache", "snapshot"):
+            db_path = os.path.join(workdir, f"{mode}.db")
+            shutil.copyfile(source, db_path)
+            await run(mode, db_path, ids, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
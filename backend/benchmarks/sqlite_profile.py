@@ -0,0 +1,126 @@
+"""Mixed read/write load against SQLite: bare engine vs. database.EngineProfile.
+
+Reader threads page through listings by category while writer threads insert
+listings, for --seconds each run, on a scratch database seeded with
+--catalog rows. Reports reads/s, writes/s and "database is locked" errors.
+
+    python benchmarks/sqlite_profile.py --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, EngineProfile, create_sqlite_engine  # noqa: E402
+from models import ProductDB, listing_columns  # noqa: E402
+
+CATEGORIES = ["books", "electronics", "lab equipment", "furniture", "supplies"]
+
+
+def listing(i: int) -> ProductDB:
+    data = {
+        "title": f"Listing {i}",
+        "price": f"${random.randint(0, 200)}",
+        "description": "Used for one semester, good condition. " * 4,
+        "category": random.choice(CATEGORIES),
+        "image": "",
+        "contact": f"email:seller{i}@usf.edu",
+    }
+    return ProductDB(id=str(uuid.uuid4()), data=json.dumps(data), **listing_columns(data))
+
+
+def run(read_engine, write_engine, args):
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with Session(read_engine) as db:
+                    db.scalars(
+                        select(ProductDB)
+                        .where(ProductDB.category == random.choice(CATEGORIES))
+                        .order_by(ProductDB.created_at.desc())
+                        .limit(50)
+                    ).all()
+                bump("reads")
+            except OperationalError:
+                bump("locked")
+
+    def writer():
+        while not stop.is_set():
+            try:
+                with Session(write_engine) as db:
+                    db.add(listing(random.randint(0, 10**9)))
+                    db.commit()
+                bump("writes")
+            except OperationalError:
+                bump("locked")
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {k: v / args.seconds if k != "locked" else v for k, v in counts.items()}
+
+
+def seed(url, count):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(listing(i) for i in range(count))
+        db.commit()
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("bare", "profile"):
+            url = f"sqlite:///{os.path.join(directory, name + '.db')}"
+            seed(url, args.catalog)
+            if name == "bare":
+                # What database.py used to build: one default engine for everything
+                engine = create_engine(url, connect_args={"check_same_thread": False})
+                read_engine = write_engine = engine
+            else:
+                profile = EngineProfile.from_env()
+                read_engine = create_sqlite_engine(url, profile, read_only=True)
+                write_engine = create_sqlite_engine(url, profile)
+            result = run(read_engine, write_engine, args)
+            print(
+                f"{name:<8} reads {result['reads']:8.0f}/s  writes {result['writes']:7.0f}/s  "
+                f"locked errors {result['locked']}"
+            )
+            read_engine.dispose()
+            write_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
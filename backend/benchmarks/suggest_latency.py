@@ -0,0 +1,107 @@
+"""/suggest latency against /search for the same keystrokes.
+
+Generates a catalog (or reuses one), then replays typing: every prefix of
+random listing title words, one request per keystroke, through the app
+in-process. The first /suggest call builds the index and is reported
+separately. A few listings are created between rounds, so the catch-up
+and cache invalidation after writes are part of the numbers.
+
+    python benchmarks/suggest_latency.py --listings 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(db_path: str, words, args):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["UPLOAD_DIR"] = os.path.join(os.path.dirname(db_path), "uploads")
+    os.environ["RATE_LIMITS_ENABLED"] = "false"
+    sys.path.insert(0, BACKEND_DIR)
+    import httpx
+    import database
+    import main
+
+    keystrokes = [word[:i] for word in words for i in range(1, len(word) + 1)]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        (await client.get("/suggest", params={"prefix": "a"})).raise_for_status()
+        first = (time.perf_counter() - start) * 1000
+
+        # Posting a listing needs an account
+        await client.post("/register", data={"username": "suggest-bench", "password": "suggest-bench"})
+        login = await client.post("/login", data={"username": "suggest-bench", "password": "suggest-bench"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        results = {"/suggest": [], "/search": []}
+        for round_ in range(args.rounds):
+            for prefix in keystrokes:
+                for path, params in (("/suggest", {"prefix": prefix}), ("/search", {"query": prefix, "limit": 10})):
+                    start = time.perf_counter()
+                    (await client.get(path, params=params)).raise_for_status()
+                    results[path].append((time.perf_counter() - start) * 1000)
+            # Writes between rounds invalidate cached prefixes
+            for i in range(args.writes):
+                listing = {
+                    "title": f"Bench lamp {round_}-{i}", "price": "5", "description": "Desk lamp",
+                    "category": "Furniture", "contact": "email:bench@usf.edu",
+                }
+                photo = ("photo.jpg", b"\xff\xd8\xff\xe0" + os.urandom(64), "image/jpeg")
+                (await client.post("/products", data=listing, files={"photo": photo}, headers=headers)).raise_for_status()
+        stats = (await client.get("/cache/stats")).json()["suggest"]
+    await main.shutdown_event()
+    await database.async_engine.dispose()
+    await database.async_read_engine.dispose()
+
+    print(f"{stats['listings']} listings, {stats['terms']} suggestion terms; first /suggest (build) {first:.0f}ms")
+    for path, samples in results.items():
+        print(f"  {path:<9} n={len(samples):<5} p50={statistics.median(samples):7.2f}ms p99={percentile(samples, 99):7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=50, help="title words typed per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--writes", type=int, default=5, help="listings created between rounds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--catalog", help="reuse (or create) the generated catalog at this path")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bullshub-suggest-")
+    try:
+        source = args.catalog or os.path.join(workdir, "catalog.db")
+        if not os.path.exists(source):
+            subprocess.run(
+                [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "catalog.py"),
+                 "--listings", str(args.listings), "--users", "10", "--out", source],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+        with sqlite3.connect(source) as conn:
+            titles = [row[0] for row in conn.execute("SELECT json_extract(api_json, '$.title') FROM products LIMIT 5000")]
+        rng = random.Random(args.seed)
+        words = [rng.choice(rng.choice(titles).split()).lower() for _ in range(args.words)]
+        db_path = os.path.join(workdir, "suggest.db")
+        shutil.copyfile(source, db_path)
+        asyncio.run(run(db_path, words, args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""End-to-end load test of the API against a synthetic catalog.
+
+Generates a catalog (benchmarks/catalog.py), then drives the real app both
+in-process through httpx's ASGI transport (framework and handler cost only)
+and through a local uvicorn over TCP, each against its own copy of the
+database. Every scenario reports throughput and p50/p95/p99 latency, and the
+whole run is written as JSON so runs can be compared:
+
+    python benchmarks/suite.py --listings 100000 --out before.json
+    python benchmarks/suite.py --listings 100000 --out after.json --compare before.json
+
+Read scenarios run first; writes (uploads, registrations, profile updates)
+bump the catalog cache and grow the tables, so they run after. bcrypt cost is
+lowered with --bcrypt-rounds by default so auth scenarios finish quickly; use
+12 to measure production cost.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import catalog  # noqa: E402
+
+MODES = ("inprocess", "uvicorn")
+READ_SCENARIOS = ("list", "item", "search")
+WRITE_SCENARIOS = ("upload", "register", "login", "profile")
+SORTS = ("recent", "price-low", "price-high", "category")
+SEARCH_TERMS = [
+    "calculus", "chem", "physics textbook", "ti-84", "macbook", "desk", "chair", "mini fridge", "hoodie",
+    "lab kit", "arduino", "tickets", "bike", "edition", "ikea", "usf", "microwave", "study guide", "ipad",
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples, errors, seconds) -> dict:
+    if not samples:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "rps": round(len(samples) / seconds, 1),
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, request, count: int, concurrency: int) -> dict:
+    """Issue `count` requests from `concurrency` workers; request(client, i) returns a response."""
+    samples, errors = [], 0
+    counter = iter(range(count))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await request(client, i)
+                ok = response.is_success
+            except httpx.HTTPError:
+                ok = False
+            samples.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, errors, time.perf_counter() - start)
+
+
+class Workload:
+    """Request factories for each scenario, over one database copy."""
+
+    def __init__(self, db_path: str, mode: str, users: int, upload_bytes: int, seed: int):
+        with sqlite3.connect(db_path) as conn:
+            self.product_ids = [row[0] for row in conn.execute("SELECT id FROM products ORDER BY random() LIMIT 5000")]
+            self.categories = [row[0] for row in conn.execute("SELECT DISTINCT category FROM products")]
+        self.mode = mode
+        self.users = users
+        self.upload_bytes = upload_bytes
+        self.rng = random.Random(seed)
+        self.tokens = []
+        self.run_id = uuid.uuid4().hex[:8]
+
+    def list(self, client, i):
+        params = {"limit": 50, "sort": self.rng.choice(SORTS)}
+        if self.categories and self.rng.random() < 0.5:
+            params["category"] = self.rng.choice(self.categories)
+        return client.get("/products", params=params)
+
+    def item(self, client, i):
+        return client.get(f"/products/{self.rng.choice(self.product_ids)}")
+
+    def search(self, client, i):
+        return client.get("/search", params={"query": self.rng.choice(SEARCH_TERMS), "limit": 50})
+
+    def upload(self, client, i):
+        listing = catalog.make_listing(self.rng, datetime.utcnow())
+        # Distinct bytes per upload, so each one is really stored rather than deduplicated
+        photo = b"\xff\xd8\xff\xe0" + os.urandom(self.upload_bytes)
+        return client.post(
+            "/products",
+            data={key: listing[key] for key in ("title", "price", "description", "category", "contact")},
+            files={"photo": ("photo.jpg", photo, "image/jpeg")},
+            headers=self.auth(i),
+        )
+
+    def register(self, client, i):
+        return client.post(
+            "/register", data={"username": f"bench-{self.mode}-{self.run_id}-{i}", "password": catalog.PASSWORD}
+        )
+
+    def login(self, client, i):
+        return client.post("/login", data={"username": f"user{i % self.users}", "password": catalog.PASSWORD})
+
+    async def log_in(self, client, count: int):
+        for i in range(min(count, self.users)):
+            response = await self.login(client, i)
+            response.raise_for_status()
+            self.tokens.append(response.json()["access_token"])
+
+    def auth(self, i) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[i % len(self.tokens)]}"}
+
+    def profile(self, client, i):
+        return client.put(
+            "/user/profile",
+            json={"bio": f"Benchmark bio {i}", "location": self.rng.choice(["Tampa", "St. Petersburg", "Sarasota"])},
+            headers=self.auth(i),
+        )
+
+
+async def run_workload(client: httpx.AsyncClient, workload: Workload, args) -> dict:
+    results = {}
+    for name in READ_SCENARIOS + WRITE_SCENARIOS:
+        if name not in args.scenarios:
+            continue
+        if name in ("upload", "profile") and not workload.tokens:
+            await workload.log_in(client, 20)
+        count = args.auth_requests if name in ("register", "login") else (
+            args.write_requests if name in WRITE_SCENARIOS else args.requests
+        )
+        results[name] = await run_scenario(client, getattr(workload, name), count, args.concurrency)
+        print(f"  {name:<9} {format_result(results[name])}")
+    return results
+
+
+def format_result(result: dict) -> str:
+    if not result.get("requests"):
+        return "no requests"
+    return (
+        f"n={result['requests']:<6} err={result['errors']:<4} {result['rps']:8.1f} req/s "
+        f"p50={result['p50_ms']:7.2f}ms p95={result['p95_ms']:7.2f}ms p99={result['p99_ms']:7.2f}ms"
+    )
+
+
+def server_env(db_path: str, workdir: str, mode: str, args) -> dict:
+    env = {
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "UPLOAD_DIR": os.path.join(workdir, f"uploads-{mode}"),
+        "ENVIRONMENT": "production",  # no per-request debug logging
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+    }
+    if not args.admission:
+        # All load comes from one client, so per-client rate limits would refuse most of it
+        env["RATE_LIMITS_ENABLED"] = "false"
+        env.update({f"{name.upper()}_MAX_CONCURRENT": "0" for name in ("search", "login", "register", "upload")})
+    return env
+
+
+async def run_inprocess(db_path: str, workdir: str, args) -> dict:
+    # Configuration is read at import time, so main is imported only now
+    os.environ.update(server_env(db_path, workdir, "inprocess", args))
+    import database
+    import main
+
+    workload = Workload(db_path, "inprocess", args.users, args.upload_bytes, args.seed)
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_workload(client, workload, args)
+    finally:
+        await main.shutdown_event()
+        await database.async_engine.dispose()
+        await database.async_read_engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(db_path: str, workdir: str, args) -> dict:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env={**os.environ, **server_env(db_path, workdir, "uvicorn", args)},
+    )
+    workload = Workload(db_path, "uvicorn", args.users, args.upload_bytes, args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError("uvicorn exited during start-up")
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            return await run_workload(client, workload, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for mode, scenarios in current["results"].items():
+        for name, result in scenarios.items():
+            before = baseline.get("results", {}).get(mode, {}).get(name)
+            if not before or not before.get("requests") or not result.get("requests"):
+                continue
+            rps = (result["rps"] / before["rps"] - 1) * 100
+            p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+            print(
+                f"  {mode:<9} {name:<9} req/s {before['rps']:8.1f} -> {result['rps']:8.1f} ({rps:+6.1f}%)   "
+                f"p95 {before['p95_ms']:7.2f} -> {result['p95_ms']:7.2f}ms ({p95:+6.1f}%)"
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--catalog", help="reuse (or create) the generated catalog at this path")
+    parser.add_argument("--mode", choices=MODES + ("both",), default="both")
+    parser.add_argument("--scenarios", default=",".join(READ_SCENARIOS + WRITE_SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="per read scenario")
+    parser.add_argument("--write-requests", type=int, default=300, help="per upload/profile scenario")
+    parser.add_argument("--auth-requests", type=int, default=100, help="per register/login scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bcrypt-rounds", type=int, default=6)
+    parser.add_argument("--upload-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--admission", action="store_true", help="keep rate limits and concurrency caps on")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON of an earlier run")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios.split(",")
+
+    workdir = tempfile.mkdtemp(prefix="bullshub-bench-")
+    try:
+        source = args.catalog or os.path.join(workdir, "catalog.db")
+        if os.path.exists(source):
+            print(f"Reusing catalog {source}")
+        else:
+            print(f"Generating {args.listings} listings and {args.users} users...")
+            # In a child process: generating imports database, which would pin DATABASE_URL here
+            subprocess.run(
+                [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "catalog.py"), "--out", source,
+                 "--listings", str(args.listings), "--users", str(args.users),
+                 "--seed", str(args.seed), "--bcrypt-rounds", str(args.bcrypt_rounds)],
+                check=True,
+            )
+        with sqlite3.connect(source) as conn:
+            listings = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            args.users = conn.execute("SELECT COUNT(*) FROM users WHERE username LIKE 'user%'").fetchone()[0]
+
+        results = {}
+        for mode in MODES if args.mode == "both" else (args.mode,):
+            db_path = os.path.join(workdir, f"{mode}.db")
+            shutil.copyfile(source, db_path)
+            print(f"{mode}:")
+            runner = run_inprocess if mode == "inprocess" else run_uvicorn
+            results[mode] = await runner(db_path, workdir, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "listings": listings,
+            "users": args.users,
+            "args": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""Image serving: the plain StaticFiles mount vs. upload_files.UploadFiles.
+
+Serves the same content-addressed files through both and reports requests per
+second for cold GETs, conditional GETs, and a simulated feed that re-renders
+--images thumbnails --renders times with a browser cache honouring
+Cache-Control (immutable files are not requested again; others revalidate).
+
+    python benchmarks/uploads.py --images 50 --size 200000
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import blob_path  # noqa: E402
+from upload_files import UploadFiles  # noqa: E402
+
+
+def make_files(directory: str, count: int, size: int):
+    paths = []
+    for i in range(count):
+        body = os.urandom(size)
+        path = blob_path(hashlib.sha256(body).hexdigest(), ".jpg")
+        os.makedirs(os.path.join(directory, os.path.dirname(path)), exist_ok=True)
+        with open(os.path.join(directory, path), "wb") as f:
+            f.write(body)
+        paths.append(path)
+    return paths
+
+
+async def rate(client, urls, headers_for=lambda url: {}):
+    start = time.perf_counter()
+    for url in urls:
+        response = await client.get(url, headers=headers_for(url))
+        assert response.status_code in (200, 206, 304), response.status_code
+    return len(urls) / (time.perf_counter() - start)
+
+
+async def feed(client, urls, renders):
+    """Re-render a feed with a minimal browser cache; returns requests sent."""
+    cache = {}
+    sent = 0
+    start = time.perf_counter()
+    for _ in range(renders):
+        for url in urls:
+            cached = cache.get(url)
+            if cached and "immutable" in cached.get("cache-control", ""):
+                continue
+            headers = {"if-none-match": cached["etag"]} if cached else {}
+            response = await client.get(url, headers=headers)
+            sent += 1
+            if response.status_code == 200:
+                cache[url] = response.headers
+    return sent, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--renders", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_files(directory, args.images, args.size)
+        app = Starlette(routes=[
+            Mount("/old", StaticFiles(directory=directory)),
+            Mount("/new", UploadFiles(directory=directory)),
+        ])
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{args.images} images x {args.size} bytes")
+            for mount in ("old", "new"):
+                urls = [f"/{mount}/{p}" for p in paths] * args.rounds
+                etags = {u: (await client.get(u)).headers["etag"] for u in set(urls)}
+                cold = await rate(client, urls)
+                conditional = await rate(client, urls, lambda u: {"if-none-match": etags[u]})
+                ranged = await rate(client, urls, lambda u: {"range": "bytes=0-65535"})
+                sent, elapsed = await feed(client, [f"/{mount}/{p}" for p in paths], args.renders)
+                print(
+                    f"{mount}: GET {cold:8.0f} req/s | 304 {conditional:8.0f} req/s | "
+                    f"range {ranged:8.0f} req/s | feed x{args.renders}: {sent} requests in {elapsed * 1000:.0f}ms"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
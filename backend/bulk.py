@@ -0,0 +1,212 @@
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+import changes
+import search
+import storage
+from catalog_cache import catalog_cache
+from catalog_snapshot import listings_changed
+from database import AsyncSessionLocal
+from models import ImageBlob, ProductDB, listing_columns, listing_json
+
+# Bulk listing import as NDJSON (one listing object per line). Exports are
+# GET /products/export, the listing stream, whose lines import back as is.
+#
+# Imports are parsed and validated line by line as the request body streams
+# in, then written BULK_IMPORT_BATCH_SIZE rows at a time: one executemany
+# INSERT for products and one for the search index, committed per batch. A
+# bad row is reported by line number and skipped; it never aborts its batch.
+# The writer connection is only held while a batch is written, not while the
+# client is still uploading.
+
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "1000"))
+BULK_IMPORT_MAX_LINE_BYTES = int(os.getenv("BULK_IMPORT_MAX_LINE_BYTES", str(64 * 1024)))
+# Only the first errors are reported back; the counts always cover every row
+MAX_REPORTED_ERRORS = 1000
+
+
+class ListingRow(BaseModel):
+    """One imported listing. Unknown keys (e.g. an exported listing's seller) are ignored."""
+    model_config = ConfigDict(coerce_numbers_to_str=True, str_strip_whitespace=True)
+
+    id: Optional[str] = Field(None, min_length=1, max_length=64)
+    title: str = Field(..., min_length=1, max_length=200)
+    price: str = Field(..., max_length=50)
+    description: str = Field("", max_length=5000)
+    category: str = Field(..., min_length=1, max_length=50)
+    image: str = Field("", max_length=2048)
+    contact: Optional[str] = Field(None, max_length=200)
+    created_at: Optional[datetime] = None
+
+
+@dataclass
+class ImportReport:
+    received: int = 0
+    inserted: int = 0
+    failed: int = 0
+    batches: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def summary(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+# (line number, product id, listing data) of a row that passed validation
+PendingRow = Tuple[int, str, dict]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Split a byte stream into (line number, line) pairs; line is None when too long."""
+    buffer = b""
+    line_no = 0
+    skipping = False  # inside a line that already overflowed
+    async for chunk in chunks:
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            line_no += 1
+            if skipping:
+                skipping = False
+                continue
+            yield line_no, (line if len(line) <= max_line_bytes else None)
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield line_no + 1, None
+                skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield line_no + 1, buffer
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def parse_row(line: bytes) -> dict:
+    """Validate one NDJSON line into listing data (plus "id"). Raises ValueError."""
+    try:
+        row = ListingRow.model_validate_json(line)
+    except ValidationError as exc:
+        raise ValueError(_validation_message(exc)) from None
+    data = row.model_dump(exclude={"id", "created_at"})
+    data["created_at"] = (row.created_at or datetime.utcnow()).isoformat()
+    data["id"] = row.id
+    return data
+
+
+def _local_image(image: str) -> bool:
+    return bool(image) and not image.startswith(("http://", "https://"))
+
+
+def insert_batch(db: Session, batch: List[PendingRow], report: ImportReport, owner_id: Optional[int]) -> int:
+    """Insert one batch of validated rows and return how many went in. The caller commits.
+
+    Rows whose id already exists, or whose image is a local path that is not a
+    stored upload, are reported and skipped.
+    """
+    ids = [product_id for _, product_id, _ in batch]
+    existing = set(db.scalars(select(ProductDB.id).where(ProductDB.id.in_(ids))))
+    digests = {storage.blob_digest(data["image"]) for _, _, data in batch if _local_image(data["image"])}
+    digests.discard(None)
+    known_blobs = set(db.scalars(select(ImageBlob.digest).where(ImageBlob.digest.in_(digests)))) if digests else set()
+
+    products, references = [], []
+    for line, product_id, data in batch:
+        if product_id in existing:
+            report.error(line, f"id {product_id} already exists")
+            continue
+        if _local_image(data["image"]):
+            digest = storage.blob_digest(data["image"])
+            if digest not in known_blobs:
+                report.error(line, "image must be a URL or an existing upload")
+                continue
+            # Each listing holds its own reference, like a regular upload
+            references.append({"digest": digest})
+        existing.add(product_id)
+        products.append((product_id, data))
+
+    if not products:
+        return 0
+    db.execute(
+        ProductDB.__table__.insert(),
+        [
+            {
+                "id": product_id, "data": json.dumps(data), "api_json": listing_json(product_id, data),
+                "owner_id": owner_id, **listing_columns(data),
+            }
+            for product_id, data in products
+        ],
+    )
+    search.add_products(db, products)
+    changes.record_changes(db, [product_id for product_id, _ in products], changes.UPSERT)
+    if references:
+        db.execute(text("UPDATE image_blobs SET refcount = refcount + 1 WHERE digest = :digest"), references)
+    return len(products)
+
+
+async def _write_batch(batch: List[PendingRow], report: ImportReport, owner_id: Optional[int]):
+    async with AsyncSessionLocal() as db:
+        inserted = await db.run_sync(insert_batch, batch, report, owner_id)
+        await db.commit()
+    report.inserted += inserted
+    report.batches += 1
+    catalog_cache.bump()
+    listings_changed()
+    changes.notifier.notify()
+
+
+async def import_listings(
+    chunks: AsyncIterator[bytes], owner_id: Optional[int], batch_size: int = BULK_IMPORT_BATCH_SIZE
+) -> ImportReport:
+    """Import an NDJSON byte stream as `owner_id`'s listings, committing every `batch_size` valid rows."""
+    report = ImportReport()
+    batch: List[PendingRow] = []
+    seen = set()  # ids in the current batch, which the database cannot see yet
+    async for line_no, line in iter_lines(chunks, BULK_IMPORT_MAX_LINE_BYTES):
+        if line is None:
+            report.received += 1
+            report.error(line_no, f"line is longer than {BULK_IMPORT_MAX_LINE_BYTES} bytes")
+            continue
+        if not line.strip():
+            continue
+        report.received += 1
+        try:
+            data = parse_row(line)
+        except ValueError as exc:
+            report.error(line_no, str(exc))
+            continue
+        product_id = data.pop("id") or str(uuid.uuid4())
+        if product_id in seen:
+            report.error(line_no, f"id {product_id} appears twice")
+            continue
+        seen.add(product_id)
+        batch.append((line_no, product_id, data))
+        if len(batch) >= batch_size:
+            await _write_batch(batch, report, owner_id)
+            batch, seen = [], set()
+    if batch:
+        await _write_batch(batch, report, owner_id)
+    return report
+
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Optional
+
+from fastapi import Request, Response
+
+from catalog_snapshot import GenerationCounter, catalog_generation
+
+# In-process read cache for catalog responses.
+#
+# Entries hold the serialized JSON body and its ETag, so a hit skips SQLite,
+# JSON decoding and pydantic validation entirely. Every catalog write bumps
+# `version`, which drops all cached lists; single items are invalidated by id.
+# Writes in other worker processes are seen through the shared generation
+# counter (catalog_snapshot.catalog_generation): when it has moved since the
+# last lookup, everything cached here is dropped. Both tables are LRUs
+# bounded by entry count and total body bytes.
+
+CATALOG_CACHE_MAX_ITEMS = int(os.getenv("CATALOG_CACHE_MAX_ITEMS", "4096"))
+CATALOG_CACHE_MAX_LISTS = int(os.getenv("CATALOG_CACHE_MAX_LISTS", "128"))
+CATALOG_CACHE_MAX_BYTES = int(os.getenv("CATALOG_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def make_etag(body: bytes) -> str:
+    # Strong validator: derived from the exact bytes sent
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class LRUCache:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        self.discard(key)
+        self._entries[key] = entry
+        self.size += len(entry.body)
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.body)
+            self.evictions += 1
+
+    def discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CatalogCache:
+    def __init__(self, shared: Optional[GenerationCounter] = None):
+        self.version = 0
+        self.shared = shared
+        self._shared_seen = shared.value() if shared is not None else 0
+        self.lists = LRUCache(CATALOG_CACHE_MAX_LISTS, CATALOG_CACHE_MAX_BYTES)
+        self.items = LRUCache(CATALOG_CACHE_MAX_ITEMS, CATALOG_CACHE_MAX_BYTES)
+        # Handlers run on the event loop and in the threadpool
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        # Caller holds the lock. A write committed by any worker moves the
+        # shared counter, and which listings it touched is not known here.
+        if self.shared is None:
+            return
+        generation = self.shared.value()
+        if generation != self._shared_seen:
+            self._shared_seen = generation
+            self.version += 1
+            self.lists.clear()
+            self.items.clear()
+
+    def bump(self, product_id: Optional[str] = None):
+        """Record a catalog write. Drops every list and, if given, one item."""
+        with self._lock:
+            self.version += 1
+            self.lists.clear()
+            if product_id is None:
+                self.items.clear()
+            else:
+                self.items.discard(product_id)
+
+    def get_list(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            self._sync()
+            return self.lists.get(key)
+
+    def get_item(self, product_id: str) -> Optional[CachedResponse]:
+        with self._lock:
+            self._sync()
+            return self.items.get(product_id)
+
+    def put_list(self, key: Hashable, entry: CachedResponse, version: int):
+        # Skip the store if a write, here or in another worker, landed while
+        # the entry was being built
+        with self._lock:
+            self._sync()
+            if version == self.version:
+                self.lists.put(key, entry)
+
+    def put_item(self, product_id: str, entry: CachedResponse, version: int):
+        with self._lock:
+            self._sync()
+            if version == self.version:
+                self.items.put(product_id, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._sync()
+            return {"version": self.version, "lists": self.lists.stats(), "items": self.items.stats()}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def cached_json_response(request: Request, entry: CachedResponse) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **entry.headers}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+catalog_cache = CatalogCache(catalog_generation)
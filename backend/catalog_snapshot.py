@@ -0,0 +1,336 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, text
+
+import changes
+import sellers
+from database import read_engine
+from models import ProductDB
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+# Read-only catalog snapshot shared by every worker through mmap.
+#
+# The snapshot is one file: a header, a fixed-width index sorted by product
+# id, the ids, and every listing's api_json with its seller spliced in, laid
+# out as a complete JSON array (the unfiltered GET /products body). An item is
+# a slice of that array, so reads are zero-copy and the pages are shared
+# across processes instead of each worker caching its own copy. A seller's
+# rename retires the snapshot like any listing write.
+#
+# Freshness comes from a shared 8-byte generation counter, also mmapped. A
+# writer bumps it after committing a listing change; a snapshot records the
+# counter value read before its build began, and is only served while that
+# value is current. The counter exists even with snapshots turned off: every
+# worker's catalog_cache drops its entries when it moves. A stale, missing or
+# damaged snapshot makes readers fall back to the database and starts a
+# rebuild, which a file lock limits to one process at a time.
+# The new file replaces the old one with an atomic rename; readers notice the
+# new inode on their next request and remap.
+
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", "on").lower() not in ("0", "off", "false", "no")
+# Writes within this window share one rebuild
+CATALOG_SNAPSHOT_DEBOUNCE_SECONDS = float(os.getenv("CATALOG_SNAPSHOT_DEBOUNCE_SECONDS", "0.05"))
+
+MAGIC = b"BHSNAP01"
+# magic, generation, change seq, listing count, ids offset, array offset, array length, ETag digest (hex)
+HEADER = struct.Struct("<8sQQQQQQ32s")
+# id offset, record offset, record length, id length
+ENTRY = struct.Struct("<QQIH2x")
+COUNTER = struct.Struct("<Q")
+
+
+def _lock(fd: int, blocking: bool = True) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class Snapshot:
+    """One mapped snapshot file. Never modified; replaced files keep old mappings valid."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        magic, self.generation, self.change_seq, self.count, self._ids_offset, array_offset, array_len, digest = (
+            HEADER.unpack_from(self._mm)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        # The array ends the file, so a short file would serve cut-off JSON
+        if self._ids_offset != HEADER.size + self.count * ENTRY.size or array_offset + array_len != len(self._mm):
+            raise ValueError(f"{path} is truncated")
+        self._view = memoryview(self._mm)
+        self._array = self._view[array_offset:array_offset + array_len]
+        self.etag = '"' + digest.decode() + '"'
+
+    def listing_array(self) -> memoryview:
+        """Every listing as one JSON array, in database order."""
+        return self._array
+
+    def get(self, product_id: str) -> Optional[memoryview]:
+        """One listing's JSON, found by binary search over the id index."""
+        key = product_id.encode()
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            id_offset, record_offset, record_len, id_len = ENTRY.unpack_from(self._mm, HEADER.size + mid * ENTRY.size)
+            candidate = self._mm[id_offset:id_offset + id_len]
+            if candidate < key:
+                low = mid + 1
+            elif candidate > key:
+                high = mid
+            else:
+                return self._view[record_offset:record_offset + record_len]
+        return None
+
+
+def write_snapshot(path: str, generation: int, change_seq: int, rows) -> int:
+    """Write (id, api_json) rows to a new snapshot at `path`, atomically. Returns the count."""
+    directory = os.path.dirname(os.path.abspath(path))
+    prefix = os.path.basename(path) + "."
+    digest = hashlib.blake2b(digest_size=16)
+    entries: List[Tuple[bytes, int, int]] = []  # (id, offset within the array, length)
+    with tempfile.TemporaryFile(dir=directory) as body:
+        # The array is written first, to a scratch file, since the index in
+        # front of it can only be sized once every row has been seen
+        position = 0
+
+        def emit(chunk: bytes):
+            nonlocal position
+            body.write(chunk)
+            digest.update(chunk)
+            position += len(chunk)
+
+        emit(b"[")
+        for product_id, api_json in rows:
+            if entries:
+                emit(b",")
+            record = api_json.encode()
+            entries.append((product_id.encode(), position, len(record)))
+            emit(record)
+        emit(b"]")
+
+        entries.sort()
+        ids_offset = HEADER.size + len(entries) * ENTRY.size
+        array_offset = ids_offset + sum(len(product_id) for product_id, _, _ in entries)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(HEADER.pack(
+                    MAGIC, generation, change_seq, len(entries), ids_offset, array_offset, position,
+                    digest.hexdigest().encode(),
+                ))
+                id_offset = ids_offset
+                for product_id, offset, length in entries:
+                    out.write(ENTRY.pack(id_offset, array_offset + offset, length, len(product_id)))
+                    id_offset += len(product_id)
+                for product_id, _, _ in entries:
+                    out.write(product_id)
+                body.seek(0)
+                while chunk := body.read(1024 * 1024):
+                    out.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return len(entries)
+
+
+class GenerationCounter:
+    """An 8-byte counter in a small mmapped file, shared by every process that maps it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._map = None
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def _counter_map(self) -> mmap.mmap:
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    if os.fstat(fd).st_size < COUNTER.size:
+                        os.ftruncate(fd, COUNTER.size)
+                    self._fd = fd
+                    self._map = mmap.mmap(fd, COUNTER.size)
+        return self._map
+
+    def value(self) -> int:
+        return COUNTER.unpack_from(self._counter_map())[0]
+
+    def increment(self):
+        counter = self._counter_map()
+        _lock(self._fd)
+        try:
+            COUNTER.pack_into(counter, 0, COUNTER.unpack_from(counter)[0] + 1)
+        finally:
+            _unlock(self._fd)
+
+
+class CatalogSnapshots:
+    def __init__(self, path: str, bind, counter: GenerationCounter):
+        self.path = path
+        self.bind = bind
+        self.counter = counter
+        self._snapshot: Optional[Snapshot] = None
+        # (inode, mtime) of a file that failed to map, so it is not retried on every request
+        self._unreadable: Optional[Tuple[int, int]] = None
+        self._wanted = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.last_build_seconds = 0.0
+
+    def generation(self) -> int:
+        return self.counter.value()
+
+    def changed(self):
+        """Record a committed listing write: every worker stops serving the current snapshot."""
+        self.counter.increment()
+        self._wanted.set()
+
+    def current(self) -> Optional[Snapshot]:
+        """The mapped snapshot if it reflects every committed write, else None (read the database)."""
+        required = self.generation()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation >= required:
+            return snapshot
+        snapshot = self._remap()
+        if snapshot is not None and snapshot.generation >= required:
+            return snapshot
+        self._request_rebuild()
+        return None
+
+    def _remap(self) -> Optional[Snapshot]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if self._snapshot is None or self._snapshot.identity != identity:
+                if identity == self._unreadable:
+                    return None
+                try:
+                    # The previous mapping is released once in-flight responses drop their views
+                    self._snapshot = Snapshot(self.path)
+                except (OSError, ValueError) as e:
+                    # Treated as missing: readers use the database and the next rebuild replaces it
+                    self._unreadable = identity
+                    print(f"Catalog snapshot unreadable: {e}")
+                    return None
+            return self._snapshot
+
+    def _request_rebuild(self):
+        self._wanted.set()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._rebuild_loop, name="catalog-snapshot", daemon=True)
+                self._thread.start()
+
+    def _rebuild_loop(self):
+        while True:
+            self._wanted.wait()
+            time.sleep(CATALOG_SNAPSHOT_DEBOUNCE_SECONDS)
+            self._wanted.clear()
+            try:
+                if self.rebuild() is None:
+                    # Another process is building; check again once it is likely done
+                    self._wanted.set()
+                    time.sleep(max(0.25, self.last_build_seconds))
+            except Exception as e:
+                print(f"Catalog snapshot rebuild failed: {e}")
+
+    def start(self):
+        """Rebuild at startup if listings changed while no server was running (seed.py, migrations)."""
+        snapshot = self._remap()
+        with self.bind.connect() as conn:
+            change_seq = changes.latest_seq(conn)
+        if snapshot is None or snapshot.change_seq != change_seq:
+            self.changed()
+        # The rebuild thread also serves this worker's own writes from now on
+        self._request_rebuild()
+
+    def rebuild(self) -> Optional[bool]:
+        """Build a snapshot if the mapped one is stale. None if another process holds the build lock."""
+        fd = os.open(self.path + "-lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not _lock(fd, blocking=False):
+                return None
+            generation = self.generation()
+            if self._remap() is not None and self._snapshot.generation >= generation:
+                return False
+            start = time.perf_counter()
+            with self.bind.connect() as conn:
+                # One read transaction, so the listings and the change seq agree
+                change_seq = changes.latest_seq(conn)
+                # Listings carry their seller, like every other catalog read
+                stmt = sellers.join_sellers(select(ProductDB.id, ProductDB.api_json)).order_by(text("products.rowid"))
+                rows = sellers.joined_fragments(conn.execute(stmt))
+                count = write_snapshot(self.path, generation, change_seq, rows)
+            self.rebuilds += 1
+            self.last_build_seconds = time.perf_counter() - start
+            print(f"Catalog snapshot {generation} written: {count} listings in {self.last_build_seconds:.2f}s")
+            return True
+        finally:
+            os.close(fd)
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "generation": self.generation(),
+            "mapped_generation": snapshot.generation if snapshot else None,
+            "listings": snapshot.count if snapshot else None,
+            "rebuilds": self.rebuilds,
+            "last_build_seconds": round(self.last_build_seconds, 3),
+        }
+
+
+def create_counter(database_path: Optional[str], suffix: str = ".snapshot-gen") -> Optional[GenerationCounter]:
+    # An in-memory database lives in one process, which needs no shared counter
+    if not database_path or database_path == ":memory:":
+        return None
+    return GenerationCounter(database_path + suffix)
+
+
+def create_snapshots(database_path: Optional[str], bind, counter: Optional[GenerationCounter]) -> Optional[CatalogSnapshots]:
+    if not CATALOG_SNAPSHOT or counter is None:
+        return None
+    return CatalogSnapshots(database_path + ".snapshot", bind, counter)
+
+
+catalog_generation = create_counter(read_engine.url.database)
+catalog_snapshots = create_snapshots(read_engine.url.database, read_engine, catalog_generation)
+
+
+def listings_changed():
+    """Call after committing any listing insert, update or delete."""
+    if catalog_snapshots is not None:
+        catalog_snapshots.changed()
+    elif catalog_generation is not None:
+        catalog_generation.increment()
@@ -0,0 +1,212 @@
+"""Listing change feed.
+
+Every listing write appends (seq, product_id, op) to product_changes in the
+same transaction, so a client holding the last seq it saw can fetch only
+what changed since: the latest upsert (with the listing) or tombstone per
+product. `since=0` replays the whole catalog.
+
+Compaction drops entries superseded by a later one for the same product,
+which never changes what the feed returns, and tombstones older than
+CHANGE_LOG_TOMBSTONE_DAYS. The seq of the newest dropped tombstone is kept
+as a watermark; cursors below it get 410 and must resync from scratch.
+
+    cd backend && python changes.py      # compact once
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+
+CHANGE_FEED_MAX_LIMIT = 1000
+CHANGE_LOG_TOMBSTONE_DAYS = float(os.getenv("CHANGE_LOG_TOMBSTONE_DAYS", "30"))
+CHANGE_LOG_COMPACT_INTERVAL_SECONDS = float(os.getenv("CHANGE_LOG_COMPACT_INTERVAL_SECONDS", "3600"))
+# SSE streams re-check the log this often even without a local notification
+CHANGE_STREAM_POLL_SECONDS = float(os.getenv("CHANGE_STREAM_POLL_SECONDS", "15"))
+COMPACT_BATCH_SIZE = 10000
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+def record_changes(db, product_ids: Iterable[str], op: str):
+    """Append one entry per product. The caller commits, with the listing write."""
+    now = datetime.utcnow()
+    params = [{"product_id": product_id, "op": op, "created_at": now} for product_id in product_ids]
+    if params:
+        db.execute(
+            text("INSERT INTO product_changes (product_id, op, created_at) VALUES (:product_id, :op, :created_at)"),
+            params,
+        )
+
+
+def record_change(db, product_id: str, op: str):
+    record_changes(db, [product_id], op)
+
+
+def compacted_through(db) -> int:
+    return db.execute(text("SELECT compacted_through FROM change_log_state WHERE id = 1")).scalar() or 0
+
+
+def latest_seq(db) -> int:
+    """The feed head, which X-Change-Seq reports. Compaction can delete the
+    newest entries (tombstones), so it never goes below the watermark."""
+    return db.execute(
+        text(
+            "SELECT MAX(COALESCE((SELECT MAX(seq) FROM product_changes), 0), "
+            "COALESCE((SELECT compacted_through FROM change_log_state WHERE id = 1), 0))"
+        )
+    ).scalar()
+
+
+def _entry(seq: int, op: str, product_id: str, listing: Optional[str]) -> str:
+    # Listings are embedded as their stored api_json, not re-encoded
+    head = f'{{"seq":{seq},"op":"{op}","product_id":{json.dumps(product_id)}'
+    return head + (f',"product":{listing}}}' if listing is not None else "}")
+
+
+def latest_changes(db, since: int, limit: int) -> List[Tuple[int, str, Optional[str]]]:
+    """(seq, product_id, api_json) of each product's latest entry after `since`, in seq order.
+
+    api_json is None when the product is gone (a tombstone, or an upsert
+    whose listing has since been deleted).
+    """
+    return db.execute(
+        text(
+            "SELECT c.seq, c.product_id, p.api_json FROM product_changes c "
+            "LEFT JOIN products p ON c.op = :upsert AND p.id = c.product_id "
+            "WHERE c.seq > :since "
+            "AND c.seq = (SELECT MAX(seq) FROM product_changes WHERE product_id = c.product_id) "
+            "ORDER BY c.seq LIMIT :n"
+        ),
+        {"upsert": UPSERT, "since": since, "n": limit},
+    ).all()
+
+
+def changes_since(db, since: int, limit: int) -> Tuple[List[str], int, bool]:
+    """Serialized feed entries after `since`: ([entry JSON], next cursor, more to fetch).
+
+    Only each product's latest entry is returned; an upsert whose listing is
+    gone is reported as a tombstone.
+    """
+    rows = latest_changes(db, since, limit + 1)
+    more = len(rows) > limit
+    rows = rows[:limit]
+    entries = [
+        _entry(seq, UPSERT if listing is not None else DELETE, product_id, listing)
+        for seq, product_id, listing in rows
+    ]
+    return entries, (rows[-1][0] if rows else since), more
+
+
+def feed_body(entries: List[str], next_seq: int, more: bool) -> bytes:
+    return ('{"changes":[' + ",".join(entries) + f'],"next":{next_seq},"more":{"true" if more else "false"}}}').encode()
+
+
+def compact(db: Session, tombstone_days: float = CHANGE_LOG_TOMBSTONE_DAYS) -> dict:
+    """Drop superseded entries and old tombstones, in seq batches. Commits as it goes."""
+    superseded = 0
+    top = latest_seq(db)
+    low = 0
+    while low < top:
+        high = low + COMPACT_BATCH_SIZE
+        superseded += db.execute(
+            text(
+                "DELETE FROM product_changes WHERE seq > :low AND seq <= :high "
+                "AND seq < (SELECT MAX(seq) FROM product_changes c WHERE c.product_id = product_changes.product_id)"
+            ),
+            {"low": low, "high": high},
+        ).rowcount
+        db.commit()
+        low = high
+
+    cutoff = datetime.utcnow() - timedelta(days=tombstone_days)
+    watermark = db.execute(
+        text("SELECT MAX(seq) FROM product_changes WHERE op = :delete AND created_at < :cutoff"),
+        {"delete": DELETE, "cutoff": cutoff},
+    ).scalar()
+    tombstones = 0
+    if watermark is not None:
+        tombstones = db.execute(
+            text("DELETE FROM product_changes WHERE op = :delete AND seq <= :watermark"),
+            {"delete": DELETE, "watermark": watermark},
+        ).rowcount
+        db.execute(
+            text("UPDATE change_log_state SET compacted_through = MAX(compacted_through, :watermark) WHERE id = 1"),
+            {"watermark": watermark},
+        )
+    db.commit()
+    return {"superseded": superseded, "tombstones": tombstones, "compacted_through": compacted_through(db)}
+
+
+class ChangeNotifier:
+    """Wakes SSE streams in this process after a listing write commits.
+
+    Writes from other processes are picked up by the streams' periodic poll.
+    notify() may be called from any thread.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def subscribe(self) -> Tuple[asyncio.AbstractEventLoop, asyncio.Event]:
+        subscription = (asyncio.get_running_loop(), asyncio.Event())
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscribers.discard(subscription)
+
+    def notify(self):
+        for loop, event in list(self._subscribers):
+            loop.call_soon_threadsafe(event.set)
+
+
+async def wait_for_change(subscription, timeout: float) -> bool:
+    """Wait until notified (True) or `timeout` passes (False), then re-arm.
+
+    Clear happens after waking, so a notify that lands while the caller is
+    still querying is not lost.
+    """
+    event = subscription[1]
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        event.clear()
+
+
+notifier = ChangeNotifier()
+
+
+async def compact_periodically(interval: float = CHANGE_LOG_COMPACT_INTERVAL_SECONDS):
+    def run():
+        db = SessionLocal()
+        try:
+            return compact(db)
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await run_in_threadpool(run)
+            print(f"Change log compacted: {result}")
+        except Exception as e:
+            print(f"Change log compaction failed: {e}")
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(compact(db))
+    finally:
+        db.close()
@@ -1,17 +1,124 @@
-from sqlalchemy import create_engine
+from dataclasses import dataclass
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+from typing import Optional, Tuple
 
 # Create the database in the same directory as the script
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'users.db')}"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'users.db')}"
 )
+# Same database through the aiosqlite driver, for async endpoints
+ASYNC_SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+@dataclass
+class EngineProfile:
+    """SQLite connection settings, applied to every new connection.
+
+    WAL lets readers keep going while a write is in progress, and
+    synchronous=NORMAL is durable under WAL except on power loss. Writer
+    engines hold a single connection that starts transactions with BEGIN
+    IMMEDIATE, so writers queue on busy_timeout instead of failing on lock
+    upgrade. Reader engines keep a pool of query_only connections, so read
+    routes never wait for the write lock.
+    """
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size_kib: int = 64 * 1024
+    read_pool_size: int = 8
+
+    @classmethod
+    def from_env(cls) -> "EngineProfile":
+        return cls(
+            journal_mode=os.getenv("SQLITE_JOURNAL_MODE", cls.journal_mode),
+            synchronous=os.getenv("SQLITE_SYNCHRONOUS", cls.synchronous),
+            busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", cls.busy_timeout_ms)),
+            mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", cls.mmap_size)),
+            cache_size_kib=int(os.getenv("SQLITE_CACHE_SIZE_KIB", cls.cache_size_kib)),
+            read_pool_size=int(os.getenv("DB_READ_POOL_SIZE", cls.read_pool_size)),
+        )
+
+    def pragmas(self, read_only: bool):
+        statements = [
+            f"PRAGMA journal_mode = {self.journal_mode}",
+            f"PRAGMA synchronous = {self.synchronous}",
+            f"PRAGMA busy_timeout = {self.busy_timeout_ms}",
+            f"PRAGMA mmap_size = {self.mmap_size}",
+            # Negative cache_size is in KiB rather than pages
+            f"PRAGMA cache_size = -{self.cache_size_kib}",
+        ]
+        if read_only:
+            statements.append("PRAGMA query_only = ON")
+        return statements
+
+
+def configure_sqlite_engine(sync_engine, profile: EngineProfile, read_only: bool = False):
+    """Install the profile's connect/begin hooks on a (sync) Engine."""
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Take over transaction control from the driver so BEGIN can be chosen below
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for statement in profile.pragmas(read_only):
+            cursor.execute(statement)
+        cursor.close()
+
+    @event.listens_for(sync_engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+
+def _pool_args(profile: EngineProfile, read_only: bool) -> dict:
+    if read_only:
+        return {"pool_size": profile.read_pool_size, "max_overflow": 0}
+    return {"pool_size": 1, "max_overflow": 0}
+
+
+def create_sqlite_engine(url: str, profile: EngineProfile, read_only: bool = False):
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        **_pool_args(profile, read_only),
+    )
+    configure_sqlite_engine(engine, profile, read_only)
+    return engine
+
+
+def create_async_sqlite_engine(url: str, profile: EngineProfile, read_only: bool = False):
+    # Pool explicitly: older SQLAlchemy releases default aiosqlite to NullPool,
+    # which would reconnect (and re-run the pragmas) on every checkout
+    engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, **_pool_args(profile, read_only))
+    configure_sqlite_engine(engine.sync_engine, profile, read_only)
+    return engine
+
+
+engine_profile = EngineProfile.from_env()
+
+# Writer: a single connection
+engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL, engine_profile)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Readers: pooled, query_only connections
+read_engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL, engine_profile, read_only=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# aiosqlite runs each connection on its own thread, so queries never block the
+# event loop. expire_on_commit=False lets handlers read objects after commit
+# without an implicit (and, under asyncio, illegal) lazy refresh.
+async_engine = create_async_sqlite_engine(ASYNC_SQLALCHEMY_DATABASE_URL, engine_profile)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async_read_engine = create_async_sqlite_engine(ASYNC_SQLALCHEMY_DATABASE_URL, engine_profile, read_only=True)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -20,3 +127,34 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+def schema_revisions(bind=None) -> Tuple[Optional[str], str]:
+    """(current, head) Alembic revisions; current is None for an unmigrated database."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    head = ScriptDirectory.from_config(config).get_current_head()
+    try:
+        with (bind or engine).connect() as conn:
+            current = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except OperationalError:
+        current = None
+    return current, head
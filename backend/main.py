@@ -1,28 +1,47 @@
 import models
-from database import Base, engine, SessionLocal, get_db
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, status, Request
+from database import Base, engine, SessionLocal, ReadSessionLocal, schema_revisions, AsyncSessionLocal, AsyncReadSessionLocal, get_db, get_async_db, get_async_read_db
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, Query, status, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, JSON
+from sqlalchemy import create_engine, Column, Integer, String, JSON, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
+import asyncio
 import json
 import uuid
 import os
-from fastapi.staticfiles import StaticFiles
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from datetime import timedelta, datetime
 import models as models
 import database as database
 from database import engine, get_db
-from models import User, ProductDB
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+from models import User, ProductDB, Message
+import search
+import bulk
+import messaging
+import changes
+import passwords
+import storage
+import metrics
+import admission
+import similar
+import suggest
+import sellers
+from seed import seed_demo_products
+from upload_files import UploadFiles
+from auth_cache import UserSnapshot, token_cache
+from pagination import keyset_page, keyset_query
+from catalog_cache import CachedResponse, cached_json_response, catalog_cache, make_etag
+from catalog_snapshot import catalog_snapshots, listings_changed
+
+# The schema is managed by Alembic (`alembic upgrade head`); importing the app
+# never touches the database.
 
 app = FastAPI()
 
@@ -33,22 +52,9 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# JWT configuration
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# JWT configuration (password hashing lives in passwords.py)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-# Add request logging middleware (only in development)
-if ENVIRONMENT == "development":
-    class LoggingMiddleware(BaseHTTPMiddleware):
-        async def dispatch(self, request: Request, call_next):
-            print(f"Incoming request: {request.method} {request.url}")
-            print(f"Headers: {dict(request.headers)}")
-            response = await call_next(request)
-            print(f"Response status: {response.status_code}")
-            return response
-
-    app.add_middleware(LoggingMiddleware)
-
 # Enable CORS - more flexible for deployment
 allowed_origins = [
     "http://localhost:5173", 
@@ -62,18 +68,46 @@ allowed_origins = [
 if FRONTEND_URL and FRONTEND_URL not in allowed_origins:
     allowed_origins.append(FRONTEND_URL)
 
+# Oversized photo uploads get 413 before their body is read or spooled to disk
+app.add_middleware(storage.UploadSizeLimitMiddleware)
+
+# Concurrency caps and per-client rate limits for the expensive routes. Added
+# before CORS so its 429/503 responses still carry CORS headers.
+app.add_middleware(admission.AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Change-Seq", "ETag"],
 )
 
+# Per-route latency, size and SQL metrics for /metrics. Added last so it is the
+# outermost middleware and times everything else; in development it also logs
+# one line per request.
+app.add_middleware(metrics.MetricsMiddleware, log_requests=ENVIRONMENT == "development")
+for sync_engine in (
+    database.engine, database.read_engine, database.async_engine.sync_engine, database.async_read_engine.sync_engine
+):
+    metrics.instrument_engine(sync_engine)
+metrics.register_gauge("password_pool_in_flight", "bcrypt calls queued or running.", lambda: passwords.password_pool.in_flight)
+metrics.register_gauge("password_pool_rejected", "bcrypt calls rejected with 503 since start.", lambda: passwords.password_pool.rejected)
+metrics.register_gauge("password_pool_restarts", "bcrypt pools replaced after a worker died.", lambda: passwords.password_pool.restarts)
+metrics.register_gauge("catalog_cache_version", "Catalog cache generation.", lambda: catalog_cache.version)
+
 # Create uploads directory if it doesn't exist
-os.makedirs("uploads", exist_ok=True)
+os.makedirs(storage.UPLOAD_DIR, exist_ok=True)
 
-# Pydantic model for API
+# A listing's seller, as sellers.seller_json() serializes it
+class SellerSummary(BaseModel):
+    id: int
+    username: str
+    full_name: Optional[str] = None
+
+# Pydantic model for API. Read routes return listings pre-serialized by
+# models.listing_json(), which must produce exactly this schema.
 class Product(BaseModel):
     id: str
     title: str
@@ -84,10 +118,17 @@ class Product(BaseModel):
     contact: Optional[str] = None
     email: Optional[str] = None
     instagram: Optional[str] = None
+    # Stored as null and filled in by every listing route except the change
+    # feed, see sellers.py
+    seller: Optional[SellerSummary] = None
 
     class Config:
         from_attributes = True
 
+def listing_array(fragments) -> bytes:
+    """A JSON array of stored listing_json() fragments, built without re-encoding them."""
+    return ("[" + ",".join(fragments) + "]").encode()
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -100,179 +141,310 @@ def get_db():
 async def root():
     return {"message": "Hello World"}
 
+# Sort orders accepted by GET /products; names match the frontend's sortBy values.
+# Each maps to (columns, descending) and ends with the primary key so the order
+# is total, which keyset pagination relies on.
+PRODUCT_SORTS = {
+    "recent": ((ProductDB.created_at, ProductDB.id), True),
+    "price-low": ((ProductDB.price_cents, ProductDB.id), False),
+    "price-high": ((ProductDB.price_cents, ProductDB.id), True),
+    "category": ((ProductDB.category, ProductDB.id), False),
+}
+ProductSort = Literal["recent", "price-low", "price-high", "category"]
+
+def dollars_to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+def filter_products(stmt, category: Optional[str], min_price: Optional[float], max_price: Optional[float]):
+    if category:
+        stmt = stmt.where(ProductDB.category == category.strip().lower())
+    if min_price is not None:
+        stmt = stmt.where(ProductDB.price_cents >= dollars_to_cents(min_price))
+    if max_price is not None:
+        stmt = stmt.where(ProductDB.price_cents <= dollars_to_cents(max_price))
+    return stmt
+
+def order_products(stmt, sort: str):
+    columns, descending = PRODUCT_SORTS[sort]
+    return stmt.order_by(*[c.desc() if descending else c.asc() for c in columns])
+
+# Defined ahead of the routes that take it as a dependency
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_read_db)):
+    return await user_from_token(token, db)
+
+async def user_from_token(token: str, db: AsyncSession) -> UserSnapshot:
+    # A token verified in the last few seconds skips JWT decoding and the user query
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+    except JWTError:
+        raise credentials_exception
+    version = token_cache.current_version()
+    user = await find_user(db, username)
+    if user is None:
+        raise credentials_exception
+    snapshot = UserSnapshot.from_user(user)
+    token_cache.put(token, snapshot, payload.get("exp"), version)
+    return snapshot
+
 @app.get("/products", response_model=List[Product])
-async def get_products(db: Session = Depends(get_db)):
-    products = db.query(ProductDB).all()
-    result = []
-    for p in products:
-        data = json.loads(p.data)
-        if 'contact' not in data:
-            # Old format: combine email and instagram into contact
-            contact = f"email:{data.get('email', '')}" if data.get('email') else f"instagram:{data.get('instagram', '')}"
-            data['contact'] = contact
-        result.append(Product(id=p.id, **data))
-    return result
+async def get_products(
+    request: Request,
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort: Optional[ProductSort] = None,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    if category is None and min_price is None and max_price is None and sort is None and limit is None and after is None:
+        # The whole catalog is one slice of the shared snapshot, while it is current
+        snapshot = catalog_snapshots.current() if catalog_snapshots else None
+        if snapshot is not None:
+            return cached_json_response(request, CachedResponse(
+                body=snapshot.listing_array(), etag=snapshot.etag, headers={"X-Change-Seq": str(snapshot.change_seq)}
+            ))
+    key = (category, min_price, max_price, sort, limit, after)
+    entry = catalog_cache.get_list(key)
+    if entry is None:
+        version = catalog_cache.version
+        # Read in the same transaction as the listings: a client can continue
+        # from this snapshot with GET /products/changes?since=<X-Change-Seq>
+        headers = {"X-Change-Seq": str(await db.run_sync(changes.latest_seq))}
+        # Rows are stored pre-serialized, so a response is a join of api_json fragments
+        stmt = filter_products(select(ProductDB.id, ProductDB.api_json), category, min_price, max_price)
+        if limit is None and after is None:
+            stmt = sellers.join_sellers(stmt)
+            if sort:
+                stmt = order_products(stmt, sort)
+            fragments = [fragment for _, fragment in sellers.joined_fragments(await db.execute(stmt))]
+        else:
+            # Paginated: the cursor for the next page goes in X-Next-Cursor
+            page_sort = sort or "recent"
+            page_size = limit or 50
+            columns, descending = PRODUCT_SORTS[page_sort]
+            stmt = keyset_query(
+                stmt.add_columns(ProductDB.owner_id, *columns), page_sort, columns, descending, page_size, after
+            )
+            rows, next_cursor = keyset_page((await db.execute(stmt)).all(), page_sort, columns, page_size)
+            fragments = await sellers.with_sellers(db, [(row.api_json, row.owner_id) for row in rows])
+            if next_cursor:
+                headers["X-Next-Cursor"] = next_cursor
+        body = listing_array(fragments)
+        entry = CachedResponse(body=body, etag=make_etag(body), headers=headers)
+        catalog_cache.put_list(key, entry, version)
+    return cached_json_response(request, entry)
+
+@app.get("/products/stream")
+def stream_products(
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort: ProductSort = "recent",
+):
+    # The one NDJSON listing stream; /products/export is this, unfiltered.
+    # Dependencies are torn down before a streaming body is sent, so the
+    # generator owns its session: one read transaction, so the lines are a
+    # consistent catalog, and yield_per keeps only one batch in memory.
+    def lines():
+        db = ReadSessionLocal()
+        try:
+            stmt = filter_products(select(ProductDB.id, ProductDB.api_json), category, min_price, max_price)
+            stmt = order_products(sellers.join_sellers(stmt), sort)
+            rows = db.execute(stmt.execution_options(yield_per=500))
+            for _, fragment in sellers.joined_fragments(rows):
+                yield fragment + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/products/import")
+async def import_products(
+    request: Request,
+    batch_size: int = Query(bulk.BULK_IMPORT_BATCH_SIZE, ge=1, le=10000),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    # NDJSON body, one listing per line; rows are validated and written as they
+    # arrive, and every imported listing belongs to the importing user
+    report = await bulk.import_listings(request.stream(), current_user.id, batch_size)
+    return report.summary()
+
+@app.get("/products/export")
+def export_products():
+    # Every listing as a download; POST /products/import accepts the lines back
+    response = stream_products(category=None, min_price=None, max_price=None, sort="recent")
+    response.headers["Content-Disposition"] = 'attachment; filename="listings.ndjson"'
+    return response
+
+def check_change_cursor(db, since: int):
+    # since=0 is a full replay, which compaction never breaks
+    if since and since < changes.compacted_through(db):
+        raise HTTPException(status_code=410, detail="Change log compacted past this cursor; resync with since=0")
+
+@app.get("/products/changes")
+async def get_product_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=changes.CHANGE_FEED_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # Latest upsert (with the listing) or tombstone per product changed after `since`
+    await db.run_sync(check_change_cursor, since)
+    entries, next_seq, more = await db.run_sync(changes.changes_since, since, limit)
+    return Response(changes.feed_body(entries, next_seq, more), media_type="application/json")
+
+@app.get("/products/changes/stream")
+async def stream_product_changes(request: Request, since: int = Query(0, ge=0)):
+    # Server-Sent Events of the same feed. EventSource reconnects with the
+    # last event id, which is the feed cursor.
+    last_event_id = request.headers.get("last-event-id", "")
+    cursor = int(last_event_id) if last_event_id.isdigit() else since
+    async with AsyncReadSessionLocal() as db:
+        await db.run_sync(check_change_cursor, cursor)
+
+    async def events():
+        nonlocal cursor
+        subscription = changes.notifier.subscribe()
+        try:
+            while True:
+                async with AsyncReadSessionLocal() as db:
+                    entries, next_seq, more = await db.run_sync(
+                        changes.changes_since, cursor, changes.CHANGE_FEED_MAX_LIMIT
+                    )
+                if entries:
+                    cursor = next_seq
+                    body = changes.feed_body(entries, next_seq, more).decode()
+                    yield f"id: {next_seq}\nevent: changes\ndata: {body}\n\n"
+                    if more:
+                        continue
+                if not await changes.wait_for_change(subscription, changes.CHANGE_STREAM_POLL_SECONDS):
+                    yield ": keepalive\n\n"
+        finally:
+            changes.notifier.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str, db: Session = Depends(get_db)):
-    product = db.query(ProductDB).filter(ProductDB.id == product_id).first()
-    if product is None:
+async def get_product(product_id: str, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    snapshot = catalog_snapshots.current() if catalog_snapshots else None
+    if snapshot is not None:
+        fragment = snapshot.get(product_id)
+        if fragment is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return cached_json_response(request, CachedResponse(body=fragment, etag=make_etag(fragment)))
+    entry = catalog_cache.get_item(product_id)
+    if entry is None:
+        version = catalog_cache.version
+        row = (await db.execute(
+            sellers.join_sellers(select(ProductDB.id, ProductDB.api_json)).where(ProductDB.id == product_id)
+        )).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        _, fragment = next(sellers.joined_fragments([row]))
+        body = fragment.encode()
+        entry = CachedResponse(body=body, etag=make_etag(body))
+        catalog_cache.put_item(product_id, entry, version)
+    return cached_json_response(request, entry)
+
+@app.get("/products/{product_id}/similar", response_model=List[Product])
+async def similar_products(
+    product_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # The index catches up from the change log, then scores in memory; both block
+    ids = await run_in_threadpool(similar.similar_listings, product_id, limit)
+    if ids is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return Product(id=product.id, **json.loads(product.data))
+    if not ids:
+        return []
+    rows = await db.execute(
+        select(ProductDB.id, ProductDB.api_json, ProductDB.owner_id).where(ProductDB.id.in_(ids))
+    )
+    by_id = {row.id: (row.api_json, row.owner_id) for row in rows}
+    fragments = await sellers.with_sellers(db, [by_id[i] for i in ids if i in by_id])
+    return Response(listing_array(fragments), media_type="application/json")
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        **catalog_cache.stats(),
+        "snapshot": catalog_snapshots.stats() if catalog_snapshots else None,
+        "similar": similar.similar_index.stats(),
+        "suggest": suggest.suggest_index.stats(),
+    }
 
 @app.get("/search", response_model=List[Product])
-async def search_products(query: Optional[str] = None, db: Session = Depends(get_db)):
+async def search_products(
+    query: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     try:
         if query:
-            # Get all products and filter in Python since JSON filtering can be unreliable in SQLite
-            all_products = db.query(ProductDB).all()
-            filtered_products = []
-            
-            for product in all_products:
-                try:
-                    data = json.loads(product.data)
-                    # Search in title, description, and category
-                    search_text = f"{data.get('title', '')} {data.get('description', '')} {data.get('category', '')}".lower()
-                    if query.lower() in search_text:
-                        filtered_products.append(Product(id=product.id, **data))
-                except json.JSONDecodeError:
-                    continue
-            
-            return filtered_products
+            # Ranked prefix match against the FTS5 index instead of scanning every row
+            ids = await db.run_sync(search.ranked_product_ids, query, limit)
+            if not ids:
+                return []
+            rows = await db.execute(
+                select(ProductDB.id, ProductDB.api_json, ProductDB.owner_id).where(ProductDB.id.in_(ids))
+            )
+            by_id = {row.id: (row.api_json, row.owner_id) for row in rows}
+            fragments = await sellers.with_sellers(db, [by_id[i] for i in ids if i in by_id])
         else:
             # Return all products if no query
-            products = db.query(ProductDB).all()
-            return [Product(id=p.id, **json.loads(p.data)) for p in products]
+            rows = await db.execute(sellers.join_sellers(select(ProductDB.id, ProductDB.api_json)))
+            fragments = [fragment for _, fragment in sellers.joined_fragments(rows)]
+        return Response(listing_array(fragments), media_type="application/json")
             
     except Exception as e:
         print(f"Search error: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
-# Optional: Add some initial data
+@app.get("/suggest", response_model=List[str])
+async def suggest_terms(prefix: str = "", limit: int = Query(8, ge=1, le=20)):
+    # Builds the index on first use, then only applies new change log entries
+    return await run_in_threadpool(suggest.suggestions, prefix, limit)
+
 @app.on_event("startup")
 async def startup_event():
-    db = SessionLocal()
-    initial_products = [
-            ProductDB(id="1", data=json.dumps({
-                "title": "EGN lab kit",
-                "price": "free",
-                "description": "My lab project kit which i used last semester. still like new. giving it away",
-                "category": "project kit",
-                "image": "https://i.redd.it/x46dlbbrwn081.jpg",
-                "contact": "email:abdukarimkhusenov@usf.edu"
-            })),
-            ProductDB(id="2", data=json.dumps({
-                "title": "Grokking algorithm book",
-                "price": "$7.0",
-                "description": "Printed version of Grokking Algorithm book. Paper quality is good, you can read the content.",
-                "category": "books",
-                "image": "https://artemdemo.com/static/bd61bf0968541db117178677c6ea29af/dbdff/grokking-algorithms.jpg",
-                "contact": "instagram:ChazSeitz"
-            })),
-            ProductDB(id="3", data=json.dumps({
-                "title": "Calculus Early Transcendentals",
-                "price": "$45",
-                "description": "8th edition, James Stewart. Some highlighting but in great condition. Perfect for Calc 1-3.",
-                "category": "books",
-                "image": "https://m.media-amazon.com/images/I/91eEDkBqO-L.jpg",
-                "contact": "email:sarah.math@usf.edu"
-            })),
-            ProductDB(id="4", data=json.dumps({
-                "title": "TI-84 Plus Calculator",
-                "price": "$50",
-                "description": "Barely used TI-84 Plus graphing calculator. Comes with batteries and case.",
-                "category": "electronics",
-                "image": "https://m.media-amazon.com/images/I/71yrLllDokL._AC_UF894,1000_QL80_.jpg",
-                "contact": "instagram:calc_dealer"
-            })),
-            ProductDB(id="5", data=json.dumps({
-                "title": "Chemistry Lab Goggles",
-                "price": "$5",
-                "description": "Used for one semester only. Still in perfect condition. Required for CHM 2045L.",
-                "category": "lab equipment",
-                "image": "https://m.media-amazon.com/images/I/71y29kw+PZL.jpg",
-                "contact": "email:chem.student@usf.edu"
-            })),
-            ProductDB(id="6", data=json.dumps({
-                "title": "Physics Fundamentals",
-                "price": "$30",
-                "description": "Physics for Scientists and Engineers, 10th Edition. Some wear but all pages intact.",
-                "category": "books",
-                "image": "https://m.media-amazon.com/images/I/71HdgTLGUSL._AC_UF1000,1000_QL80_.jpg",
-                "contact": "instagram:physics_guru"
-            })),
-            ProductDB(id="7", data=json.dumps({
-                "title": "Arduino Starter Kit",
-                "price": "$25",
-                "description": "Complete Arduino kit used for EGN 3000. Includes board, sensors, and components.",
-                "category": "electronics",
-                "image": "https://m.media-amazon.com/images/I/81a-MDAmb8L.jpg",
-                "contact": "email:maker.space@usf.edu"
-            })),
-            ProductDB(id="8", data=json.dumps({
-                "title": "Study Desk",
-                "price": "$15",
-                "description": "Compact study desk, perfect for dorm room. Easy to assemble/disassemble.",
-                "category": "furniture",
-                "image": "https://m.media-amazon.com/images/I/71CkxVHzuGL._AC_UF894,1000_QL80_.jpg",
-                "contact": "instagram:dorm_deals"
-            })),
-            ProductDB(id="9", data=json.dumps({
-                "title": "Biology Lab Manual",
-                "price": "free",
-                "description": "BSC 2010L lab manual. Unused, got it for free from a friend but dropped the class.",
-                "category": "books",
-                "image": "https://m.media-amazon.com/images/I/815jJO25vdL._AC_UF1000,1000_QL80_.jpg",
-                "contact": "email:bio.student@usf.edu"
-            })),
-            ProductDB(id="10", data=json.dumps({
-                "title": "Engineering Drawing Set",
-                "price": "$12",
-                "description": "Professional drawing set with compass, rulers, and protractors. Used for EGN 3311.",
-                "category": "supplies",
-                "image": "https://m.media-amazon.com/images/I/71pO+zpB8hL.jpg",
-                "contact": "instagram:engineering_supplies"
-            })),
-            ProductDB(id="11", data=json.dumps({
-                "title": "Computer Science Notes",
-                "price": "free",
-                "description": "Complete set of typed notes for COP 3514 and COP 4530. Includes practice problems.",
-                "category": "study materials",
-                "image": "https://notesdrive.com/wp-content/uploads/2022/05/2.png",
-                "contact": "email:cs.notes@usf.edu"
-            })),
-            ProductDB(id="12", data=json.dumps({
-                "title": "Dorm Mini Fridge",
-                "price": "$40",
-                "description": "1.7 cu ft mini fridge, perfect working condition. Moving out of dorms.",
-                "category": "appliances",
-                "image": "https://dormessentials.hsa.net/cdn/shop/products/microfridge1_2568df25-de21-4eb5-8682-614dc5a3221d.jpg?v=1622426926&width=1214",
-                "contact": "instagram:dorm_essentials"
-            }))
-        ]
-    
-    # Clear existing products and add new ones
-    db.query(ProductDB).delete()
-    db.add_all(initial_products)
-    db.commit()
-    db.close()
-
-def update_existing_products(db: Session):
-    products = db.query(ProductDB).all()
-    for product in products:
-        data = json.loads(product.data)
-        if 'contact' not in data:
-            if 'email' in data:
-                data['contact'] = f"email:{data['email']}"
-                del data['email']
-            elif 'instagram' in data:
-                data['contact'] = f"instagram:{data['instagram']}"
-                del data['instagram']
-            product.data = json.dumps(data)
-    db.commit()
-
-# Call this function after your database is set up
-update_existing_products(SessionLocal())
+    # One cheap query; migrations and seeding are explicit commands, not startup work
+    current, head = schema_revisions()
+    if current != head:
+        print(f"Database schema is at {current}, expected {head}. Run `alembic upgrade head`.")
+    app.state.compaction_task = asyncio.create_task(changes.compact_periodically())
+    if catalog_snapshots is not None and current == head:
+        await run_in_threadpool(catalog_snapshots.start)
+    if current == head:
+        similar.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    passwords.password_pool.shutdown()
+    task = getattr(app.state, "compaction_task", None)
+    if task is not None:
+        task.cancel()
+    await messaging.message_writer.close()
 
 @app.post("/products")
 async def create_product(
@@ -282,27 +454,17 @@ async def create_product(
     category: str = Form(...),
     contact: str = Form(...),
     photo: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Generate a unique ID
     product_id = str(uuid.uuid4())
 
-    # Ensure the uploads directory exists
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-
+    staged = None
     if photo.filename:  # If a file was uploaded
-        # Generate a unique filename
-        file_extension = os.path.splitext(photo.filename)[1]
-        file_name = f"{product_id}{file_extension}"
-        file_path = os.path.join(upload_dir, file_name)
-        
-        # Save the file
-        with open(file_path, "wb+") as file_object:
-            file_object.write(await photo.read())
-        
-        # Store just the filename
-        image_path = file_name
+        # Stream to a temp file in chunks; it is stored under its content hash
+        staged = await storage.stage_upload(photo)
+        image_path = staged.path
     else:
         # If no file was uploaded, assume the 'photo' field contains a URL
         image_path = photo
@@ -318,51 +480,75 @@ async def create_product(
         "created_at": datetime.utcnow().isoformat()
     }
 
-    # Create new product
-    new_product = ProductDB(id=product_id, data=json.dumps(product_data))
-    db.add(new_product)
-    db.commit()
-    db.refresh(new_product)
+    try:
+        if staged:
+            # Identical bytes may already be stored under another extension
+            product_data["image"] = await db.run_sync(storage.acquire_blob, staged)
+
+        # Create new product
+        new_product = ProductDB.from_data(product_id, product_data, owner_id=current_user.id)
+        db.add(new_product)
+        await db.run_sync(search.index_product, product_id, product_data)
+        await db.run_sync(changes.record_change, product_id, changes.UPSERT)
+        await db.commit()
+    except BaseException:
+        if staged:
+            storage.discard_upload(staged)
+        raise
+    if staged:
+        await storage.publish_upload(staged)
+    catalog_cache.bump(product_id)
+    listings_changed()
+    changes.notifier.notify()
 
     return {"message": "Product created successfully", "product_id": product_id}
 
 @app.delete("/products/{product_id}")
-async def delete_product(product_id: str, db: Session = Depends(get_db)):
-    product = db.query(ProductDB).filter(ProductDB.id == product_id).first()
+async def delete_product(product_id: str, db: AsyncSession = Depends(get_async_db)):
+    product = await db.get(ProductDB, product_id)
     if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Delete the associated image file
+    # Release the image; the file goes once no listing references it
     product_data = json.loads(product.data)
-    image_path = product_data.get('image')
-    if image_path and os.path.exists(image_path):
-        os.remove(image_path)
+    unreferenced = await db.run_sync(storage.release_blob, product_data.get('image'))
     
     # Delete the product from the database
-    db.delete(product)
-    db.commit()
+    await db.delete(product)
+    await db.run_sync(search.remove_product, product_id)
+    # A tombstone, so clients syncing from the change feed drop it too
+    await db.run_sync(changes.record_change, product_id, changes.DELETE)
+    await db.commit()
+    if unreferenced:
+        # Checked and unlinked inside one write transaction, see remove_unreferenced()
+        await db.run_sync(storage.remove_unreferenced, unreferenced)
+        await db.commit()
+    catalog_cache.bump(product_id)
+    listings_changed()
+    changes.notifier.notify()
     
     return {"message": "Product deleted successfully"}
 
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+app.mount("/uploads", UploadFiles(directory=storage.UPLOAD_DIR), name="uploads")
 
 # Helper functions
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def find_user(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_user(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
-
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await find_user(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await passwords.verify_password(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # Stored hash predates the current bcrypt settings; upgrade it in place
+        async with AsyncSessionLocal() as writer:
+            await writer.execute(
+                update(models.User).where(models.User.id == user.id).values(hashed_password=new_hash)
+            )
+            await writer.commit()
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -377,20 +563,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 # Routes
 @app.post("/register")
-def register(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    db_user = get_user(db, form_data.username)
+async def register(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_read_db)):
+    # Check and hash on a read connection; the write lock is only taken for the insert
+    db_user = await find_user(db, form_data.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = get_password_hash(form_data.password)
-    new_user = models.User(username=form_data.username, hashed_password=hashed_password)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    hashed_password = await passwords.hash_password(form_data.password)
+    async with AsyncSessionLocal() as writer:
+        writer.add(models.User(username=form_data.username, hashed_password=hashed_password))
+        try:
+            await writer.commit()
+        except IntegrityError:
+            # Registered by a concurrent request while we were hashing
+            raise HTTPException(status_code=400, detail="Username already registered")
     return {"message": "User created successfully"}
 
 @app.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_read_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -405,26 +595,8 @@ def logout():
     # by removing the token from storage (e.g., localStorage)
     return {"message": "Logout successful"}
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = get_user(db, username)
-    if user is None:
-        raise credentials_exception
-    return user
-
 @app.get("/protected")
-def protected(current_user: models.User = Depends(get_current_user)):
+def protected(current_user: UserSnapshot = Depends(get_current_user)):
     return {"user": current_user.username, "message": "You are authenticated"}
 
 # User Profile Endpoints
@@ -435,77 +607,178 @@ class UserProfileUpdate(BaseModel):
     bio: Optional[str] = None
     location: Optional[str] = None
 
-@app.get("/user/profile")
-def get_user_profile(current_user: models.User = Depends(get_current_user)):
+def user_profile(user) -> dict:
     return {
-        "id": current_user.id,
-        "username": current_user.username,
-        "email": current_user.email,
-        "full_name": current_user.full_name,
-        "bio": current_user.bio,
-        "location": current_user.location,
-        "created_at": current_user.created_at
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "full_name": user.full_name,
+        "bio": user.bio,
+        "location": user.location,
+        "created_at": user.created_at
     }
 
+@app.get("/user/profile")
+def get_user_profile(current_user: UserSnapshot = Depends(get_current_user)):
+    return user_profile(current_user)
+
+@app.get("/user/listings", response_model=List[Product])
+async def get_user_listings(
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = None,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # Newest first, one seek on ix_products_owner_id_created_at_id per page;
+    # X-Next-Cursor pages back through older listings
+    columns = (ProductDB.created_at, ProductDB.id)
+    stmt = keyset_query(
+        select(ProductDB.api_json, *columns).where(ProductDB.owner_id == current_user.id),
+        "mine", columns, True, limit, after,
+    )
+    rows, next_cursor = keyset_page((await db.execute(stmt)).all(), "mine", columns, limit)
+    # Every listing has the same seller, who is already loaded
+    seller = sellers.seller_json(current_user)
+    body = listing_array([sellers.with_seller(row.api_json, seller) for row in rows])
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(body, media_type="application/json", headers=headers)
+
 @app.put("/user/profile")
-def update_user_profile(
+async def update_user_profile(
     profile_data: UserProfileUpdate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Update only provided fields
-    if profile_data.username is not None:
+    updates = profile_data.model_dump(exclude_none=True)
+    if not updates:
+        return {"message": "Profile updated successfully", "user": user_profile(current_user)}
+
+    if "username" in updates:
         # Check if username is already taken
-        existing_user = db.query(models.User).filter(
-            models.User.username == profile_data.username,
-            models.User.id != current_user.id
-        ).first()
+        existing_user = await db.scalar(
+            select(models.User.id).where(
+                models.User.username == updates["username"],
+                models.User.id != current_user.id
+            )
+        )
         if existing_user:
             raise HTTPException(status_code=400, detail="Username already taken")
-        user.username = profile_data.username
-    
-    if profile_data.email is not None:
-        user.email = profile_data.email
-    
-    if profile_data.full_name is not None:
-        user.full_name = profile_data.full_name
-    
-    if profile_data.bio is not None:
-        user.bio = profile_data.bio
-    
-    if profile_data.location is not None:
-        user.location = profile_data.location
-    
-    db.commit()
-    db.refresh(user)
-    
+
+    # current_user already carries the id, so update in place and read the
+    # new row back through RETURNING instead of loading the user again
+    user = await db.scalar(
+        update(models.User)
+        .where(models.User.id == current_user.id)
+        .values(**updates)
+        .returning(models.User)
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    await db.commit()
+    # Cached tokens hold the old profile (and, after a rename, a stale username),
+    # in this worker and the others
+    token_cache.invalidate_user(current_user.id)
+    if "username" in updates or "full_name" in updates:
+        # Listings embed the seller's name: drop cached pages in every worker
+        # and retire the snapshot, which renames are rare enough for
+        catalog_cache.bump()
+        listings_changed()
+
     return {
         "message": "Profile updated successfully",
-        "user": {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "full_name": user.full_name,
-            "bio": user.bio,
-            "location": user.location,
-            "created_at": user.created_at
-        }
+        "user": user_profile(user)
     }
 
 @app.post("/populate-demo-data")
-async def populate_demo_data(db: Session = Depends(get_db)):
-    # Clear existing products
-    db.query(ProductDB).delete()
-    
-    initial_products = [
-        # ... paste the same products array from the startup_event ...
-    ]
-    
-    db.add_all(initial_products)
+def populate_demo_data(db: Session = Depends(get_db)):
+    added = seed_demo_products(db)
     db.commit()
-    return {"message": "Demo data populated successfully"}
+    catalog_cache.bump()
+    listings_changed()
+    changes.notifier.notify()
+    return {"message": "Demo data populated successfully", "added": added}
+
+# Messaging
+class ConversationCreate(BaseModel):
+    username: str
+    product_id: Optional[str] = None
+
+class MessageCreate(BaseModel):
+    body: str
+
+async def conversation_participants(conversation_id: int, user: UserSnapshot):
+    participants = await messaging.participant_cache.get(conversation_id)
+    if participants is None or user.id not in participants:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return participants
+
+@app.post("/conversations")
+async def start_conversation(
+    conversation: ConversationCreate,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    other = await find_user(db, conversation.username)
+    if other is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if other.id == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot message yourself")
+    c = await messaging.get_or_create_conversation(db, current_user.id, other.id, conversation.product_id)
+    return {"id": c.id, "product_id": c.product_id, "other_user": {"id": other.id, "username": other.username}}
+
+@app.get("/conversations")
+async def get_conversations(
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await messaging.list_conversations(db, current_user.id, limit)
+
+@app.get("/conversations/{conversation_id}/messages")
+async def get_messages(
+    conversation_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = None,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # Newest first; X-Next-Cursor pages back through older messages
+    await conversation_participants(conversation_id, current_user)
+    columns = (Message.created_at, Message.id)
+    stmt = keyset_query(
+        select(Message).where(Message.conversation_id == conversation_id), "messages", columns, True, limit, after
+    )
+    rows, next_cursor = keyset_page((await db.scalars(stmt)).all(), "messages", columns, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [messaging.message_from_row(m) for m in rows]
+
+@app.post("/conversations/{conversation_id}/messages")
+async def send_message(
+    conversation_id: int,
+    message: MessageCreate,
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    # Same path as the WebSocket: batched write, then live delivery to both sides
+    try:
+        return await messaging.submit_message(current_user.id, conversation_id, message.body, wait=True)
+    except ValueError as e:
+        raise HTTPException(status_code=404 if "not found" in str(e) else 400, detail=str(e))
+
+@app.get("/messaging/stats")
+async def messaging_stats():
+    return messaging.stats()
 
+@app.websocket("/ws/messages")
+async def messages_socket(websocket: WebSocket, token: str = Query(...)):
+    # Browsers cannot set headers on a WebSocket, so the JWT from /login comes as ?token=
+    try:
+        async with AsyncReadSessionLocal() as db:
+            user = await user_from_token(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    await messaging.serve_connection(websocket, user.id)
@@ -0,0 +1,415 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from sqlalchemy import bindparam, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncReadSessionLocal, AsyncSessionLocal
+from models import Conversation, Message, User
+
+# Buyer/seller messaging.
+#
+# Clients hold one WebSocket each. Incoming messages go to a single writer
+# task that stores whatever has queued up since its last commit in one
+# transaction (group commit), then fans each stored message out through an
+# in-process hub to every open socket of both participants. Every socket has
+# a bounded send queue; a client that falls MESSAGING_SEND_QUEUE_SIZE frames
+# behind is disconnected (close code 1013) and refetches history over REST
+# rather than slowing delivery for everyone else. When the write queue is
+# full, senders wait, which pushes back on the socket they read from.
+#
+# The hub is per process: with several workers, both participants must be
+# connected to the same one to receive live messages.
+
+SEND_QUEUE_SIZE = int(os.getenv("MESSAGING_SEND_QUEUE_SIZE", "256"))
+WRITE_QUEUE_LIMIT = int(os.getenv("MESSAGING_WRITE_QUEUE_LIMIT", "10000"))
+WRITE_BATCH_MAX = int(os.getenv("MESSAGING_WRITE_BATCH_MAX", "500"))
+MAX_MESSAGE_CHARS = 4000
+PARTICIPANT_CACHE_SIZE = 10000
+
+# Close code for a client dropped for not keeping up ("try again later")
+CLOSE_TOO_SLOW = 1013
+
+
+def message_dict(message_id: int, conversation_id: int, sender_id: int, body: str, created_at: datetime) -> dict:
+    return {
+        "id": message_id,
+        "conversation_id": conversation_id,
+        "sender_id": sender_id,
+        "body": body,
+        "created_at": created_at.isoformat(),
+    }
+
+
+def message_from_row(m: Message) -> dict:
+    return message_dict(m.id, m.conversation_id, m.sender_id, m.body, m.created_at)
+
+
+class Connection:
+    """One open socket and its bounded outgoing queue of serialized frames."""
+
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int = SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.too_slow = False
+        self.sender: Optional[asyncio.Task] = None
+
+    def offer(self, payload: str) -> bool:
+        """Queue a frame without waiting; a full queue marks the client too slow."""
+        if self.too_slow:
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            self.too_slow = True
+            if self.sender is not None:
+                self.sender.cancel()
+            return False
+
+    def send_error(self, detail: str, client_id: Optional[str] = None):
+        self.offer(json.dumps({"type": "error", "detail": detail, "client_id": client_id}))
+
+    async def send_loop(self):
+        while True:
+            payload = await self.queue.get()
+            await self.websocket.send_text(payload)
+
+
+class Hub:
+    """In-process fan-out from user ids to their open connections."""
+
+    def __init__(self):
+        self._connections: Dict[int, Set[Connection]] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def add(self, connection: Connection):
+        self._connections.setdefault(connection.user_id, set()).add(connection)
+
+    def remove(self, connection: Connection):
+        connections = self._connections.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self._connections[connection.user_id]
+
+    def publish(self, payload: str, user_ids) -> int:
+        delivered = 0
+        for user_id in user_ids:
+            for connection in list(self._connections.get(user_id, ())):
+                if connection.offer(payload):
+                    delivered += 1
+                else:
+                    self.dropped += 1
+        self.published += 1
+        return delivered
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._connections),
+            "connections": sum(len(c) for c in self._connections.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+class ParticipantCache:
+    """conversation id -> (user_a_id, user_b_id). Participants never change."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[int, int]]" = OrderedDict()
+
+    def put(self, conversation_id: int, participants: Tuple[int, int]):
+        self._entries[conversation_id] = participants
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, conversation_id: int) -> Optional[Tuple[int, int]]:
+        participants = self._entries.get(conversation_id)
+        if participants is not None:
+            self._entries.move_to_end(conversation_id)
+            return participants
+        async with AsyncReadSessionLocal() as db:
+            row = (await db.execute(
+                select(Conversation.user_a_id, Conversation.user_b_id).where(Conversation.id == conversation_id)
+            )).first()
+        if row is None:
+            return None
+        self.put(conversation_id, tuple(row))
+        return tuple(row)
+
+
+@dataclass
+class PendingMessage:
+    conversation_id: int
+    sender_id: int
+    body: str
+    participants: Tuple[int, int]
+    created_at: datetime
+    client_id: Optional[str] = None
+    # The socket it came from, told about write failures
+    origin: Optional[Connection] = None
+    # Resolved with the stored message, for callers that wait (REST)
+    done: Optional[asyncio.Future] = None
+
+
+class MessageWriter:
+    def __init__(self, hub: Hub, queue_limit: int, batch_max: int):
+        self.hub = hub
+        self.batch_max = batch_max
+        self.queue: "asyncio.Queue[Optional[PendingMessage]]" = asyncio.Queue(maxsize=queue_limit)
+        self.batches = 0
+        self.written = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, pending: PendingMessage):
+        """Queue a message for the next commit, waiting while the queue is full."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await self.queue.put(pending)
+
+    async def close(self):
+        """Write everything already queued, then stop."""
+        if self._task is not None and not self._task.done():
+            await self.queue.put(None)
+            await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            batch: List[PendingMessage] = []
+            item = await self.queue.get()
+            stopping = item is None
+            if item is not None:
+                batch.append(item)
+            # Everything that queued up during the previous commit goes in this one
+            while not stopping and len(batch) < self.batch_max and not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if batch:
+                await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[PendingMessage]):
+        try:
+            ids = await self._write(batch)
+        except Exception as e:
+            print(f"Message write failed: {e}")
+            for pending in batch:
+                if pending.origin is not None:
+                    pending.origin.send_error("Message could not be sent", pending.client_id)
+                if pending.done is not None and not pending.done.done():
+                    pending.done.set_exception(HTTPException(status_code=503, detail="Message could not be sent"))
+            return
+        self.batches += 1
+        self.written += len(batch)
+        for message_id, pending in zip(ids, batch):
+            message = message_dict(
+                message_id, pending.conversation_id, pending.sender_id, pending.body, pending.created_at
+            )
+            # Serialized once, shared by every recipient's queue
+            payload = json.dumps({"type": "message", "message": message, "client_id": pending.client_id})
+            self.hub.publish(payload, pending.participants)
+            if pending.done is not None and not pending.done.done():
+                pending.done.set_result(message)
+
+    async def _write(self, batch: List[PendingMessage]) -> List[int]:
+        latest: Dict[int, datetime] = {}
+        for pending in batch:
+            latest[pending.conversation_id] = max(pending.created_at, latest.get(pending.conversation_id, pending.created_at))
+        async with AsyncSessionLocal() as db:
+            # The writer session begins with BEGIN IMMEDIATE, so no other writer
+            # can take ids between this read and the insert. Explicit ids let
+            # the insert be one plain executemany: SQLite cannot RETURNING ids
+            # in parameter order, which would split the batch into single rows.
+            first_id = ((await db.scalar(select(func.max(Message.id)))) or 0) + 1
+            ids = list(range(first_id, first_id + len(batch)))
+            await db.execute(
+                insert(Message.__table__),
+                [
+                    {
+                        "id": message_id,
+                        "conversation_id": p.conversation_id,
+                        "sender_id": p.sender_id,
+                        "body": p.body,
+                        "created_at": p.created_at,
+                    }
+                    for message_id, p in zip(ids, batch)
+                ],
+            )
+            conversations = Conversation.__table__
+            await db.execute(
+                update(conversations)
+                .where(conversations.c.id == bindparam("conversation_id"))
+                .values(last_message_at=bindparam("at")),
+                [{"conversation_id": conversation_id, "at": at} for conversation_id, at in latest.items()],
+            )
+            await db.commit()
+        return ids
+
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "batches": self.batches, "written": self.written}
+
+
+hub = Hub()
+participant_cache = ParticipantCache(PARTICIPANT_CACHE_SIZE)
+message_writer = MessageWriter(hub, WRITE_QUEUE_LIMIT, WRITE_BATCH_MAX)
+
+
+def validate_body(body) -> str:
+    if not isinstance(body, str) or not body.strip():
+        raise ValueError("Message body is required")
+    if len(body) > MAX_MESSAGE_CHARS:
+        raise ValueError(f"Message is longer than {MAX_MESSAGE_CHARS} characters")
+    return body
+
+
+async def submit_message(
+    user_id: int,
+    conversation_id: int,
+    body: str,
+    client_id: Optional[str] = None,
+    origin: Optional[Connection] = None,
+    wait: bool = False,
+) -> Optional[dict]:
+    """Validate and queue a message. Raises ValueError for bad input or an unknown conversation."""
+    body = validate_body(body)
+    participants = await participant_cache.get(conversation_id)
+    if participants is None or user_id not in participants:
+        raise ValueError("Conversation not found")
+    done = asyncio.get_running_loop().create_future() if wait else None
+    await message_writer.submit(PendingMessage(
+        conversation_id=conversation_id,
+        sender_id=user_id,
+        body=body,
+        participants=participants,
+        created_at=datetime.utcnow(),
+        client_id=client_id,
+        origin=origin,
+        done=done,
+    ))
+    return await done if done is not None else None
+
+
+async def _receive_loop(connection: Connection):
+    while True:
+        raw = await connection.websocket.receive_text()
+        client_id = None
+        try:
+            try:
+                frame = json.loads(raw)
+            except json.JSONDecodeError:
+                raise ValueError("Frame is not valid JSON") from None
+            if not isinstance(frame, dict) or frame.get("type") != "send":
+                raise ValueError('Expected {"type": "send", "conversation_id": ..., "body": ...}')
+            client_id = frame.get("client_id")
+            if client_id is not None:
+                client_id = str(client_id)[:64]
+            conversation_id = frame.get("conversation_id")
+            if not isinstance(conversation_id, int):
+                raise ValueError("conversation_id must be an integer")
+            await submit_message(connection.user_id, conversation_id, frame.get("body"), client_id, connection)
+        except ValueError as e:
+            connection.send_error(str(e), client_id)
+
+
+async def serve_connection(websocket: WebSocket, user_id: int):
+    """Run an accepted socket until the client leaves or falls too far behind."""
+    connection = Connection(websocket, user_id)
+    connection.sender = asyncio.create_task(connection.send_loop())
+    receiver = asyncio.create_task(_receive_loop(connection))
+    hub.add(connection)
+    try:
+        await asyncio.wait({connection.sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        hub.remove(connection)
+        for task in (connection.sender, receiver):
+            task.cancel()
+        results = await asyncio.gather(connection.sender, receiver, return_exceptions=True)
+    if connection.too_slow:
+        await websocket.close(code=CLOSE_TOO_SLOW, reason="Client is not keeping up")
+        return
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, (asyncio.CancelledError, WebSocketDisconnect)):
+            print(f"WebSocket error: {result}")
+
+
+# REST helpers
+
+def conversation_key(user_id: int, other_id: int) -> Tuple[int, int]:
+    return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+
+async def get_or_create_conversation(db: AsyncSession, user_id: int, other_id: int, product_id: Optional[str]) -> Conversation:
+    user_a_id, user_b_id = conversation_key(user_id, other_id)
+    stmt = select(Conversation).where(
+        Conversation.user_a_id == user_a_id,
+        Conversation.user_b_id == user_b_id,
+        Conversation.product_id.is_(None) if product_id is None else Conversation.product_id == product_id,
+    )
+    conversation = await db.scalar(stmt)
+    if conversation is not None:
+        return conversation
+    conversation = Conversation(user_a_id=user_a_id, user_b_id=user_b_id, product_id=product_id)
+    db.add(conversation)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Started by the other participant at the same moment
+        await db.rollback()
+        return await db.scalar(stmt)
+    participant_cache.put(conversation.id, (user_a_id, user_b_id))
+    return conversation
+
+
+async def list_conversations(db: AsyncSession, user_id: int, limit: int) -> List[dict]:
+    """The user's conversations, most recent activity first, in three queries."""
+    conversations = (await db.scalars(
+        select(Conversation)
+        .where(or_(Conversation.user_a_id == user_id, Conversation.user_b_id == user_id))
+        .order_by(func.coalesce(Conversation.last_message_at, Conversation.created_at).desc(), Conversation.id.desc())
+        .limit(limit)
+    )).all()
+    if not conversations:
+        return []
+    ids = [c.id for c in conversations]
+    latest_ids = select(func.max(Message.id)).where(Message.conversation_id.in_(ids)).group_by(Message.conversation_id)
+    last_messages = {m.conversation_id: m for m in await db.scalars(select(Message).where(Message.id.in_(latest_ids)))}
+    other_ids = {c.user_b_id if c.user_a_id == user_id else c.user_a_id for c in conversations}
+    others = {u.id: u for u in await db.scalars(select(User).where(User.id.in_(other_ids)))}
+
+    result = []
+    for c in conversations:
+        other = others.get(c.user_b_id if c.user_a_id == user_id else c.user_a_id)
+        last = last_messages.get(c.id)
+        result.append({
+            "id": c.id,
+            "product_id": c.product_id,
+            "other_user": {
+                "id": other.id,
+                "username": other.username,
+                "full_name": other.full_name,
+            } if other else None,
+            "last_message": message_from_row(last) if last else None,
+            "last_message_at": c.last_message_at.isoformat() if c.last_message_at else None,
+        })
+    return result
+
+
+def stats() -> dict:
+    return {"hub": hub.stats(), "writer": message_writer.stats()}
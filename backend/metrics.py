@@ -0,0 +1,258 @@
+import bisect
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Request instrumentation, exported in Prometheus text format at /metrics.
+#
+# MetricsMiddleware is plain ASGI: it wraps `send` to see the status and count
+# body bytes, without BaseHTTPMiddleware's extra task and body re-streaming.
+# Requests are labelled by route template (/products/{product_id}), never by
+# raw path, so label cardinality stays bounded. SQL statements are counted
+# and timed through engine events into the current request's RequestStats,
+# found via a context variable that also follows handlers into the threadpool.
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# Statements listed in a slow-request log line
+SLOW_REQUEST_TOP_STATEMENTS = 5
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{_format_labels(labels)} {_format_value(v)}" for labels, v in self.values.items()]
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class CallbackGauge:
+    """A gauge read from elsewhere (a pool or cache) when /metrics is scraped."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_format_value(self.read())}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+requests_total = registry.add(Counter("http_requests_total", "HTTP requests by route and status."))
+request_duration = registry.add(
+    Histogram("http_request_duration_seconds", "Time from request start to last body byte.", LATENCY_BUCKETS)
+)
+response_size = registry.add(Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS))
+in_flight = registry.add(Gauge("http_requests_in_flight", "Requests currently being handled."))
+slow_requests = registry.add(Counter("http_slow_requests_total", "Requests slower than SLOW_REQUEST_MS."))
+sql_statements = registry.add(Counter("db_statements_total", "SQL statements executed while handling requests."))
+sql_seconds = registry.add(Counter("db_statement_seconds_total", "Time spent in SQL statements while handling requests."))
+
+
+def register_gauge(name: str, help: str, read: Callable[[], float]):
+    registry.add(CallbackGauge(name, help, read))
+
+
+def render() -> str:
+    return registry.render()
+
+
+class RequestStats:
+    """SQL executed on behalf of one request. Written from the event loop and worker threads."""
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        # normalized statement -> [count, seconds]
+        self.by_statement: Dict[str, list] = {}
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.sql_seconds += seconds
+        entry = self.by_statement.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def breakdown(self, top: int = SLOW_REQUEST_TOP_STATEMENTS) -> str:
+        ranked = sorted(self.by_statement.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return "; ".join(f"{count}x {seconds * 1000:.1f}ms {statement}" for statement, (count, seconds) in ranked)
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(statement: str) -> str:
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()
+    return statement if len(statement) <= 120 else statement[:117] + "..."
+
+
+def instrument_engine(sync_engine):
+    """Count and time every statement run on `sync_engine` (for async engines, pass .sync_engine)."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_stats.get() is not None:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        if stats is not None and conn.info.get("query_start"):
+            stats.record(_normalize(statement), time.perf_counter() - conn.info["query_start"].pop())
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounted apps (/uploads) only leave their prefix behind
+    if scope.get("root_path"):
+        return scope["root_path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app, log_requests: bool = False, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.log_requests = log_requests
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, size, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        in_flight.inc((("method", method),))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_stats.reset(token)
+            in_flight.dec((("method", method),))
+            self.record(scope, method, status, size, elapsed, stats, streaming)
+
+    def record(self, scope, method: str, status: int, size: int, elapsed: float, stats: RequestStats, streaming: bool):
+        route = route_label(scope)
+        labels = (("method", method), ("route", route))
+        requests_total.inc(labels + (("status", str(status)),))
+        request_duration.observe(elapsed, labels)
+        response_size.observe(size, labels)
+        if stats.statements:
+            sql_statements.inc(labels, stats.statements)
+            sql_seconds.inc(labels, stats.sql_seconds)
+
+        elapsed_ms = elapsed * 1000
+        line = (
+            f"{method} {scope['path']} -> {status} in {elapsed_ms:.1f}ms, {size} bytes, "
+            f"{stats.statements} queries in {stats.sql_seconds * 1000:.1f}ms"
+        )
+        # Event streams stay open by design; they are never "slow"
+        if elapsed_ms >= self.slow_request_ms and not streaming:
+            slow_requests.inc(labels)
+            print(f"Slow request: {line} [{stats.breakdown()}]")
+        elif self.log_requests:
+            print(line)
@@ -0,0 +1,55 @@
+"""Initial schema: users and products
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+Databases created before migrations existed already have these tables (made
+by Base.metadata.create_all at import); they are left as they are and simply
+stamped.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("username", sa.String(), nullable=True),
+            sa.Column("hashed_password", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("full_name", sa.String(), nullable=True),
+            sa.Column("bio", sa.Text(), nullable=True),
+            sa.Column("location", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "products" not in tables:
+        op.create_table(
+            "products",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("data", sa.JSON(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_products_id", "products", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("products")
+    op.drop_table("users")
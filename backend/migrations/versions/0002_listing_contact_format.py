@@ -0,0 +1,56 @@
+"""Fold legacy email/instagram fields into the listing contact string
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+
+Replaces update_existing_products(), which rewrote every product on each
+process start. Rows are read and rewritten BATCH_SIZE at a time.
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.text("SELECT id, data FROM products WHERE id > :last ORDER BY id LIMIT :n"),
+            {"last": last_id, "n": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates = []
+        for product_id, raw in rows:
+            # products.data holds json.dumps() output inside a JSON column
+            data = json.loads(json.loads(raw))
+            if "contact" in data:
+                continue
+            if "email" in data:
+                data["contact"] = f"email:{data.pop('email')}"
+            elif "instagram" in data:
+                data["contact"] = f"instagram:{data.pop('instagram')}"
+            else:
+                continue
+            updates.append({"id": product_id, "data": json.dumps(json.dumps(data))})
+        if updates:
+            bind.execute(sa.text("UPDATE products SET data = :data WHERE id = :id"), updates)
+
+
+def downgrade() -> None:
+    # The old fields are still readable through the contact fallback
+    pass
@@ -0,0 +1,124 @@
+"""Typed, indexed listing columns on products
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00
+
+Adds category, price_cents, is_free and created_at and backfills them from
+the JSON data BATCH_SIZE rows at a time. Databases that already gained the
+columns from the old startup upgrade only get the missing pieces.
+"""
+import json
+import re
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+COLUMNS = [
+    sa.Column("category", sa.String(), nullable=True),
+    sa.Column("price_cents", sa.Integer(), nullable=True),
+    sa.Column("is_free", sa.Boolean(), nullable=True),
+    sa.Column("created_at", sa.DateTime(), nullable=True),
+]
+
+INDEXES = {
+    "ix_products_category": ["category"],
+    "ix_products_price_cents": ["price_cents"],
+    "ix_products_is_free": ["is_free"],
+    "ix_products_created_at": ["created_at"],
+    "ix_products_category_created_at": ["category", "created_at"],
+    "ix_products_category_price_cents": ["category", "price_cents"],
+    "ix_products_created_at_id": ["created_at", "id"],
+    "ix_products_price_cents_id": ["price_cents", "id"],
+}
+
+
+# Frozen copy of models.listing_columns() as of this revision, so later changes
+# to the application helper never change what this migration does
+_PRICE_RE = re.compile(r"[^0-9.]")
+
+
+def parse_price_cents(price) -> int:
+    try:
+        return int(round(float(_PRICE_RE.sub("", str(price or ""))) * 100))
+    except ValueError:
+        return 0
+
+
+def listing_columns(data: dict) -> dict:
+    price = str(data.get("price") or "")
+    price_cents = parse_price_cents(price)
+    created_at = data.get("created_at")
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError:
+            created_at = None
+    return {
+        "category": (data.get("category") or "").strip().lower(),
+        "price_cents": price_cents,
+        "is_free": price_cents == 0 or "free" in price.lower(),
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_columns = {c["name"] for c in inspector.get_columns("products")}
+    for column in COLUMNS:
+        if column.name not in existing_columns:
+            op.add_column("products", column.copy())
+
+    existing_indexes = {i["name"] for i in inspector.get_indexes("products")}
+    for name, columns in INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "products", columns)
+
+    # created_at is always set on new rows, so NULL marks one to backfill
+    table = sa.table(
+        "products",
+        sa.column("id", sa.String()),
+        *[sa.column(c.name, c.type) for c in COLUMNS],
+    )
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, data FROM products WHERE created_at IS NULL AND id > :last "
+                "ORDER BY id LIMIT :n"
+            ),
+            {"last": last_id, "n": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates = [
+            {"b_id": product_id, **listing_columns(json.loads(json.loads(raw)))}
+            for product_id, raw in rows
+        ]
+        bind.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam("b_id"))
+            .values({c.name: sa.bindparam(c.name) for c in COLUMNS}),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="products")
+    with op.batch_alter_table("products") as batch_op:
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,73 @@
+"""Full-text search index over listings
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 1000
+
+
+def rebuild_search_index(bind) -> None:
+    """Frozen copy of search.rebuild_search_index() as of this revision."""
+    bind.execute(sa.text("DELETE FROM products_fts"))
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.text("SELECT id, data FROM products WHERE id > :last ORDER BY id LIMIT :n"),
+            {"last": last_id, "n": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        params = []
+        for product_id, raw in rows:
+            # Raw rows are double-encoded (the ORM stores json.dumps() output in a JSON column)
+            try:
+                data = json.loads(json.loads(raw)) if raw else {}
+            except (TypeError, json.JSONDecodeError):
+                continue
+            params.append({
+                "id": product_id,
+                "title": data.get("title") or "",
+                "description": data.get("description") or "",
+                "category": data.get("category") or "",
+            })
+        if params:
+            bind.execute(
+                sa.text(
+                    "INSERT INTO products_fts (product_id, title, description, category) "
+                    "VALUES (:id, :title, :description, :category)"
+                ),
+                params,
+            )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "product_id UNINDEXED, title, description, category, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    indexed = bind.execute(sa.text("SELECT count(*) FROM products_fts")).scalar()
+    total = bind.execute(sa.text("SELECT count(*) FROM products")).scalar()
+    if indexed != total:
+        rebuild_search_index(bind)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS products_fts")
@@ -0,0 +1,35 @@
+"""Reference-counted, content-addressed image blobs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if "image_blobs" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "image_blobs",
+        sa.Column("digest", sa.String(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("refcount", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("digest"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("image_blobs")
@@ -0,0 +1,71 @@
+"""Pre-serialized API JSON on products
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00
+
+Adds products.api_json and fills it with listing_json() BATCH_SIZE rows at
+a time, so read routes can serve listings without decoding them.
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+# Frozen copy of models.listing_json() as of this revision, so later schema
+# changes get their own migration instead of altering this one
+LISTING_FIELDS = ("title", "price", "description", "category", "image")
+LISTING_OPTIONAL_FIELDS = ("contact", "email", "instagram")
+
+
+def listing_json(product_id: str, data: dict) -> str:
+    listing = {"id": product_id}
+    for name in LISTING_FIELDS:
+        value = data.get(name)
+        listing[name] = "" if value is None else str(value)
+    for name in LISTING_OPTIONAL_FIELDS:
+        value = data.get(name)
+        listing[name] = None if value is None else str(value)
+    if "contact" not in data:
+        # Old format: combine email and instagram into contact
+        email, instagram = data.get("email"), data.get("instagram")
+        listing["contact"] = f"email:{email}" if email else f"instagram:{instagram or ''}"
+    return json.dumps(listing, ensure_ascii=False, separators=(",", ":"))
+
+
+def upgrade() -> None:
+    op.add_column("products", sa.Column("api_json", sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    table = sa.table("products", sa.column("id", sa.String()), sa.column("api_json", sa.Text()))
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.text("SELECT id, data FROM products WHERE id > :last ORDER BY id LIMIT :n"),
+            {"last": last_id, "n": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam("b_id")).values(api_json=sa.bindparam("api_json")),
+            [
+                {"b_id": product_id, "api_json": listing_json(product_id, json.loads(json.loads(raw)))}
+                for product_id, raw in rows
+            ],
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("api_json")
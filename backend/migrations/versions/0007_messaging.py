@@ -0,0 +1,58 @@
+"""Conversations and messages
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 15:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_a_id", sa.Integer(), nullable=False),
+        sa.Column("user_b_id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("last_message_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_a_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["user_b_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_a_id", "user_b_id", "product_id", name="uq_conversations_participants_product"),
+    )
+    op.create_index("ix_conversations_user_a_last_message_at", "conversations", ["user_a_id", "last_message_at"])
+    op.create_index("ix_conversations_user_b_last_message_at", "conversations", ["user_b_id", "last_message_at"])
+
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("conversation_id", sa.Integer(), nullable=False),
+        sa.Column("sender_id", sa.Integer(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["conversation_id"], ["conversations.id"]),
+        sa.ForeignKeyConstraint(["sender_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_messages_conversation_id_created_at", "messages", ["conversation_id", "created_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_conversation_id_created_at", table_name="messages")
+    op.drop_table("messages")
+    op.drop_index("ix_conversations_user_b_last_message_at", table_name="conversations")
+    op.drop_index("ix_conversations_user_a_last_message_at", table_name="conversations")
+    op.drop_table("conversations")
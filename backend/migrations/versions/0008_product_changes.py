@@ -0,0 +1,50 @@
+"""Product change log
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 16:00:00
+
+Creates the append-only product_changes log and seeds it with one upsert
+per existing listing, oldest first, so `since=0` replays the whole catalog.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "product_changes",
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.String(), nullable=False),
+        sa.Column("op", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("seq"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_product_changes_product_id_seq", "product_changes", ["product_id", "seq"])
+    op.create_table(
+        "change_log_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("compacted_through", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO change_log_state (id, compacted_through) VALUES (1, 0)")
+    op.execute(
+        "INSERT INTO product_changes (product_id, op, created_at) "
+        "SELECT id, 'upsert', COALESCE(created_at, CURRENT_TIMESTAMP) FROM products ORDER BY created_at, id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("change_log_state")
+    op.drop_index("ix_product_changes_product_id_seq", table_name="product_changes")
+    op.drop_table("product_changes")
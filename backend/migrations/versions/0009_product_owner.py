@@ -0,0 +1,34 @@
+"""Listing owner
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 18:00:00
+
+Adds products.owner_id, a nullable reference to users.id, and an index on
+(owner_id, created_at, id) for a seller's listings newest first. Existing
+listings were posted anonymously and keep a NULL owner: the free-text
+contact field is not a reliable link to an account.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite adds a nullable REFERENCES column in place; Alembic's add_column
+    # would need batch mode, which copies the whole table
+    op.execute("ALTER TABLE products ADD COLUMN owner_id INTEGER REFERENCES users (id)")
+    op.create_index("ix_products_owner_id_created_at_id", "products", ["owner_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_products_owner_id_created_at_id", table_name="products")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("owner_id")
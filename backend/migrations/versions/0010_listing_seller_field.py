@@ -0,0 +1,53 @@
+"""Seller field in stored listing JSON
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 19:00:00
+
+The Product schema gained a nullable "seller" field, so every stored
+api_json fragment gets a trailing "seller":null to stay byte-identical to
+the response model; routes that know the seller replace the null per
+request. Every listing's representation changed, so each gets an upsert in
+the change log: feed clients, the catalog snapshot and the in-memory
+indexes all re-read it. Plain SQL, so no application code is involved.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SELLER_NULL = ',"seller":null}'
+
+
+def record_upserts() -> None:
+    op.execute(
+        "INSERT INTO product_changes (product_id, op, created_at) "
+        "SELECT id, 'upsert', CURRENT_TIMESTAMP FROM products ORDER BY created_at, id"
+    )
+
+
+def upgrade() -> None:
+    op.execute(
+        sa.text(
+            "UPDATE products SET api_json = substr(api_json, 1, length(api_json) - 1) || :suffix "
+            "WHERE api_json IS NOT NULL AND api_json NOT LIKE :pattern"
+        ).bindparams(suffix=SELLER_NULL, pattern="%" + SELLER_NULL)
+    )
+    record_upserts()
+
+
+def downgrade() -> None:
+    op.execute(
+        sa.text(
+            "UPDATE products SET api_json = substr(api_json, 1, length(api_json) - :length) || '}' "
+            "WHERE api_json LIKE :pattern"
+        ).bindparams(length=len(SELLER_NULL), pattern="%" + SELLER_NULL)
+    )
+    record_upserts()
@@ -0,0 +1,69 @@
+"""Conversation uniqueness without a listing
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 20:00:00
+
+The unique constraint on (user_a_id, user_b_id, product_id) never applied
+to conversations without a listing: SQLite treats NULLs as distinct, so two
+participants racing to start a general conversation could both insert one.
+It is replaced by a unique index on (user_a_id, user_b_id,
+COALESCE(product_id, '')). Duplicates created before this are merged into
+the oldest conversation of each group first, keeping all their messages.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def merge_duplicates() -> None:
+    # duplicate conversation id -> the oldest conversation of its group
+    op.execute(
+        "CREATE TEMP TABLE conversation_merges AS "
+        "SELECT c.id AS id, k.keep_id AS keep_id FROM conversations c JOIN ("
+        "  SELECT user_a_id, user_b_id, COALESCE(product_id, '') AS product_key, MIN(id) AS keep_id"
+        "  FROM conversations GROUP BY user_a_id, user_b_id, COALESCE(product_id, '') HAVING COUNT(*) > 1"
+        ") k ON c.user_a_id = k.user_a_id AND c.user_b_id = k.user_b_id "
+        "AND COALESCE(c.product_id, '') = k.product_key AND c.id != k.keep_id"
+    )
+    op.execute(
+        "UPDATE messages SET conversation_id = "
+        "(SELECT keep_id FROM conversation_merges WHERE id = messages.conversation_id) "
+        "WHERE conversation_id IN (SELECT id FROM conversation_merges)"
+    )
+    op.execute(
+        "UPDATE conversations SET last_message_at = COALESCE("
+        "(SELECT MAX(created_at) FROM messages WHERE conversation_id = conversations.id), last_message_at) "
+        "WHERE id IN (SELECT keep_id FROM conversation_merges)"
+    )
+    op.execute("DELETE FROM conversations WHERE id IN (SELECT id FROM conversation_merges)")
+    op.execute("DROP TABLE conversation_merges")
+
+
+def upgrade() -> None:
+    merge_duplicates()
+    # SQLite cannot drop a table constraint in place, so batch mode rebuilds the table
+    with op.batch_alter_table("conversations", recreate="always") as batch_op:
+        batch_op.drop_constraint("uq_conversations_participants_product", type_="unique")
+    op.create_index(
+        "ix_conversations_participants_product",
+        "conversations",
+        ["user_a_id", "user_b_id", sa.text("COALESCE(product_id, '')")],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_participants_product", table_name="conversations")
+    with op.batch_alter_table("conversations", recreate="always") as batch_op:
+        batch_op.create_unique_constraint(
+            "uq_conversations_participants_product", ["user_a_id", "user_b_id", "product_id"]
+        )
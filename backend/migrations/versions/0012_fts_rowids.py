@@ -0,0 +1,48 @@
+"""Search index rows keyed by rowid
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 21:00:00
+
+products_fts.product_id is UNINDEXED, so deleting a listing's entry by it
+scanned the whole index on every create and delete. products_fts_rowids
+gives each listing a fixed FTS rowid (an INTEGER PRIMARY KEY, so VACUUM
+keeps it), and the existing entries are re-inserted under those rowids.
+Only listings that still exist are kept, one entry each. Plain SQL over the
+indexed text, so no application code is involved.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE TABLE products_fts_rowids (id INTEGER PRIMARY KEY, product_id VARCHAR NOT NULL UNIQUE)")
+    op.execute(
+        "CREATE TEMP TABLE fts_entries AS SELECT product_id, title, description, category FROM products_fts "
+        "WHERE product_id IN (SELECT id FROM products)"
+    )
+    op.execute(
+        "INSERT INTO products_fts_rowids (product_id) "
+        "SELECT DISTINCT product_id FROM fts_entries ORDER BY product_id"
+    )
+    op.execute("DELETE FROM products_fts")
+    op.execute(
+        "INSERT INTO products_fts (rowid, product_id, title, description, category) "
+        "SELECT r.id, e.product_id, e.title, e.description, e.category "
+        "FROM fts_entries e JOIN products_fts_rowids r ON r.product_id = e.product_id "
+        "GROUP BY e.product_id"
+    )
+    op.execute("DROP TABLE fts_entries")
+
+
+def downgrade() -> None:
+    # Entries still carry product_id, which the previous code deletes by
+    op.execute("DROP TABLE products_fts_rowids")
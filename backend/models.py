@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Text
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Text, Boolean, Index, ForeignKey, text
 from database import Base
 from datetime import datetime
+from typing import Optional
+import json
+import re
 
 class User(Base):
     __tablename__ = "users"
@@ -19,3 +22,167 @@ class ProductDB(Base):
 
     id = Column(String, primary_key=True, index=True)
     data = Column(JSON)
+
+    # Typed copies of listing fields from `data`, so filtering and sorting
+    # run as indexed SQL. Kept in sync through listing_columns().
+    category = Column(String, index=True)
+    price_cents = Column(Integer, index=True)
+    is_free = Column(Boolean, index=True, default=False)
+    created_at = Column(DateTime, index=True, default=datetime.utcnow)
+    # The listing exactly as the API returns it (see listing_json()), so read
+    # routes can join stored fragments instead of decoding and re-encoding rows
+    api_json = Column(Text)
+    # The account that posted the listing; NULL for listings from before accounts
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_products_category_created_at", "category", "created_at"),
+        Index("ix_products_category_price_cents", "category", "price_cents"),
+        # Keyset pagination seeks on (sort column, id)
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_price_cents_id", "price_cents", "id"),
+        # A seller's listings, newest first
+        Index("ix_products_owner_id_created_at_id", "owner_id", "created_at", "id"),
+    )
+
+    @classmethod
+    def from_data(cls, product_id: str, data: dict, owner_id: Optional[int] = None) -> "ProductDB":
+        return cls(
+            id=product_id,
+            data=json.dumps(data),
+            api_json=listing_json(product_id, data),
+            owner_id=owner_id,
+            **listing_columns(data),
+        )
+
+_PRICE_RE = re.compile(r"[^0-9.]")
+
+def parse_price_cents(price) -> int:
+    """Normalize free-text prices ("free", "$7.0", "7") to integer cents.
+
+    Mirrors the frontend, which treats anything unparseable as 0.
+    """
+    try:
+        return int(round(float(_PRICE_RE.sub("", str(price or ""))) * 100))
+    except ValueError:
+        return 0
+
+def listing_columns(data: dict) -> dict:
+    """Typed ProductDB column values derived from a listing's JSON data."""
+    price = str(data.get("price") or "")
+    price_cents = parse_price_cents(price)
+    created_at = data.get("created_at")
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError:
+            created_at = None
+    return {
+        "category": (data.get("category") or "").strip().lower(),
+        "price_cents": price_cents,
+        "is_free": price_cents == 0 or "free" in price.lower(),
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+# Fields of the API's Product schema, in response order
+LISTING_FIELDS = ("title", "price", "description", "category", "image")
+LISTING_OPTIONAL_FIELDS = ("contact", "email", "instagram")
+
+def normalize_listing(product_id: str, data: dict) -> dict:
+    """A listing's API representation, from its stored JSON data."""
+    listing = {"id": product_id}
+    for name in LISTING_FIELDS:
+        value = data.get(name)
+        listing[name] = "" if value is None else str(value)
+    for name in LISTING_OPTIONAL_FIELDS:
+        value = data.get(name)
+        listing[name] = None if value is None else str(value)
+    if "contact" not in data:
+        # Old format: combine email and instagram into contact
+        email, instagram = data.get("email"), data.get("instagram")
+        listing["contact"] = f"email:{email}" if email else f"instagram:{instagram or ''}"
+    # Stored as null; routes that load the seller splice it in (sellers.with_seller)
+    listing["seller"] = None
+    return listing
+
+def listing_json(product_id: str, data: dict) -> str:
+    """normalize_listing() serialized the way pydantic serializes the Product model."""
+    return json.dumps(normalize_listing(product_id, data), ensure_ascii=False, separators=(",", ":"))
+
+class ImageBlob(Base):
+    """A content-addressed upload, shared by every listing that uses the same bytes."""
+    __tablename__ = "image_blobs"
+
+    digest = Column(String, primary_key=True)  # sha256 hex of the file contents
+    path = Column(String, nullable=False)  # relative to the uploads directory
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Conversation(Base):
+    """A buyer/seller thread between two users, optionally about one listing.
+
+    Participants are stored in a canonical order (user_a_id < user_b_id) so
+    each pair has one conversation per listing, and one without a listing:
+    the unique index covers COALESCE(product_id, '') because SQLite treats
+    NULLs as distinct in a plain unique constraint.
+    """
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True)
+    user_a_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_b_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    product_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_message_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_conversations_participants_product",
+            "user_a_id", "user_b_id", text("COALESCE(product_id, '')"),
+            unique=True,
+        ),
+        # A user's inbox, newest activity first, whichever side they are on
+        Index("ix_conversations_user_a_last_message_at", "user_a_id", "last_message_at"),
+        Index("ix_conversations_user_b_last_message_at", "user_b_id", "last_message_at"),
+    )
+
+class Message(Base):
+    __tablename__ = "messages"
+
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # History pages seek on (conversation, time); id breaks ties
+        Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at", "id"),
+    )
+
+class ProductChange(Base):
+    """Append-only log of listing writes, read by GET /products/changes.
+
+    AUTOINCREMENT keeps seq strictly increasing even after the newest rows are
+    compacted away, so a client's cursor can never be handed out twice.
+    """
+    __tablename__ = "product_changes"
+
+    seq = Column(Integer, primary_key=True)
+    product_id = Column(String, nullable=False)
+    op = Column(String, nullable=False)  # "upsert" or "delete"
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Latest entry per product, for the feed and for compaction
+        Index("ix_product_changes_product_id_seq", "product_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+class ChangeLogState(Base):
+    """Single row: the highest seq whose tombstone compaction has dropped."""
+    __tablename__ = "change_log_state"
+
+    id = Column(Integer, primary_key=True)
+    compacted_through = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, tuple_
+
+# Keyset (cursor) pagination.
+#
+# A page is addressed by the sort key of the last row the client saw, not by an
+# OFFSET, so fetching page N costs one index seek no matter how deep it is.
+# The cursor is opaque to clients: base64 of the sort name plus the key values.
+
+
+def encode_cursor(sort: str, values) -> str:
+    payload = [sort] + [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, columns) -> list:
+    """Decode a cursor for `sort`, converting values back to the column types."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        # Any JSON decodes, so check the shape: [sort, value, ...] with scalar values
+        if not isinstance(payload, list) or len(payload) != len(columns) + 1:
+            raise ValueError("cursor is not a key for these columns")
+        cursor_sort, values = payload[0], payload[1:]
+        if cursor_sort != sort:
+            raise ValueError("cursor does not match sort order")
+        if not all(v is None or isinstance(v, (str, int, float)) for v in values):
+            raise ValueError("cursor values must be scalars")
+        return [
+            datetime.fromisoformat(v) if _is_datetime(column) and v is not None else v
+            for column, v in zip(columns, values)
+        ]
+    except (ValueError, TypeError, IndexError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _is_datetime(column) -> bool:
+    try:
+        return column.type.python_type is datetime
+    except NotImplementedError:
+        return False
+
+
+def keyset_query(stmt, sort: str, columns, descending: bool, limit: int, after=None):
+    """Restrict a select to the page after `after`, ordered by `columns`.
+
+    `columns` must end with a unique column so the order is total. One extra
+    row is fetched to tell whether another page follows; pass the result rows
+    to keyset_page().
+    """
+    if after:
+        values = decode_cursor(after, sort, columns)
+        key = tuple_(*columns)
+        bound = tuple_(*[bindparam(None, v, type_=c.type) for c, v in zip(columns, values)])
+        stmt = stmt.where(key < bound if descending else key > bound)
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def keyset_page(rows, sort: str, columns, limit: int):
+    """Split keyset_query() rows into (page, next_cursor); the cursor is None on the last page."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, [getattr(last, c.key) for c in columns])
@@ -0,0 +1,114 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# Password hashing off the event loop.
+#
+# bcrypt costs hundreds of milliseconds of CPU per call, so hashes and checks
+# run in a dedicated process pool that can use every core. Work beyond
+# PASSWORD_QUEUE_LIMIT in-flight calls is rejected with 503 + Retry-After
+# instead of piling up behind the pool. A worker that dies (OOM killer, crash)
+# breaks the whole pool; it is replaced and the call retried once.
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 8)))
+
+# Changing BCRYPT_ROUNDS marks existing hashes as needing an update, and
+# verify_and_update() then returns a fresh hash on the next successful login.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+class PasswordPool:
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.rejected = 0
+        self.restarts = 0
+        # Moving average of one call's duration, used to size Retry-After
+        self.avg_seconds = 0.25
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the server process has threads (aiosqlite, anyio)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.in_flight / self.workers * self.avg_seconds))
+
+    def _busy(self) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    async def _submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # Every call in flight on the broken pool lands here; only the first replaces it
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.queue_limit:
+            self.rejected += 1
+            raise self._busy()
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            try:
+                return await self._submit(fn, *args)
+            except BrokenProcessPool:
+                # Hashing has no side effects, so running the call again is safe
+                try:
+                    return await self._submit(fn, *args)
+                except BrokenProcessPool:
+                    raise self._busy() from None
+        finally:
+            self.in_flight -= 1
+            self.avg_seconds = 0.9 * self.avg_seconds + 0.1 * (time.perf_counter() - start)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+
+async def hash_password(password: str) -> str:
+    return await password_pool.run(_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Check a password. Returns (valid, new_hash); new_hash is set when the
+    stored hash uses outdated settings and should be replaced."""
+    return await password_pool.run(_verify_and_update, password, hashed_password)
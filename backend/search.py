@@ -0,0 +1,115 @@
+import json
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Full-text index over product listings.
+#
+# SQLite FTS5 keeps an inverted index of title/description/category so /search
+# no longer has to load and decode every product row. The virtual table is a
+# side index written in the same session as the product row, so both land in
+# one commit.
+#
+# product_id is an UNINDEXED column, so a lookup by it scans the whole index.
+# Writes therefore find a listing's FTS row by rowid, through FTS_ROWIDS
+# (product id -> rowid, an INTEGER PRIMARY KEY that VACUUM never renumbers).
+
+FTS_TABLE = "products_fts"
+FTS_ROWIDS = "products_fts_rowids"
+
+# Column weights for bm25(): product_id (unindexed), title, description, category
+BM25_WEIGHTS = "0.0, 10.0, 1.0, 4.0"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fields(data: dict):
+    return {
+        "title": data.get("title") or "",
+        "description": data.get("description") or "",
+        "category": data.get("category") or "",
+    }
+
+
+_ROWID = f"(SELECT rowid FROM {FTS_ROWIDS} WHERE product_id = :id)"
+
+_INSERT = text(
+    f"INSERT INTO {FTS_TABLE} (rowid, product_id, title, description, category) "
+    f"SELECT rowid, :id, :title, :description, :category FROM {FTS_ROWIDS} WHERE product_id = :id"
+)
+
+
+def index_product(db: Session, product_id: str, data: dict):
+    """Add or replace a product in the index. The caller commits."""
+    db.execute(text(f"INSERT OR IGNORE INTO {FTS_ROWIDS} (product_id) VALUES (:id)"), {"id": product_id})
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = {_ROWID}"), {"id": product_id})
+    db.execute(_INSERT, {"id": product_id, **_fields(data)})
+
+
+def add_products(db, products):
+    """Index (product_id, data) pairs not yet in the index, in one executemany. The caller commits."""
+    params = [{"id": product_id, **_fields(data)} for product_id, data in products]
+    if params:
+        db.execute(text(f"INSERT INTO {FTS_ROWIDS} (product_id) VALUES (:id)"), [{"id": p["id"]} for p in params])
+        db.execute(_INSERT, params)
+
+
+def remove_product(db: Session, product_id: str):
+    """Drop a product from the index. The caller commits."""
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = {_ROWID}"), {"id": product_id})
+    db.execute(text(f"DELETE FROM {FTS_ROWIDS} WHERE product_id = :id"), {"id": product_id})
+
+
+def rebuild_search_index(db, batch_size: int = 1000):
+    """Re-index every product row, `batch_size` rows at a time. The caller commits.
+
+    `db` may be a Session or a Connection (migrations pass their connection).
+    """
+    db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    db.execute(text(f"DELETE FROM {FTS_ROWIDS}"))
+    last_id = ""
+    while True:
+        rows = db.execute(
+            text("SELECT id, data FROM products WHERE id > :last ORDER BY id LIMIT :n"),
+            {"last": last_id, "n": batch_size},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        products = []
+        for product_id, raw in rows:
+            # The ORM stores json.dumps() output in a JSON column, so raw rows are
+            # double-encoded.
+            try:
+                data = json.loads(json.loads(raw)) if raw else {}
+            except (TypeError, json.JSONDecodeError):
+                continue
+            products.append((product_id, data))
+        add_products(db, products)
+
+
+def build_match_query(query: str) -> str:
+    """Turn free text into an FTS5 expression: every term must match as a prefix.
+
+    Terms are quoted so user input can never be parsed as FTS5 syntax.
+    """
+    terms = _TOKEN_RE.findall(query.lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def ranked_product_ids(db: Session, query: str, limit: int):
+    """Return the ids of the best `limit` matches, ranked by BM25."""
+    match = build_match_query(query)
+    if not match:
+        return []
+    rows = db.execute(
+        text(
+            f"SELECT product_id FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH :match "
+            f"ORDER BY bm25({FTS_TABLE}, {BM25_WEIGHTS}) "
+            "LIMIT :limit"
+        ),
+        {"match": match, "limit": limit},
+    )
+    return [product_id for (product_id,) in rows]
@@ -0,0 +1,140 @@
+"""Demo listings for local development.
+
+    cd backend && python seed.py
+
+Idempotent: listings are keyed by fixed ids and only inserted when missing,
+so running it again (or from several workers) never duplicates or wipes rows.
+Run `alembic upgrade head` first.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import changes
+import search
+from models import ProductDB
+
+DEMO_PRODUCTS = [
+    ("1", {
+        "title": "EGN lab kit",
+        "price": "free",
+        "description": "My lab project kit which i used last semester. still like new. giving it away",
+        "category": "project kit",
+        "image": "https://i.redd.it/x46dlbbrwn081.jpg",
+        "contact": "email:abdukarimkhusenov@usf.edu"
+    }),
+    ("2", {
+        "title": "Grokking algorithm book",
+        "price": "$7.0",
+        "description": "Printed version of Grokking Algorithm book. Paper quality is good, you can read the content.",
+        "category": "books",
+        "image": "https://artemdemo.com/static/bd61bf0968541db117178677c6ea29af/dbdff/grokking-algorithms.jpg",
+        "contact": "instagram:ChazSeitz"
+    }),
+    ("3", {
+        "title": "Calculus Early Transcendentals",
+        "price": "$45",
+        "description": "8th edition, James Stewart. Some highlighting but in great condition. Perfect for Calc 1-3.",
+        "category": "books",
+        "image": "https://m.media-amazon.com/images/I/91eEDkBqO-L.jpg",
+        "contact": "email:sarah.math@usf.edu"
+    }),
+    ("4", {
+        "title": "TI-84 Plus Calculator",
+        "price": "$50",
+        "description": "Barely used TI-84 Plus graphing calculator. Comes with batteries and case.",
+        "category": "electronics",
+        "image": "https://m.media-amazon.com/images/I/71yrLllDokL._AC_UF894,1000_QL80_.jpg",
+        "contact": "instagram:calc_dealer"
+    }),
+    ("5", {
+        "title": "Chemistry Lab Goggles",
+        "price": "$5",
+        "description": "Used for one semester only. Still in perfect condition. Required for CHM 2045L.",
+        "category": "lab equipment",
+        "image": "https://m.media-amazon.com/images/I/71y29kw+PZL.jpg",
+        "contact": "email:chem.student@usf.edu"
+    }),
+    ("6", {
+        "title": "Physics Fundamentals",
+        "price": "$30",
+        "description": "Physics for Scientists and Engineers, 10th Edition. Some wear but all pages intact.",
+        "category": "books",
+        "image": "https://m.media-amazon.com/images/I/71HdgTLGUSL._AC_UF1000,1000_QL80_.jpg",
+        "contact": "instagram:physics_guru"
+    }),
+    ("7", {
+        "title": "Arduino Starter Kit",
+        "price": "$25",
+        "description": "Complete Arduino kit used for EGN 3000. Includes board, sensors, and components.",
+        "category": "electronics",
+        "image": "https://m.media-amazon.com/images/I/81a-MDAmb8L.jpg",
+        "contact": "email:maker.space@usf.edu"
+    }),
+    ("8", {
+        "title": "Study Desk",
+        "price": "$15",
+        "description": "Compact study desk, perfect for dorm room. Easy to assemble/disassemble.",
+        "category": "furniture",
+        "image": "https://m.media-amazon.com/images/I/71CkxVHzuGL._AC_UF894,1000_QL80_.jpg",
+        "contact": "instagram:dorm_deals"
+    }),
+    ("9", {
+        "title": "Biology Lab Manual",
+        "price": "free",
+        "description": "BSC 2010L lab manual. Unused, got it for free from a friend but dropped the class.",
+        "category": "books",
+        "image": "https://m.media-amazon.com/images/I/815jJO25vdL._AC_UF1000,1000_QL80_.jpg",
+        "contact": "email:bio.student@usf.edu"
+    }),
+    ("10", {
+        "title": "Engineering Drawing Set",
+        "price": "$12",
+        "description": "Professional drawing set with compass, rulers, and protractors. Used for EGN 3311.",
+        "category": "supplies",
+        "image": "https://m.media-amazon.com/images/I/71pO+zpB8hL.jpg",
+        "contact": "instagram:engineering_supplies"
+    }),
+    ("11", {
+        "title": "Computer Science Notes",
+        "price": "free",
+        "description": "Complete set of typed notes for COP 3514 and COP 4530. Includes practice problems.",
+        "category": "study materials",
+        "image": "https://notesdrive.com/wp-content/uploads/2022/05/2.png",
+        "contact": "email:cs.notes@usf.edu"
+    }),
+    ("12", {
+        "title": "Dorm Mini Fridge",
+        "price": "$40",
+        "description": "1.7 cu ft mini fridge, perfect working condition. Moving out of dorms.",
+        "category": "appliances",
+        "image": "https://dormessentials.hsa.net/cdn/shop/products/microfridge1_2568df25-de21-4eb5-8682-614dc5a3221d.jpg?v=1622426926&width=1214",
+        "contact": "instagram:dorm_essentials"
+    }),
+]
+
+
+def seed_demo_products(db: Session) -> int:
+    """Insert any missing demo listings. The caller commits; returns how many were added."""
+    ids = [product_id for product_id, _ in DEMO_PRODUCTS]
+    existing = set(db.scalars(select(ProductDB.id).where(ProductDB.id.in_(ids))))
+    added = 0
+    for product_id, data in DEMO_PRODUCTS:
+        if product_id in existing:
+            continue
+        db.add(ProductDB.from_data(product_id, data))
+        search.index_product(db, product_id, data)
+        changes.record_change(db, product_id, changes.UPSERT)
+        added += 1
+    return added
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    from catalog_snapshot import listings_changed
+
+    with SessionLocal() as db:
+        added = seed_demo_products(db)
+        db.commit()
+    listings_changed()
+    print(f"Added {added} demo listings")
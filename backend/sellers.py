@@ -0,0 +1,70 @@
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from models import ProductDB, User
+
+# Seller summaries embedded in listings.
+#
+# Stored fragments end in "seller":null, and each summary replaces that
+# trailing null, so listings are still never decoded and re-encoded. Routes
+# that read a page of rows read them as (api_json, owner_id) and load the
+# owners with one IN query for the whole page, not one query per listing.
+# Whole-catalog reads (and the shared snapshot, which is built from one) join
+# the owner's columns instead, since an IN list of every seller would be
+# unbounded. Summaries carry public profile fields only: no email.
+
+SELLER_NULL = ',"seller":null}'
+
+
+def summary_json(user_id: int, username: str, full_name: Optional[str]) -> str:
+    """A public summary, serialized the way pydantic serializes SellerSummary."""
+    summary = {"id": user_id, "username": username, "full_name": full_name}
+    return json.dumps(summary, ensure_ascii=False, separators=(",", ":"))
+
+
+def seller_json(user) -> str:
+    return summary_json(user.id, user.username, user.full_name)
+
+
+def join_sellers(stmt):
+    """Add the owner's summary columns to a select of (ProductDB.id, ProductDB.api_json), through one LEFT JOIN."""
+    return stmt.add_columns(User.id, User.username, User.full_name).outerjoin(User, User.id == ProductDB.owner_id)
+
+
+def joined_fragments(rows) -> Iterator[Tuple[str, str]]:
+    """(id, fragment) for each join_sellers() row, with its seller embedded.
+
+    A seller with many listings is serialized once per read.
+    """
+    summaries: Dict[int, str] = {}
+    for product_id, fragment, seller_id, username, full_name in rows:
+        if seller_id is not None:
+            summary = summaries.get(seller_id)
+            if summary is None:
+                summary = summaries[seller_id] = summary_json(seller_id, username, full_name)
+            fragment = with_seller(fragment, summary)
+        yield product_id, fragment
+
+
+async def seller_summaries(db, owner_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+    """owner id -> seller_json(), in one query for every distinct owner."""
+    ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+    if not ids:
+        return {}
+    rows = await db.execute(select(User.id, User.username, User.full_name).where(User.id.in_(ids)))
+    return {row.id: seller_json(row) for row in rows}
+
+
+def with_seller(fragment: str, seller: Optional[str]) -> str:
+    """A listing_json() fragment with its trailing null "seller" replaced."""
+    if seller is None or not fragment.endswith(SELLER_NULL):
+        return fragment
+    return fragment[:-len(SELLER_NULL)] + ',"seller":' + seller + "}"
+
+
+async def with_sellers(db, rows: List[Tuple[str, Optional[int]]]) -> List[str]:
+    """(api_json, owner_id) rows as fragments with their seller embedded."""
+    sellers = await seller_summaries(db, (owner_id for _, owner_id in rows))
+    return [with_seller(fragment, sellers.get(owner_id)) for fragment, owner_id in rows]
@@ -0,0 +1,261 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+import changes
+from database import ReadSessionLocal
+
+# "Similar listings": a sparse TF-IDF index over title, description and category.
+#
+# Each listing is a vector of field-weighted, sublinear term frequencies with
+# an idf-free length norm, so adding or removing a listing never touches any
+# other listing's vector; idf comes from live document frequencies at query
+# time. Postings are typed arrays (doc index, weight), appended on insert;
+# removals only mark the slot dead, and once enough slots are dead the index
+# is compacted: live listings and terms are renumbered without the gaps.
+#
+# A query scores candidates term-at-a-time, rarest term first. Candidates are
+# only admitted until SIMILAR_MAX_CANDIDATES, scanning postings newest first;
+# the remaining (common, low-idf) terms are then added to those candidates
+# from their own vectors instead of walking long posting lists.
+#
+# Every worker keeps its own index and catches up from the product change log
+# before answering, so writes from any process (or seed.py) are picked up
+# incrementally.
+
+SIMILAR_MAX_CANDIDATES = int(os.getenv("SIMILAR_MAX_CANDIDATES", "2000"))
+# Compact postings once this share of indexed slots belongs to removed listings
+COMPACT_DEAD_RATIO = 0.25
+FIELD_WEIGHTS = (("title", 3.0), ("description", 1.0))
+CATEGORY_WEIGHT = 2.0
+CATCH_UP_BATCH = 1000
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i if in is it its me my no not of on or so "
+    "that the this to was were will with you your".split()
+)
+
+
+def term_weights(data: dict) -> Dict[str, float]:
+    """Field-weighted, sublinear term frequencies for one listing."""
+    counts: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token in _TOKEN_RE.findall((data.get(field) or "").lower()):
+            if len(token) > 1 and token not in STOPWORDS:
+                counts[token] = counts.get(token, 0.0) + weight
+    category = (data.get("category") or "").strip().lower()
+    if category:
+        # One token for the whole category, so "project kit" is not "kit"
+        counts["category:" + category] = CATEGORY_WEIGHT
+    return {term: 1.0 + math.log(count) for term, count in counts.items()}
+
+
+class SimilarIndex:
+    def __init__(self, max_candidates: int = SIMILAR_MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.seq: Optional[int] = None  # last change log entry applied; None until built
+        self._vocab: Dict[str, int] = {}
+        self._df: List[int] = []  # live listings per term
+        self._posting_docs: List[array] = []
+        self._posting_weights: List[array] = []
+        self._ids: List[Optional[str]] = []  # doc index -> product id, None once removed
+        self._doc_terms: List[Optional[array]] = []
+        self._doc_weights: List[Optional[array]] = []
+        self._norms = array("f")
+        self._index_of: Dict[str, int] = {}
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._index_of)
+
+    def add(self, product_id: str, data: dict):
+        if product_id in self._index_of:
+            self.remove(product_id)
+        weights = term_weights(data)
+        doc = len(self._ids)
+        terms = array("i")
+        values = array("f")
+        for term, weight in weights.items():
+            tid = self._vocab.get(term)
+            if tid is None:
+                tid = self._vocab[term] = len(self._df)
+                self._df.append(0)
+                self._posting_docs.append(array("i"))
+                self._posting_weights.append(array("f"))
+            self._df[tid] += 1
+            self._posting_docs[tid].append(doc)
+            self._posting_weights[tid].append(weight)
+            terms.append(tid)
+            values.append(weight)
+        self._ids.append(product_id)
+        self._doc_terms.append(terms)
+        self._doc_weights.append(values)
+        self._norms.append(1.0 / math.sqrt(sum(w * w for w in values)) if values else 0.0)
+        self._index_of[product_id] = doc
+
+    def remove(self, product_id: str):
+        doc = self._index_of.pop(product_id, None)
+        if doc is None:
+            return
+        for tid in self._doc_terms[doc]:
+            self._df[tid] -= 1
+        self._ids[doc] = None
+        self._doc_terms[doc] = self._doc_weights[doc] = None
+        self._dead += 1
+        if self._dead > COMPACT_DEAD_RATIO * len(self._ids):
+            self._compact()
+
+    def _compact(self):
+        """Drop removed listings and unused terms, renumbering what is left in order.
+
+        Order is kept, so postings stay oldest first and a query's newest-first
+        scan still admits the most recent candidates.
+        """
+        doc_map = array("i", [-1]) * len(self._ids)
+        ids: List[Optional[str]] = []
+        for doc, product_id in enumerate(self._ids):
+            if product_id is not None:
+                doc_map[doc] = len(ids)
+                ids.append(product_id)
+        term_map = array("i", [-1]) * len(self._df)
+        vocab: Dict[str, int] = {}
+        for term, tid in self._vocab.items():
+            if self._df[tid] > 0:
+                term_map[tid] = len(vocab)
+                vocab[term] = len(vocab)
+
+        df = [0] * len(vocab)
+        posting_docs = [array("i") for _ in vocab]
+        posting_weights = [array("f") for _ in vocab]
+        for tid, new_tid in enumerate(term_map):
+            if new_tid < 0:
+                continue
+            df[new_tid] = self._df[tid]
+            for doc, weight in zip(self._posting_docs[tid], self._posting_weights[tid]):
+                if doc_map[doc] >= 0:
+                    posting_docs[new_tid].append(doc_map[doc])
+                    posting_weights[new_tid].append(weight)
+
+        live = [doc for doc, product_id in enumerate(self._ids) if product_id is not None]
+        self._doc_terms = [array("i", (term_map[tid] for tid in self._doc_terms[doc])) for doc in live]
+        self._doc_weights = [self._doc_weights[doc] for doc in live]
+        self._norms = array("f", (self._norms[doc] for doc in live))
+        self._ids = ids
+        self._index_of = {product_id: doc for doc, product_id in enumerate(ids)}
+        self._vocab, self._df = vocab, df
+        self._posting_docs, self._posting_weights = posting_docs, posting_weights
+        self._dead = 0
+
+    def _idf(self, tid: int) -> float:
+        return math.log((len(self._index_of) + 1) / (self._df[tid] + 1)) + 1.0
+
+    def similar(self, product_id: str, limit: int) -> Optional[List[Tuple[str, float]]]:
+        """The `limit` most similar listings as (product id, score), or None if unknown."""
+        doc = self._index_of.get(product_id)
+        if doc is None:
+            return None
+        query = sorted(zip(self._doc_terms[doc], self._doc_weights[doc]), key=lambda term: self._df[term[0]])
+        scores: Dict[int, float] = {}
+        deferred: Dict[int, float] = {}
+        for tid, weight in query:
+            if self._df[tid] <= 1:
+                continue  # only this listing has it
+            idf = self._idf(tid)
+            query_weight = weight * idf * idf
+            if len(scores) >= self.max_candidates:
+                deferred[tid] = query_weight
+                continue
+            admitting = True
+            docs, weights = self._posting_docs[tid], self._posting_weights[tid]
+            # Newest first, so if candidates run out the recent listings are kept
+            for i in range(len(docs) - 1, -1, -1):
+                candidate = docs[i]
+                if candidate in scores:
+                    scores[candidate] += query_weight * weights[i]
+                elif admitting:
+                    scores[candidate] = query_weight * weights[i]
+                    admitting = len(scores) < self.max_candidates
+        scores.pop(doc, None)
+
+        ranked = []
+        for candidate, score in scores.items():
+            terms = self._doc_terms[candidate]
+            if terms is None:
+                continue
+            if deferred:
+                for tid, weight in zip(terms, self._doc_weights[candidate]):
+                    query_weight = deferred.get(tid)
+                    if query_weight is not None:
+                        score += query_weight * weight
+            ranked.append((score * self._norms[candidate], candidate))
+        best = heapq.nlargest(limit, ranked)
+        return [(self._ids[candidate], score) for score, candidate in best]
+
+    def stats(self) -> dict:
+        return {
+            "listings": len(self._index_of),
+            "terms": len(self._vocab),
+            "postings": sum(len(docs) for docs in self._posting_docs),
+            "dead": self._dead,
+            "seq": self.seq,
+        }
+
+    def build(self, db):
+        """Index every listing from scratch, in the caller's read transaction."""
+        seq = changes.latest_seq(db)
+        self._reset()
+        for product_id, api_json in db.execute(text("SELECT id, api_json FROM products")):
+            if api_json:
+                self.add(product_id, json.loads(api_json))
+        self.seq = seq
+
+    def catch_up(self, db):
+        """Apply change log entries past self.seq; rebuild if compaction dropped some."""
+        if self.seq is None or self.seq < changes.compacted_through(db):
+            self.build(db)
+            return
+        while True:
+            rows = changes.latest_changes(db, self.seq, CATCH_UP_BATCH)
+            for seq, product_id, api_json in rows:
+                if api_json is None:
+                    self.remove(product_id)
+                else:
+                    self.add(product_id, json.loads(api_json))
+                self.seq = seq
+            if len(rows) < CATCH_UP_BATCH:
+                return
+
+
+similar_index = SimilarIndex()
+
+
+def warm():
+    """Build the index ahead of the first request; a large catalog takes seconds."""
+    with similar_index.lock:
+        with ReadSessionLocal() as db:
+            similar_index.catch_up(db)
+
+
+def start():
+    threading.Thread(target=warm, name="similar-index", daemon=True).start()
+
+
+def similar_listings(product_id: str, limit: int) -> Optional[List[str]]:
+    """Ids of the listings most similar to `product_id`, after catching up. Blocking."""
+    with similar_index.lock:
+        with ReadSessionLocal() as db:
+            similar_index.catch_up(db)
+        result = similar_index.similar(product_id, limit)
+    return None if result is None else [product_id for product_id, _ in result]
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from models import ImageBlob
+
+# Content-addressed image storage.
+#
+# Uploads are streamed in fixed-size chunks to a temp file (disk writes off the
+# event loop) while being hashed, then stored as uploads/ab/cd/<sha256><ext>.
+# Identical photos therefore share one file; image_blobs counts the listings
+# that reference each one so a file is only removed with its last listing.
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads"))
+# Outside UPLOAD_DIR so half-written files are never served, but on the same
+# filesystem so publishing is an atomic rename
+UPLOAD_TMP_DIR = os.path.join(os.path.dirname(UPLOAD_DIR), ".upload_tmp")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Room for the listing's other form fields and the multipart framing
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,8}$")
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+@dataclass
+class StagedUpload:
+    temp_path: str
+    digest: str
+    size: int
+    path: str  # final location, relative to UPLOAD_DIR
+
+
+def blob_path(digest: str, extension: str) -> str:
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def blob_digest(image_path: str) -> Optional[str]:
+    """The sha256 a content-addressed image path was named after, if it is one."""
+    digest = os.path.splitext(os.path.basename(image_path))[0]
+    return digest if _DIGEST_RE.match(digest) else None
+
+
+def _extension(filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    return extension if _EXTENSION_RE.match(extension) else ""
+
+
+def _too_large():
+    return HTTPException(status_code=413, detail=f"Image is larger than {MAX_UPLOAD_BYTES} bytes")
+
+
+async def stage_upload(upload: UploadFile) -> StagedUpload:
+    """Stream an upload to a temp file, hashing it and enforcing MAX_UPLOAD_BYTES."""
+    if upload.size is not None and upload.size > MAX_UPLOAD_BYTES:
+        raise _too_large()
+    os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise _too_large()
+                hasher.update(chunk)
+                await run_in_threadpool(temp_file.write, chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    digest = hasher.hexdigest()
+    return StagedUpload(temp_path, digest, size, blob_path(digest, _extension(upload.filename or "")))
+
+
+class UploadSizeLimitMiddleware:
+    """Refuse oversized upload requests before their body is parsed.
+
+    Starlette reads the whole multipart form, spooling files to disk, before
+    the route runs, so stage_upload() alone would still accept and store any
+    body size. A declared Content-Length over the limit is answered with 413
+    without reading the body; a body without one is cut off once it passes
+    the limit.
+    """
+
+    def __init__(
+        self, app, routes=(("POST", "/products"),), max_bytes: int = MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD_BYTES
+    ):
+        self.app = app
+        self.routes = set(routes)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            response = JSONResponse({"detail": _too_large().detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _publish(staged: StagedUpload):
+    destination = os.path.join(UPLOAD_DIR, staged.path)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    # Same name means same bytes, so replacing an existing copy is harmless and
+    # guarantees the file exists once the referencing row is committed
+    os.replace(staged.temp_path, destination)
+
+
+async def publish_upload(staged: StagedUpload):
+    """Move a staged upload into place. Call after the listing commits."""
+    await run_in_threadpool(_publish, staged)
+
+
+def discard_upload(staged: StagedUpload):
+    if os.path.exists(staged.temp_path):
+        os.unlink(staged.temp_path)
+
+
+def acquire_blob(db: Session, staged: StagedUpload) -> str:
+    """Count one more reference to the staged blob. The caller commits.
+
+    Returns the blob's stored path, which may carry a different extension when
+    the same bytes were first uploaded under another name; `staged.path` is
+    updated to match.
+    """
+    stmt = insert(ImageBlob).values(digest=staged.digest, path=staged.path, size=staged.size, refcount=1)
+    staged.path = db.scalar(
+        stmt.on_conflict_do_update(
+            index_elements=[ImageBlob.digest],
+            set_={"refcount": ImageBlob.refcount + 1},
+        ).returning(ImageBlob.path)
+    )
+    return staged.path
+
+
+def release_blob(db: Session, image_path: Optional[str]) -> Optional[str]:
+    """Drop one reference to an uploaded image. The caller commits.
+
+    Returns the absolute path to delete once the commit succeeds, or None if
+    the file is still referenced (or is not a local upload).
+    """
+    if not image_path or image_path.startswith(("http://", "https://")):
+        return None
+    digest = blob_digest(image_path)
+    blob = db.get(ImageBlob, digest) if digest else None
+    if blob is None:
+        # Listing from before content addressing: the file is its own
+        legacy = os.path.join(UPLOAD_DIR, os.path.basename(image_path))
+        return legacy if os.path.isfile(legacy) else None
+    blob.refcount -= 1
+    if blob.refcount > 0:
+        return None
+    db.delete(blob)
+    return os.path.join(UPLOAD_DIR, blob.path)
+
+
+def remove_unreferenced(db: Session, absolute_path: str):
+    """Delete a released file unless a concurrent upload re-acquired it. The caller commits.
+
+    `db` must be a writer session: its transaction holds SQLite's write lock
+    (BEGIN IMMEDIATE) from the refcount check until the commit, and
+    acquire_blob() needs that lock, so no upload can reference the file
+    between the check and the unlink.
+    """
+    digest = blob_digest(absolute_path)
+    if digest is not None:
+        # Queried, not db.get(): the identity map may hold a row from before the release
+        refcount = db.scalar(select(ImageBlob.refcount).where(ImageBlob.digest == digest))
+        if refcount:
+            return
+    try:
+        os.remove(absolute_path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,144 @@
+import bisect
+import heapq
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+
+import changes
+from database import ReadSessionLocal
+from similar import STOPWORDS
+
+# Typeahead suggestions for the search box.
+#
+# The suggestions are title terms and whole category names, weighted by how
+# many live listings use them. They sit in one sorted list, so the terms
+# starting with a prefix are a contiguous slice found with two bisects, and
+# the top k come from that slice by listing count. Each listing's own terms
+# are kept so a delete or an edit can take its counts back.
+#
+# Nothing is built at startup: the first /suggest call loads every listing.
+# After that, each call applies the product change log entries it has not
+# seen yet, so writes from any worker show up. Results for recent prefixes
+# are cached until the next change, since typing repeats short prefixes.
+
+SUGGEST_CACHE_SIZE = int(os.getenv("SUGGEST_CACHE_SIZE", "4096"))
+CATCH_UP_BATCH = 1000
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def suggestion_terms(data: dict) -> Tuple[str, ...]:
+    """The distinct suggestions one listing contributes."""
+    terms = {
+        token for token in _TOKEN_RE.findall((data.get("title") or "").lower())
+        if len(token) > 1 and token not in STOPWORDS
+    }
+    category = " ".join((data.get("category") or "").lower().split())
+    if category:
+        terms.add(category)
+    return tuple(terms)
+
+
+class SuggestIndex:
+    def __init__(self, cache_size: int = SUGGEST_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.seq = None  # last change log entry applied; None until built
+        self._terms: List[str] = []  # sorted
+        self._counts: Dict[str, int] = {}
+        self._listing_terms: Dict[str, Tuple[str, ...]] = {}
+        self._cache: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+
+    def add(self, product_id: str, data: dict):
+        self.remove(product_id)
+        terms = suggestion_terms(data)
+        for term in terms:
+            count = self._counts.get(term, 0)
+            if count == 0:
+                bisect.insort(self._terms, term)
+            self._counts[term] = count + 1
+        self._listing_terms[product_id] = terms
+        self._cache.clear()
+
+    def remove(self, product_id: str):
+        terms = self._listing_terms.pop(product_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            count = self._counts[term] - 1
+            if count:
+                self._counts[term] = count
+            else:
+                del self._counts[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+        self._cache.clear()
+
+    def suggest(self, prefix: str, limit: int) -> List[str]:
+        """Up to `limit` terms starting with `prefix`, most listings first."""
+        prefix = " ".join(prefix.lower().split())
+        if not prefix:
+            return []
+        key = (prefix, limit)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + "\U0010ffff", start)
+        counts = self._counts
+        # Ties go to the alphabetically first term, so results are stable
+        result = heapq.nsmallest(limit, self._terms[start:end], key=lambda term: (-counts[term], term))
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def build(self, db):
+        """Load every listing from scratch, in the caller's read transaction."""
+        seq = changes.latest_seq(db)
+        self._terms, self._counts, self._listing_terms = [], {}, {}
+        for product_id, api_json in db.execute(text("SELECT id, api_json FROM products")):
+            if api_json:
+                terms = suggestion_terms(json.loads(api_json))
+                self._listing_terms[product_id] = terms
+                for term in terms:
+                    self._counts[term] = self._counts.get(term, 0) + 1
+        # One sort instead of an insort per new term
+        self._terms = sorted(self._counts)
+        self._cache.clear()
+        self.seq = seq
+
+    def catch_up(self, db):
+        """Apply change log entries past self.seq; rebuild if compaction dropped some."""
+        if self.seq is None or self.seq < changes.compacted_through(db):
+            self.build(db)
+            return
+        while True:
+            rows = changes.latest_changes(db, self.seq, CATCH_UP_BATCH)
+            for seq, product_id, api_json in rows:
+                if api_json is None:
+                    self.remove(product_id)
+                else:
+                    self.add(product_id, json.loads(api_json))
+                self.seq = seq
+            if len(rows) < CATCH_UP_BATCH:
+                return
+
+    def stats(self) -> dict:
+        return {"terms": len(self._terms), "listings": len(self._listing_terms), "cached": len(self._cache), "seq": self.seq}
+
+
+suggest_index = SuggestIndex()
+
+
+def suggestions(prefix: str, limit: int) -> List[str]:
+    """Suggestions for `prefix` after catching up with the change log. Blocking."""
+    with suggest_index.lock:
+        with ReadSessionLocal() as db:
+            suggest_index.catch_up(db)
+        return suggest_index.suggest(prefix, limit)
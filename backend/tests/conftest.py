@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pytest
+
+# The app reads its configuration from the environment at import time, so a
+# scratch database and upload directory are set up before anything imports
+# main. The catalog is the benchmarks' generator: LISTINGS listings spread
+# over USERS accounts, all with catalog.PASSWORD.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+LISTINGS = 600
+USERS = 3
+
+WORKDIR = tempfile.mkdtemp(prefix="bullshub-tests-")
+DB_PATH = os.path.join(WORKDIR, "test.db")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{DB_PATH}",
+    "UPLOAD_DIR": os.path.join(WORKDIR, "uploads"),
+    "ENVIRONMENT": "production",
+    "RATE_LIMITS_ENABLED": "false",
+    # Every request reaches the database, so statement counts are per request
+    "CATALOG_CACHE_MAX_BYTES": "0",
+    "MAX_UPLOAD_BYTES": str(256 * 1024),
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_WORKERS": "1",
+})
+
+import catalog  # noqa: E402
+
+catalog.generate(DB_PATH, LISTINGS, USERS, bcrypt_rounds=4)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+        # Let a pending snapshot rebuild finish before the scratch directory goes
+        deadline = time.monotonic() + 10
+        while main.catalog_snapshots.current() is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+def auth_headers(client, username: str, password: str = catalog.PASSWORD) -> dict:
+    response = client.post("/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def user_headers(client):
+    """Bearer headers for user0, who owns about LISTINGS / USERS listings."""
+    return auth_headers(client, "user0")
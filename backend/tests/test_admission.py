@@ -0,0 +1,108 @@
+import asyncio
+
+from starlette.responses import PlainTextResponse
+
+from admission import AdmissionMiddleware, MemoryRateBackend, RouteLimit, SQLiteRateBackend
+
+LOGIN = ("POST", "/login")
+
+
+def limited(limit: RouteLimit, backend=None, rate_limits_enabled: bool = True):
+    """AdmissionMiddleware limiting POST /login alone, around an app that counts its calls."""
+    async def app(scope, receive, send):
+        app.calls += 1
+        if app.release is not None:
+            await app.release.wait()
+        await PlainTextResponse("ok")(scope, receive, send)
+    app.calls, app.release = 0, None
+
+    middleware = AdmissionMiddleware(
+        app, limits={LOGIN: ("login", limit)}, backend=backend or MemoryRateBackend(),
+        rate_limits_enabled=rate_limits_enabled,
+    )
+    return middleware, app
+
+
+async def call(middleware, method="POST", path="/login", client="10.0.0.1"):
+    """Returns (status, headers) of one request."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "client": (client, 40000)}
+    await middleware(scope, receive, send)
+    return messages[0]["status"], dict(messages[0]["headers"])
+
+
+def statuses(middleware, count, **kwargs):
+    async def run():
+        return [(await call(middleware, **kwargs))[0] for _ in range(count)]
+    return asyncio.run(run())
+
+
+def test_client_over_its_rate_gets_429_with_retry_after():
+    middleware, app = limited(RouteLimit(max_concurrent=0, rate_per_second=0.1, burst=2))
+    assert statuses(middleware, 2) == [200, 200]
+
+    status, headers = asyncio.run(call(middleware))
+    assert status == 429
+    # One token refills in 1 / 0.1 seconds
+    assert headers[b"retry-after"] == b"10"
+    assert app.calls == 2
+    # Buckets are per client, and routes without a limit pass straight through
+    assert statuses(middleware, 2, client="10.0.0.2") == [200, 200]
+    assert statuses(middleware, 3, path="/register") == [200, 200, 200]
+
+
+def test_bucket_refills_at_the_route_rate():
+    middleware, _ = limited(RouteLimit(max_concurrent=0, rate_per_second=50, burst=1))
+    assert statuses(middleware, 2) == [200, 429]
+    asyncio.run(asyncio.sleep(0.05))
+    assert statuses(middleware, 1) == [200]
+
+
+def test_workers_sharing_a_sqlite_backend_share_one_budget(tmp_path):
+    path = str(tmp_path / "rate.db")
+    limit = RouteLimit(max_concurrent=0, rate_per_second=0.1, burst=2)
+    first, _ = limited(limit, SQLiteRateBackend(path))
+    second, _ = limited(limit, SQLiteRateBackend(path))
+    assert statuses(first, 1) + statuses(second, 1) + statuses(first, 1) == [200, 200, 429]
+
+
+def test_request_over_the_concurrency_cap_gets_503_with_retry_after():
+    middleware, app = limited(RouteLimit(max_concurrent=1, rate_per_second=0, burst=0))
+
+    async def run():
+        app.release = asyncio.Event()
+        slow = asyncio.create_task(call(middleware))
+        while app.calls == 0:
+            await asyncio.sleep(0)
+        busy = await call(middleware)
+        app.release.set()
+        return (await slow)[0], busy, await call(middleware)
+
+    first, (status, headers), after = asyncio.run(run())
+    assert (first, status, after[0]) == (200, 503, 200)
+    assert int(headers[b"retry-after"]) >= 1
+    assert app.calls == 2
+
+
+def test_disabling_rate_limits_keeps_the_concurrency_cap():
+    middleware, app = limited(RouteLimit(max_concurrent=1, rate_per_second=0.1, burst=1), rate_limits_enabled=False)
+    assert statuses(middleware, 3) == [200, 200, 200]
+
+    async def run():
+        app.release = asyncio.Event()
+        slow = asyncio.create_task(call(middleware))
+        while app.calls == 3:
+            await asyncio.sleep(0)
+        busy = await call(middleware)
+        app.release.set()
+        await slow
+        return busy[0]
+
+    assert asyncio.run(run()) == 503
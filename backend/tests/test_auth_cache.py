@@ -0,0 +1,64 @@
+import time
+
+from auth_cache import TokenCache, UserSnapshot
+from catalog_snapshot import GenerationCounter
+from conftest import auth_headers
+
+ALICE = UserSnapshot(id=1, username="alice", email=None, full_name="Alice", bio=None, location=None, created_at=None)
+BOB = UserSnapshot(id=2, username="bob", email=None, full_name="Bob", bio=None, location=None, created_at=None)
+
+
+def make_cache(path: str, ttl_seconds: float = 60) -> TokenCache:
+    # Its own mapping of the counter file, as in another worker process
+    return TokenCache(ttl_seconds, 100, GenerationCounter(path))
+
+
+def test_profile_change_in_one_worker_reaches_the_others_on_their_next_lookup(tmp_path):
+    path = str(tmp_path / "users.db.users-gen")
+    editing_worker, other_worker = make_cache(path), make_cache(path)
+    for cache in (editing_worker, other_worker):
+        cache.put("alice-token", ALICE)
+        cache.put("bob-token", BOB)
+
+    editing_worker.invalidate_user(ALICE.id)
+    assert editing_worker.get("alice-token") is None
+    # Not after the TTL: the very next lookup. Which user changed is not
+    # shared, so the other worker drops everyone's tokens.
+    assert other_worker.get("alice-token") is None
+    assert other_worker.get("bob-token") is None
+
+    other_worker.put("alice-token", ALICE)
+    assert other_worker.get("alice-token") is ALICE
+
+
+def test_user_loaded_across_an_invalidation_is_not_cached(tmp_path):
+    path = str(tmp_path / "users.db.users-gen")
+    editing_worker, other_worker = make_cache(path), make_cache(path)
+
+    version = other_worker.current_version()
+    editing_worker.invalidate_user(ALICE.id)  # commits while other_worker is still loading
+    other_worker.put("alice-token", ALICE, version=version)
+    assert other_worker.get("alice-token") is None
+
+    version = editing_worker.current_version()
+    editing_worker.invalidate_user(ALICE.id)
+    editing_worker.put("alice-token", ALICE, version=version)
+    assert editing_worker.get("alice-token") is None
+
+
+def test_without_a_shared_counter_the_ttl_bounds_other_workers():
+    editing_worker, other_worker = TokenCache(0.05, 100), TokenCache(0.05, 100)
+    other_worker.put("alice-token", ALICE)
+
+    editing_worker.invalidate_user(ALICE.id)
+    assert other_worker.get("alice-token") is ALICE
+    time.sleep(0.06)
+    assert other_worker.get("alice-token") is None
+
+
+def test_profile_update_is_seen_with_a_cached_token(client):
+    headers = auth_headers(client, "user1")
+    assert client.get("/user/profile", headers=headers).json()["full_name"] != "Renamed Seller"
+    response = client.put("/user/profile", json={"full_name": "Renamed Seller"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert client.get("/user/profile", headers=headers).json()["full_name"] == "Renamed Seller"
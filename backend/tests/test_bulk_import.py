@@ -0,0 +1,49 @@
+import json
+
+from conftest import auth_headers
+
+ROWS = [
+    {"title": f"Imported lamp {i}", "price": "$5", "category": "furniture", "contact": "email:importer@usf.edu"}
+    for i in range(3)
+]
+
+
+def ndjson(rows) -> bytes:
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+def test_import_requires_a_user(client):
+    response = client.post("/products/import", content=ndjson(ROWS))
+    assert response.status_code == 401
+
+
+def test_imported_listings_belong_to_the_importer(client):
+    assert client.post("/register", data={"username": "importer", "password": "importer-password"}).status_code == 200
+    headers = auth_headers(client, "importer", "importer-password")
+
+    response = client.post("/products/import", content=ndjson(ROWS), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["inserted"] == len(ROWS)
+
+    listings = client.get("/user/listings", headers=headers).json()
+    assert sorted(item["title"] for item in listings) == sorted(row["title"] for row in ROWS)
+    assert {item["seller"]["username"] for item in listings} == {"importer"}
+
+
+def test_exported_listings_import_back(client):
+    assert client.post("/register", data={"username": "reimporter", "password": "reimporter-password"}).status_code == 200
+    headers = auth_headers(client, "reimporter", "reimporter-password")
+    exported = [json.loads(line) for line in client.get("/products/export").content.splitlines()[:5]]
+
+    # New ids, so the copies do not collide with the originals
+    copies = [{key: value for key, value in item.items() if key != "id"} for item in exported]
+    response = client.post("/products/import", content=ndjson(copies), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["inserted"] == len(copies), response.json()
+
+    listings = client.get("/user/listings", headers=headers).json()
+    fields = ("title", "price", "description", "category", "image", "contact")
+    assert sorted(tuple(item[f] for f in fields) for item in listings) == sorted(
+        tuple(item[f] for f in fields) for item in exported
+    )
+    assert {item["seller"]["username"] for item in listings} == {"reimporter"}
@@ -0,0 +1,39 @@
+from catalog_cache import CachedResponse, CatalogCache, LRUCache
+from catalog_snapshot import GenerationCounter
+
+ENTRY = CachedResponse(body=b"[]", etag='"0"')
+
+
+def make_cache(path: str) -> CatalogCache:
+    cache = CatalogCache(GenerationCounter(path))
+    # The suite runs with CATALOG_CACHE_MAX_BYTES=0, which stores nothing
+    cache.lists = LRUCache(8, 1 << 20)
+    cache.items = LRUCache(8, 1 << 20)
+    return cache
+
+
+def test_write_in_another_worker_drops_cached_responses(tmp_path):
+    path = str(tmp_path / "catalog.db.snapshot-gen")
+    cache = make_cache(path)
+    other_worker = GenerationCounter(path)  # its own mapping, as in another process
+
+    cache.put_list("all", ENTRY, cache.version)
+    cache.put_item("a", ENTRY, cache.version)
+    assert cache.get_list("all") is ENTRY
+    assert cache.get_item("a") is ENTRY
+
+    other_worker.increment()
+    assert cache.get_list("all") is None
+    assert cache.get_item("a") is None
+
+
+def test_response_built_across_another_workers_write_is_not_stored(tmp_path):
+    path = str(tmp_path / "catalog.db.snapshot-gen")
+    cache = make_cache(path)
+    version = cache.version
+
+    GenerationCounter(path).increment()
+    cache.put_list("all", ENTRY, version)
+    cache.put_item("a", ENTRY, version)
+    assert cache.get_list("all") is None
+    assert cache.get_item("a") is None
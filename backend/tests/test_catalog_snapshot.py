@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+
+import main
+from catalog_snapshot import HEADER, CatalogSnapshots, GenerationCounter
+from conftest import DB_PATH
+from database import read_engine
+
+SNAPSHOT_PATH = DB_PATH + ".snapshot"
+
+
+def worker(tmp_path) -> CatalogSnapshots:
+    """A worker's view of a snapshot in tmp_path; each call maps the counter and file anew."""
+    return CatalogSnapshots(str(tmp_path / "catalog.snapshot"), read_engine, GenerationCounter(str(tmp_path / "gen")))
+
+
+def wait_for_current(snapshots: CatalogSnapshots):
+    deadline = time.monotonic() + 10
+    while (snapshot := snapshots.current()) is None:
+        assert time.monotonic() < deadline, "snapshot was not rebuilt"
+        time.sleep(0.02)
+    return snapshot
+
+
+def catalog_size() -> int:
+    with read_engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT count(*) FROM products").scalar()
+
+
+def test_write_retires_the_snapshot_in_every_worker_until_rebuilt(tmp_path):
+    writer, reader = worker(tmp_path), worker(tmp_path)
+    assert writer.current() is None  # nothing built yet: read the database, build in the background
+    built = wait_for_current(writer)
+    assert reader.current().etag == built.etag
+    assert built.count == catalog_size()
+
+    writer.changed()
+    assert reader.current() is None
+    rebuilt = wait_for_current(reader)
+    assert rebuilt.generation == reader.generation() > built.generation
+    # The old mapping stays valid for responses still holding a view of it
+    assert bytes(built.listing_array()[:1]) == b"["
+
+
+@pytest.mark.parametrize("keep", [0, 10, HEADER.size + 8, 0.5])
+def test_damaged_file_is_treated_as_missing_and_replaced(tmp_path, keep):
+    path = str(tmp_path / "catalog.snapshot")
+    assert worker(tmp_path).rebuild()
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(int(size * keep) if isinstance(keep, float) else keep)
+
+    snapshots = worker(tmp_path)
+    assert snapshots.current() is None
+    rebuilt = wait_for_current(snapshots)
+    assert os.path.getsize(path) == size
+    assert rebuilt.count == catalog_size()
+
+
+def test_api_serves_from_the_database_while_the_snapshot_is_damaged(client, monkeypatch):
+    live = wait_for_current(main.catalog_snapshots)
+    expected = client.get("/products").json()
+    # Cut off mid-array, with a current generation: as if a crash lost the
+    # end of the file. Replaced rather than truncated in place, since the live
+    # mapping must stay intact.
+    with open(SNAPSHOT_PATH, "rb") as f:
+        head = f.read(os.path.getsize(SNAPSHOT_PATH) // 2)
+    with open(SNAPSHOT_PATH + ".damaged", "wb") as f:
+        f.write(head)
+    os.replace(SNAPSHOT_PATH + ".damaged", SNAPSHOT_PATH)
+    # A worker started after the damage, so it has to map the file
+    started = CatalogSnapshots(SNAPSHOT_PATH, read_engine, main.catalog_snapshots.counter)
+    monkeypatch.setattr(main, "catalog_snapshots", started)
+
+    response = client.get("/products")
+    assert response.status_code == 200
+    assert response.json() == expected
+    assert client.get(f"/products/{expected[0]['id']}").json() == expected[0]
+    rebuilt = wait_for_current(started)
+    assert (rebuilt.count, rebuilt.etag) == (len(expected), live.etag)
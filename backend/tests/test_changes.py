@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+
+import changes
+import main
+from conftest import auth_headers
+from database import SessionLocal
+
+
+def create_listing(client, headers, title: str) -> str:
+    response = client.post(
+        "/products",
+        data={"title": title, "price": "12", "description": "Feed test", "category": "other",
+              "contact": "email:feed@usf.edu"},
+        files={"photo": ("feed.jpg", b"\xff\xd8\xff\xe0 feed", "image/jpeg")},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["product_id"]
+
+
+def head_seq(client) -> int:
+    return int(client.get("/products", params={"limit": 1}).headers["X-Change-Seq"])
+
+
+def feed(client, since: int, limit: int = changes.CHANGE_FEED_MAX_LIMIT) -> dict:
+    response = client.get("/products/changes", params={"since": since, "limit": limit})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_create_then_delete_reads_as_upserts_then_one_tombstone(client):
+    headers = auth_headers(client, "user1")
+    since = head_seq(client)
+    first = create_listing(client, headers, "Feed lamp")
+    second = create_listing(client, headers, "Feed chair")
+
+    body = feed(client, since)
+    assert [(c["op"], c["product_id"]) for c in body["changes"]] == [("upsert", first), ("upsert", second)]
+    # Feed entries are the stored listing: a rename writes no entry, so they carry no seller
+    assert body["changes"][0]["product"] == {**client.get(f"/products/{first}").json(), "seller": None}
+    assert body["changes"][0]["seq"] < body["changes"][1]["seq"] == body["next"]
+    assert body["more"] is False
+
+    assert client.delete(f"/products/{first}").status_code == 200
+    # Only each product's latest entry, in seq order: the delete moves first after second
+    body = feed(client, since)
+    assert [(c["op"], c["product_id"]) for c in body["changes"]] == [("upsert", second), ("delete", first)]
+    assert "product" not in body["changes"][1]
+    # A client already at the create sees just the tombstone
+    assert [c["op"] for c in feed(client, body["changes"][0]["seq"])["changes"]] == ["delete"]
+    assert client.delete(f"/products/{second}").status_code == 200
+
+
+def test_x_change_seq_is_where_the_feed_continues(client, user_headers):
+    seq = head_seq(client)
+    assert feed(client, seq) == {"changes": [], "next": seq, "more": False}
+    with SessionLocal() as db:
+        assert seq == changes.latest_seq(db)
+
+    product_id = create_listing(client, user_headers, "Feed desk")
+    assert head_seq(client) > seq
+    assert [c["product_id"] for c in feed(client, seq)["changes"]] == [product_id]
+    assert client.delete(f"/products/{product_id}").status_code == 200
+
+
+def test_limit_pages_through_the_whole_replay(client):
+    everything = feed(client, 0)
+    assert everything["more"] is False
+    assert len(everything["changes"]) >= 3
+
+    pages, since, more = [], 0, True
+    while more:
+        body = feed(client, since, limit=2)
+        assert len(body["changes"]) <= 2
+        pages += body["changes"]
+        since, more = body["next"], body["more"]
+    assert pages == everything["changes"]
+    assert since == everything["next"]
+    assert client.get("/products/changes", params={"limit": changes.CHANGE_FEED_MAX_LIMIT + 1}).status_code == 422
+
+
+def test_cursor_behind_compacted_tombstones_gets_410(client, user_headers):
+    product_id = create_listing(client, user_headers, "Feed shelf")
+    before_delete = head_seq(client)
+    assert client.delete(f"/products/{product_id}").status_code == 200
+    replay = feed(client, 0)["changes"]
+
+    with SessionLocal() as db:
+        result = changes.compact(db, tombstone_days=0)
+    horizon = result["compacted_through"]
+    assert horizon > before_delete
+
+    for path in ("/products/changes", "/products/changes/stream"):
+        response = client.get(path, params={"since": before_delete})
+        assert response.status_code == 410
+        assert "since=0" in response.json()["detail"]
+    # A full replay still works, and only lost the tombstones
+    assert feed(client, 0)["changes"] == [c for c in replay if c["op"] == "upsert"]
+    assert feed(client, horizon)["more"] is False
+    # The dropped tombstones were the newest entries; X-Change-Seq must not fall behind them
+    assert head_seq(client) == horizon
+    assert feed(client, head_seq(client))["changes"] == []
+
+
+def read_events(client, since: int, count: int, started: threading.Event) -> list:
+    """Run GET /products/changes/stream on the app's loop until `count` events arrive."""
+    events, done, requested = [], None, False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+            started.set()
+        for block in message.get("body", b"").decode().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if fields.get("event") == "changes":
+                events.append((int(fields["id"]), json.loads(fields["data"])))
+                if len(events) == count:
+                    done.set()
+
+    async def run():
+        nonlocal done
+        done = asyncio.Event()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/products/changes/stream", "raw_path": b"/products/changes/stream",
+            "query_string": f"since={since}".encode(), "root_path": "", "headers": [],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        await asyncio.wait_for(main.app(scope, receive, send), 10)
+
+    client.portal.call(run)
+    return events
+
+
+def test_stream_sends_the_backlog_then_live_changes(client, user_headers):
+    since = head_seq(client)
+    existing = create_listing(client, user_headers, "Feed rug")
+    started = threading.Event()
+    # A write after the stream is up reaches it through the notifier, not the poll
+    thread = threading.Thread(target=lambda: started.wait(10) and create_listing(client, user_headers, "Feed vase"))
+    thread.start()
+    events = read_events(client, since, 2, started)
+    thread.join()
+
+    (first_id, first), (second_id, second) = events
+    assert [c["product_id"] for c in first["changes"]] == [existing]
+    assert first_id == first["next"] == feed(client, since)["changes"][0]["seq"]
+    assert [c["op"] for c in second["changes"]] == ["upsert"]
+    assert second_id == second["next"] > first_id
+    for product_id in (existing, second["changes"][0]["product_id"]):
+        assert client.delete(f"/products/{product_id}").status_code == 200
@@ -0,0 +1,165 @@
+import json
+import time
+
+import pytest
+
+import main
+from conftest import auth_headers
+from main import Product
+
+# Read routes serve stored api_json fragments without validating them, so
+# every route's bytes must be exactly what pydantic would produce for the
+# response model.
+
+TITLE = 'Café "desk" lamp ✓ \\ tab\there'
+
+
+def serialized(item: dict) -> str:
+    return Product.model_validate(item).model_dump_json()
+
+
+def assert_array(body: bytes):
+    expected = "[" + ",".join(serialized(item) for item in json.loads(body)) + "]"
+    assert body.decode() == expected
+
+
+def assert_fragment(body: bytes):
+    assert body.decode() == serialized(json.loads(body))
+
+
+@pytest.fixture(scope="module")
+def listing_id(client):
+    """A listing whose title and seller need escaping, so escaping is covered too."""
+    assert client.post("/register", data={"username": "contract", "password": "contract-password"}).status_code == 200
+    headers = auth_headers(client, "contract", "contract-password")
+    assert client.put("/user/profile", json={"full_name": 'Zoë "Z" Ødegård'}, headers=headers).status_code == 200
+    response = client.post(
+        "/products",
+        data={
+            "title": TITLE, "price": "$12.50", "description": "Line one\nline two, 100% </script>",
+            "category": "Furniture", "contact": "instagram:zoë",
+        },
+        files={"photo": ("lamp.jpg", b"\xff\xd8\xff\xe0 contract", "image/jpeg")},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["product_id"]
+
+
+@pytest.fixture
+def snapshot(listing_id):
+    """The shared catalog snapshot, once it has caught up with the new listing."""
+    assert main.catalog_snapshots is not None
+    deadline = time.monotonic() + 10
+    while (current := main.catalog_snapshots.current()) is None:
+        assert time.monotonic() < deadline, "catalog snapshot was not rebuilt"
+        time.sleep(0.05)
+    return current
+
+
+@pytest.fixture
+def without_snapshot(monkeypatch):
+    """Serve from the database, as a worker does while its snapshot is stale."""
+    monkeypatch.setattr(main, "catalog_snapshots", None)
+
+
+def get(client, path: str, **params) -> bytes:
+    response = client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return response.content
+
+
+def seller_of(body: bytes, listing_id: str) -> dict:
+    items = json.loads(body)
+    return {item["id"]: item["seller"] for item in (items if isinstance(items, list) else [items])}[listing_id]
+
+
+SELLER = {"username": "contract", "full_name": 'Zoë "Z" Ødegård'}
+
+
+def test_snapshot_catalog_and_item(client, snapshot, listing_id):
+    body = get(client, "/products")
+    assert body == bytes(snapshot.listing_array())
+    assert_array(body)
+    assert seller_of(body, listing_id).items() >= SELLER.items()
+    item = get(client, f"/products/{listing_id}")
+    assert_fragment(item)
+    assert seller_of(item, listing_id).items() >= SELLER.items()
+
+
+def test_database_catalog_and_item(client, listing_id, without_snapshot):
+    for params in ({}, {"sort": "price-low"}, {"category": "furniture"}):
+        body = get(client, "/products", **params)
+        assert_array(body)
+        assert seller_of(body, listing_id).items() >= SELLER.items()
+    item = get(client, f"/products/{listing_id}")
+    assert_fragment(item)
+    assert json.loads(item)["title"] == TITLE
+    assert seller_of(item, listing_id).items() >= SELLER.items()
+
+
+def test_snapshot_and_database_agree(client, snapshot, listing_id, monkeypatch):
+    from_snapshot = get(client, "/products"), get(client, f"/products/{listing_id}")
+    monkeypatch.setattr(main, "catalog_snapshots", None)
+    assert (get(client, "/products"), get(client, f"/products/{listing_id}")) == from_snapshot
+
+
+def test_paginated_catalog(client, listing_id):
+    body = get(client, "/products", limit=200)
+    assert_array(body)
+    sellers = {item["id"]: item["seller"] for item in json.loads(body)}
+    assert sellers[listing_id]["full_name"] == 'Zoë "Z" Ødegård'
+
+
+def test_stream(client, listing_id):
+    lines = get(client, "/products/stream").decode().splitlines()
+    assert len(lines) > 1
+    for line in lines:
+        assert_fragment(line.encode())
+    assert seller_of(("[" + ",".join(lines) + "]").encode(), listing_id).items() >= SELLER.items()
+    lines = get(client, "/products/stream", category="furniture", sort="price-low").decode().splitlines()
+    assert listing_id in {json.loads(line)["id"] for line in lines}
+
+
+def test_search(client, listing_id):
+    body = get(client, "/search", query="café")
+    assert_array(body)
+    assert seller_of(body, listing_id).items() >= SELLER.items()
+    assert_array(get(client, "/search", query="calculus"))
+    body = get(client, "/search")
+    assert_array(body)
+    assert seller_of(body, listing_id).items() >= SELLER.items()
+
+
+def test_similar(client, listing_id):
+    assert_array(get(client, f"/products/{listing_id}/similar"))
+
+
+def test_user_listings(client, listing_id):
+    headers = auth_headers(client, "contract", "contract-password")
+    response = client.get("/user/listings", headers=headers)
+    assert response.status_code == 200
+    assert_array(response.content)
+    assert [item["id"] for item in response.json()] == [listing_id]
+
+
+def test_export_is_the_stream_and_matches_items(client, listing_id, without_snapshot):
+    response = client.get("/products/export")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="listings.ndjson"'
+    assert response.content == get(client, "/products/stream")
+    for line in response.content.splitlines():
+        assert get(client, f"/products/{json.loads(line)['id']}") == line
+
+
+def test_rename_reaches_every_catalog_read(client, snapshot, listing_id):
+    headers = auth_headers(client, "contract", "contract-password")
+    rename = {"full_name": "Renamed Contract"}
+    assert client.put("/user/profile", json=rename, headers=headers).status_code == 200
+    try:
+        assert seller_of(get(client, "/products"), listing_id)["full_name"] == "Renamed Contract"
+        assert seller_of(get(client, f"/products/{listing_id}"), listing_id)["full_name"] == "Renamed Contract"
+        assert seller_of(get(client, "/search"), listing_id)["full_name"] == "Renamed Contract"
+    finally:
+        restore = {"full_name": SELLER["full_name"]}
+        assert client.put("/user/profile", json=restore, headers=headers).status_code == 200
@@ -0,0 +1,38 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import messaging
+from conftest import DB_PATH, auth_headers
+
+
+def test_racing_starts_share_one_conversation_without_a_listing():
+    engine = create_async_engine(f"sqlite+aiosqlite:///{DB_PATH}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def start(user_id: int, other_id: int):
+        async with sessions() as db:
+            return (await messaging.get_or_create_conversation(db, user_id, other_id, None)).id
+
+    async def race():
+        try:
+            # Both sides see no conversation, then both insert one
+            return await asyncio.gather(start(2, 3), start(3, 2))
+        finally:
+            await engine.dispose()
+
+    first, second = asyncio.run(race())
+    assert first == second
+
+
+def test_conversation_per_listing_and_one_without(client):
+    headers = auth_headers(client, "user1")
+    ids = {
+        product_id: client.post("/conversations", json={"username": "user2", "product_id": product_id},
+                                headers=headers).json()["id"]
+        for product_id in (None, "listing-a", "listing-b")
+    }
+    assert len(set(ids.values())) == 3
+    other = auth_headers(client, "user2")
+    again = client.post("/conversations", json={"username": "user1"}, headers=other).json()["id"]
+    assert again == ids[None]
@@ -0,0 +1,63 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from main import PRODUCT_SORTS
+from pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    columns, _ = PRODUCT_SORTS["recent"]
+    created = datetime(2026, 10, 18, 12, 30, 5)
+    cursor = encode_cursor("recent", [created, "listing-1"])
+    assert decode_cursor(cursor, "recent", columns) == [created, "listing-1"]
+
+
+@pytest.mark.parametrize("sort", sorted(PRODUCT_SORTS))
+def test_pages_cover_the_sorted_catalog(client, sort):
+    expected = [item["id"] for item in client.get("/products", params={"sort": sort}).json()]
+    seen, after = [], None
+    while True:
+        params = {"sort": sort, "limit": 200, **({"after": after} if after else {})}
+        response = client.get("/products", params=params)
+        assert response.status_code == 200
+        seen += [item["id"] for item in response.json()]
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+    assert seen == expected
+
+
+@pytest.mark.parametrize("cursor", [
+    "eyJhIjogMX0",  # {"a": 1}
+    raw_cursor(1),
+    raw_cursor("recent"),
+    raw_cursor([]),
+    raw_cursor(["recent"]),
+    raw_cursor(["recent", "2026-10-18T12:00:00", "listing-1", "extra"]),
+    raw_cursor(["recent", {"a": 1}, "listing-1"]),
+    raw_cursor(["recent", "2026-10-18T12:00:00", ["listing-1"]]),
+    raw_cursor(["recent", "not a date", "listing-1"]),
+    raw_cursor(["price-low", 100, "listing-1"]),
+    "not base64!",
+    "",
+])
+def test_malformed_cursor_is_rejected(client, user_headers, cursor):
+    columns, _ = PRODUCT_SORTS["recent"]
+    if cursor:
+        with pytest.raises(HTTPException) as excinfo:
+            decode_cursor(cursor, "recent", columns)
+        assert excinfo.value.status_code == 400
+        response = client.get("/products", params={"limit": 10, "after": cursor})
+        assert response.status_code == 400, response.text
+        assert response.json() == {"detail": "Invalid cursor"}
+    # An empty cursor means the first page
+    response = client.get("/user/listings", params={"limit": 10, "after": cursor}, headers=user_headers)
+    assert response.status_code == (400 if cursor else 200), response.text
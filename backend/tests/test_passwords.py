@@ -0,0 +1,40 @@
+import asyncio
+import os
+import signal
+
+import pytest
+from fastapi import HTTPException
+
+from passwords import PasswordPool, _hash, pwd_context
+
+
+def test_pool_is_replaced_after_a_worker_dies():
+    pool = PasswordPool(workers=1, queue_limit=8)
+
+    async def scenario():
+        await pool.run(_hash, "before")
+        for process in list(pool._executor._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        return await pool.run(_hash, "after")
+
+    try:
+        hashed = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert pwd_context.verify("after", hashed)
+    assert pool.restarts == 1
+    assert pool.in_flight == 0
+
+
+def test_call_that_keeps_breaking_the_pool_gets_503():
+    pool = PasswordPool(workers=1, queue_limit=8)
+    try:
+        with pytest.raises(HTTPException) as excinfo:
+            # Exits the worker process, like an OOM kill mid-hash
+            asyncio.run(pool.run(os._exit, 1))
+    finally:
+        pool.shutdown()
+    assert excinfo.value.status_code == 503
+    assert "Retry-After" in excinfo.value.headers
+    assert pool.restarts == 2
+    assert pool.in_flight == 0
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import text
+
+import search
+from conftest import auth_headers
+from database import SessionLocal
+
+LISTING = {"title": "Zyzzogeton beetle poster", "description": "Framed", "category": "other"}
+
+
+@pytest.fixture
+def db():
+    """A writer session whose changes are rolled back afterwards."""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+def entries(db, product_id: str) -> int:
+    return db.execute(
+        text(f"SELECT count(*) FROM {search.FTS_TABLE} WHERE product_id = :id"), {"id": product_id}
+    ).scalar()
+
+
+def rowids(db, product_id: str) -> int:
+    return db.execute(
+        text(f"SELECT count(*) FROM {search.FTS_ROWIDS} WHERE product_id = :id"), {"id": product_id}
+    ).scalar()
+
+
+def test_index_stays_in_sync_through_replace_and_remove(db):
+    search.index_product(db, "sync-1", LISTING)
+    assert search.ranked_product_ids(db, "zyzzogeton", 10) == ["sync-1"]
+
+    search.index_product(db, "sync-1", {**LISTING, "title": "Quokka beetle poster"})
+    assert (entries(db, "sync-1"), rowids(db, "sync-1")) == (1, 1)
+    assert search.ranked_product_ids(db, "zyzzogeton", 10) == []
+    assert search.ranked_product_ids(db, "quokka", 10) == ["sync-1"]
+
+    search.remove_product(db, "sync-1")
+    assert (entries(db, "sync-1"), rowids(db, "sync-1")) == (0, 0)
+    assert search.ranked_product_ids(db, "quokka", 10) == []
+
+
+def test_removing_one_listing_leaves_the_others(db):
+    search.add_products(db, [("sync-a", LISTING), ("sync-b", LISTING)])
+    search.remove_product(db, "sync-a")
+    assert search.ranked_product_ids(db, "zyzzogeton", 10) == ["sync-b"]
+    assert entries(db, "sync-b") == 1
+
+
+def test_create_and_delete_through_the_api(client):
+    headers = auth_headers(client, "user2")
+    response = client.post(
+        "/products",
+        data={"title": "Axolotl tank", "price": "40", "description": "20 gallons", "category": "other",
+              "contact": "email:b@usf.edu"},
+        files={"photo": ("tank.jpg", b"\xff\xd8\xff\xe0 tank", "image/jpeg")},
+        headers=headers,
+    )
+    product_id = response.json()["product_id"]
+    assert [item["id"] for item in client.get("/search", params={"query": "axolotl"}).json()] == [product_id]
+
+    assert client.delete(f"/products/{product_id}").status_code == 200
+    assert client.get("/search", params={"query": "axolotl"}).json() == []
+
+
+def test_title_match_outranks_description_match(db):
+    search.add_products(db, [
+        ("rank-description", {"title": "Desk", "description": "Comes with a wombat sticker", "category": "other"}),
+        ("rank-title", {"title": "Wombat plush", "description": "Soft", "category": "other"}),
+        ("rank-category", {"title": "Mug", "description": "Ceramic", "category": "wombat"}),
+    ])
+    assert search.ranked_product_ids(db, "wombat", 10) == ["rank-title", "rank-category", "rank-description"]
+    assert search.ranked_product_ids(db, "wombat", 1) == ["rank-title"]
+
+
+def test_terms_match_as_prefixes_and_all_must_match(db):
+    search.add_products(db, [
+        ("prefix-1", {"title": "Wombat plush", "description": "", "category": "other"}),
+        ("prefix-2", {"title": "Wombat mug", "description": "", "category": "other"}),
+    ])
+    assert sorted(search.ranked_product_ids(db, "womb", 10)) == ["prefix-1", "prefix-2"]
+    assert search.ranked_product_ids(db, "wombat plu", 10) == ["prefix-1"]
+
+
+@pytest.mark.parametrize("query", ["", "   ", "!!!", "\"*()-:^", "- + -"])
+def test_queries_without_terms_match_nothing(db, client, query):
+    assert search.build_match_query(query) == ""
+    assert search.ranked_product_ids(db, query, 10) == []
+    response = client.get("/search", params={"query": query})
+    assert response.status_code == 200
+    if query:
+        assert response.json() == []
+
+
+def test_fts_syntax_in_queries_is_quoted(db):
+    search.add_products(db, [("syntax-1", {"title": "Wombat NEAR plush", "description": "", "category": "x"})])
+    assert search.build_match_query('wombat OR "x" NEAR(') == '"wombat"* "or"* "x"* "near"*'
+    assert search.ranked_product_ids(db, "wombat AND near", 10) == []
+    assert search.ranked_product_ids(db, "wombat near", 10) == ["syntax-1"]
@@ -0,0 +1,40 @@
+import metrics
+
+# Seller summaries are loaded with one IN query per page, so a page of 100
+# listings must cost exactly as many SQL statements as a page of 10.
+
+
+def statements(route: str) -> float:
+    return metrics.sql_statements.values.get((("method", "GET"), ("route", route)), 0)
+
+
+def get_page(client, path: str, limit: int, headers=None):
+    before = statements(path)
+    response = client.get(path, params={"limit": limit}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json(), statements(path) - before
+
+
+def test_products_page_statements_do_not_grow_with_page_size(client):
+    small, small_count = get_page(client, "/products", 10)
+    page, count = get_page(client, "/products", 100)
+
+    assert len(small) == 10 and len(page) == 100
+    assert small_count > 0
+    assert count == small_count
+    # Many sellers on one page, each resolved from the same query
+    assert all(item["seller"] is not None for item in page)
+    assert len({item["seller"]["id"] for item in page}) > 1
+
+
+def test_user_listings_page_statements_do_not_grow_with_page_size(client, user_headers):
+    # The first request with a token also loads its user; later ones hit the token cache
+    get_page(client, "/user/listings", 1, user_headers)
+    small, small_count = get_page(client, "/user/listings", 10, user_headers)
+    page, count = get_page(client, "/user/listings", 100, user_headers)
+
+    assert len(small) == 10 and len(page) == 100
+    assert small_count > 0
+    assert count == small_count
+    assert {item["seller"]["username"] for item in page} == {"user0"}
+
@@ -0,0 +1,56 @@
+import random
+
+from similar import SimilarIndex
+
+WORDS = "calculus textbook desk lamp chair ipad charger hoodie bike lock fridge ticket kit guitar".split()
+
+
+def listings(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [
+        (f"p{i}", {
+            "title": " ".join(rng.sample(WORDS, 3)) + f" unique{i}",
+            "description": " ".join(rng.sample(WORDS, 4)),
+            "category": rng.choice(["books", "furniture", "electronics"]),
+        })
+        for i in range(count)
+    ]
+
+
+def test_compaction_renumbers_live_listings():
+    rows = listings(200)
+    index = SimilarIndex(max_candidates=1000)
+    for product_id, data in rows:
+        index.add(product_id, data)
+    removed = {product_id for product_id, _ in rows[::3]}
+    for product_id in removed:
+        index.remove(product_id)
+
+    live = [(product_id, data) for product_id, data in rows if product_id not in removed]
+    assert index.stats()["dead"] < len(removed)  # compacted along the way
+    index._compact()
+    assert index._ids == [product_id for product_id, _ in live]
+    assert len(index._doc_terms) == len(index._doc_weights) == len(index._norms) == len(live)
+    assert all(index._index_of[product_id] == doc for doc, product_id in enumerate(index._ids))
+    # Terms only the removed listings had are gone too
+    assert not any(f"unique{product_id[1:]}" in index._vocab for product_id in removed)
+    assert all(df > 0 for df in index._df)
+
+    fresh = SimilarIndex(max_candidates=1000)
+    for product_id, data in live:
+        fresh.add(product_id, data)
+    for product_id, _ in live[:20]:
+        assert index.similar(product_id, 10) == fresh.similar(product_id, 10)
+
+
+def test_listing_added_after_compaction_is_found():
+    rows = listings(40)
+    index = SimilarIndex()
+    for product_id, data in rows:
+        index.add(product_id, data)
+    for product_id, _ in rows[:20]:
+        index.remove(product_id)
+    index.add("new", {**rows[30][1], "title": rows[30][1]["title"] + " new"})
+    assert index.similar(rows[30][0], 1)[0][0] == "new"
+    assert index.similar("new", 1)[0][0] == rows[30][0]
+    assert index.similar(rows[0][0], 5) is None
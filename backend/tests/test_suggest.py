@@ -0,0 +1,75 @@
+from conftest import auth_headers
+from suggest import SuggestIndex, suggestion_terms
+
+
+def listing(title: str, category: str = "other") -> dict:
+    return {"title": title, "category": category}
+
+
+def test_terms_are_title_words_and_the_whole_category():
+    terms = suggestion_terms(listing("The TI-84 Plus, a calculator", "Lab  Equipment"))
+    # Single characters and stopwords are dropped; the category is normalised but kept whole
+    assert sorted(terms) == ["84", "calculator", "lab equipment", "plus", "ti"]
+
+
+def test_prefix_matches_most_used_first_then_alphabetically():
+    index = SuggestIndex()
+    index.add("1", listing("Calculus textbook", "books"))
+    index.add("2", listing("Calculus notes", "books"))
+    index.add("3", listing("Calculator", "electronics"))
+    index.add("4", listing("Calendar", "other"))
+
+    assert index.suggest("cal", 8) == ["calculus", "calculator", "calendar"]
+    assert index.suggest("cal", 2) == ["calculus", "calculator"]
+    assert index.suggest("  CALC ", 8) == ["calculus", "calculator"]
+    assert index.suggest("calculus", 8) == ["calculus"]
+    assert index.suggest("calx", 8) == []
+    assert index.suggest("", 8) == []
+    # Multi-word categories match on their leading words
+    assert index.suggest("b", 8) == ["books"]
+
+
+def test_removing_and_replacing_a_listing_takes_its_counts_back():
+    index = SuggestIndex()
+    index.add("1", listing("Calculus textbook"))
+    index.add("2", listing("Calculator"))
+    index.add("3", listing("Calculator case"))
+    assert index.suggest("calc", 8) == ["calculator", "calculus"]
+
+    index.remove("3")
+    index.remove("3")  # already gone: a no-op
+    index.add("4", listing("Calculus notes"))
+    assert index.suggest("calc", 8) == ["calculus", "calculator"]
+
+    index.add("2", listing("Desk lamp"))  # an edit replaces the listing's terms
+    assert index.suggest("calc", 8) == ["calculus"]
+    assert index.suggest("case", 8) == []
+    assert index.stats()["terms"] == len({"calculus", "textbook", "notes", "desk", "lamp", "other"})
+
+
+def test_suggestions_follow_creates_and_deletes(client):
+    headers = auth_headers(client, "user2")
+
+    def create(title: str) -> str:
+        response = client.post(
+            "/products",
+            data={"title": title, "price": "5", "description": "Suggest test", "category": "other",
+                  "contact": "email:suggest@usf.edu"},
+            files={"photo": ("s.jpg", b"\xff\xd8\xff\xe0 suggest", "image/jpeg")},
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+        return response.json()["product_id"]
+
+    assert client.get("/suggest", params={"prefix": "zor"}).json() == []
+    created = [create("Zorbing ball"), create("Zorbing helmet"), create("Zorilla plush")]
+    assert client.get("/suggest", params={"prefix": "zor"}).json() == ["zorbing", "zorilla"]
+    assert client.get("/suggest", params={"prefix": "zor", "limit": 1}).json() == ["zorbing"]
+
+    for product_id in created[:2]:
+        assert client.delete(f"/products/{product_id}").status_code == 200
+    assert client.get("/suggest", params={"prefix": "zor"}).json() == ["zorilla"]
+    assert client.delete(f"/products/{created[2]}").status_code == 200
+    assert client.get("/suggest", params={"prefix": "zor"}).json() == []
+
+    assert client.get("/suggest", params={"prefix": "zor", "limit": 21}).status_code == 422
@@ -0,0 +1,78 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.responses import PlainTextResponse
+
+import storage
+from conftest import auth_headers
+
+LISTING = {"title": "Desk lamp", "price": "5", "description": "Bright", "category": "furniture", "contact": "email:a@usf.edu"}
+PHOTO = b"\xff\xd8\xff\xe0" + b"lamp" * 64
+
+
+def post_listing(client, headers, photo: bytes):
+    return client.post("/products", data=LISTING, files={"photo": ("lamp.jpg", photo, "image/jpeg")}, headers=headers)
+
+
+def test_oversized_upload_is_refused_from_content_length(client):
+    headers = auth_headers(client, "user1")
+    photo = b"\xff\xd8" + b"\0" * (storage.MAX_UPLOAD_BYTES + storage.UPLOAD_FORM_OVERHEAD_BYTES)
+    response = post_listing(client, headers, photo)
+    assert response.status_code == 413
+
+
+def run_limited(headers, chunks, max_bytes=1000):
+    """Send a request through UploadSizeLimitMiddleware alone; returns (status, chunks read, app called)."""
+    sent, messages, called = list(chunks), [], []
+
+    async def app(scope, receive, send):
+        called.append(True)
+        while (await receive()).get("more_body"):
+            pass
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    async def receive():
+        chunk = sent.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(sent)}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/products", "headers": headers}
+    middleware = storage.UploadSizeLimitMiddleware(app, max_bytes=max_bytes)
+    asyncio.run(middleware(scope, receive, send))
+    return messages[0]["status"], len(chunks) - len(sent), bool(called)
+
+
+def test_declared_oversized_body_is_never_read():
+    chunks = [b"x" * 100] * 20
+    status, read, called = run_limited([(b"content-length", b"2000")], chunks)
+    assert (status, read, called) == (413, 0, False)
+
+
+def test_undeclared_body_is_cut_off_at_the_limit():
+    with pytest.raises(HTTPException) as excinfo:
+        run_limited([], [b"x" * 100] * 20)
+    assert excinfo.value.status_code == 413
+
+
+def test_body_within_the_limit_passes():
+    status, read, called = run_limited([(b"content-length", b"1000")], [b"x" * 100] * 10)
+    assert (status, read, called) == (200, 10, True)
+
+
+def test_shared_photo_is_removed_with_its_last_listing(client):
+    headers = auth_headers(client, "user1")
+    first = post_listing(client, headers, PHOTO).json()["product_id"]
+    second = post_listing(client, headers, PHOTO).json()["product_id"]
+    image = client.get(f"/products/{first}").json()["image"]
+    assert client.get(f"/products/{second}").json()["image"] == image
+    path = os.path.join(storage.UPLOAD_DIR, image)
+    assert os.path.isfile(path)
+
+    assert client.delete(f"/products/{first}").status_code == 200
+    assert os.path.isfile(path)
+    assert client.delete(f"/products/{second}").status_code == 200
+    assert not os.path.exists(path)
@@ -0,0 +1,60 @@
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+import storage
+
+# Serving for /uploads.
+#
+# Content-addressed files (uploads/ab/cd/<sha256>.ext) never change under their
+# name, so browsers may cache them for a year without revalidating, and their
+# digest is a natural strong ETag. Older uuid-named files are revalidated with
+# ETag/Last-Modified. Range requests come from FileResponse; when the server
+# offers the ASGI pathsend extension, full-file bodies are handed to it so the
+# server can use sendfile instead of copying chunks through Python.
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+class UploadFileResponse(FileResponse):
+    chunk_size = 256 * 1024
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._pathsend = "http.response.pathsend" in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        # Honour If-Range against the digest ETag we send, not just Starlette's own
+        if http_if_range == self.headers.get("etag"):
+            return True
+        return super()._should_use_range(http_if_range, stat_result)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if not self._pathsend or send_header_only:
+            return await super()._handle_simple(send, send_header_only)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.pathsend", "path": os.fspath(self.path)})
+
+
+class UploadFiles(StaticFiles):
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = UploadFileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        digest = storage.blob_digest(os.fspath(full_path))
+        if digest:
+            response.headers["etag"] = f'"{digest}"'
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["cache-control"] = REVALIDATE_CACHE_CONTROL
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response